@@ -0,0 +1,8 @@
+import sys
+
+from benchmarks.runner import main
+
+# Importing the modules registers their benchmarks
+from benchmarks import bench_crypto, bench_packaging, bench_database, bench_transport
+
+sys.exit(main())
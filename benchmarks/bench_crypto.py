@@ -0,0 +1,73 @@
+import os
+
+from papr.utilities import (
+    aes_encrypt_bytes,
+    aes_decrypt_bytes,
+    SECP_encrypt_text,
+    generate_SECP256k1_keys,
+    file_sha256,
+    read_all_bytes,
+)
+from papr.encryption import DerivedKeyCache, encrypt_with_passphrase
+
+from benchmarks.runner import benchmark
+
+KiB = 1024
+MiB = 1024 * KiB
+
+SIZES = {"64KiB": 64 * KiB, "1MiB": MiB, "8MiB": 8 * MiB}
+
+
+def write_random_file(workdir, size):
+    path = os.path.join(workdir, f"random_{size}.bin")
+    with open(path, "wb") as f:
+        f.write(os.urandom(size))
+    return path
+
+
+for label, size in SIZES.items():
+
+    @benchmark(f"aes_encrypt_bytes[{label}]", size=size)
+    def bench_aes_encrypt(workdir, size):
+        secret = os.urandom(32)
+        data = os.urandom(size)
+        return lambda: aes_encrypt_bytes(secret, data)
+
+    @benchmark(f"aes_decrypt_bytes[{label}]", size=size)
+    def bench_aes_decrypt(workdir, size):
+        secret = os.urandom(32)
+        data = aes_encrypt_bytes(secret, os.urandom(size))
+        return lambda: aes_decrypt_bytes(secret, data)
+
+    @benchmark(f"file_sha256[{label}]", size=size)
+    def bench_file_sha256(workdir, size):
+        path = write_random_file(workdir, size)
+        return lambda: file_sha256(path)
+
+    @benchmark(f"read_all_bytes[{label}]", repeat=3, size=size)
+    def bench_read_all_bytes(workdir, size):
+        path = write_random_file(workdir, size)
+        return lambda: read_all_bytes(path)
+
+
+@benchmark("SECP_encrypt_text", number=10)
+def bench_secp_encrypt_text(workdir):
+    sender_private_key, _ = generate_SECP256k1_keys("")
+    _, recipient_public_key = generate_SECP256k1_keys("")
+    msg = "correct horse battery staple " * 8
+    return lambda: SECP_encrypt_text(sender_private_key, recipient_public_key, msg)
+
+
+@benchmark("encrypt_with_passphrase[uncached]", number=5)
+def bench_encrypt_with_passphrase(workdir):
+    data = os.urandom(64 * KiB)
+    return lambda: encrypt_with_passphrase("correct horse battery staple", data)
+
+
+@benchmark("encrypt_with_passphrase[cached]", number=5)
+def bench_encrypt_with_passphrase_cached(workdir):
+    data = os.urandom(64 * KiB)
+    cache = DerivedKeyCache()
+    return lambda: encrypt_with_passphrase(
+        "correct horse battery staple", data, cache=cache, scope="article"
+    )
@@ -0,0 +1,156 @@
+import random
+import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from papr.models import Article, Manuscript, Review, Server
+
+from benchmarks.runner import benchmark
+from benchmarks.fixtures import make_engine
+
+NUM_SERVERS = 20
+NUM_ARTICLES = 10000
+MANUSCRIPTS_PER_ARTICLE = 3
+NUM_REVIEWS = 5000
+
+
+def populate(engine):
+    rng = random.Random(0)
+    now = datetime.datetime.utcnow()
+
+    with Session(engine) as session:
+        servers = [
+            Server(
+                name=f"Server {i}",
+                channel_name=f"@Server{i}",
+                url=f"http://server{i}.org",
+            )
+            for i in range(NUM_SERVERS)
+        ]
+        session.add_all(servers)
+
+        for i in range(NUM_ARTICLES):
+            article = Article(
+                base_claim_name=f"article{i}",
+                channel_name=f"@Author{i % 500}",
+                reviewed=rng.random() < 0.3,
+                revision=MANUSCRIPTS_PER_ARTICLE - 1,
+                review_server=rng.choice(servers),
+            )
+            for rev in range(MANUSCRIPTS_PER_ARTICLE):
+                article.manuscripts.append(
+                    Manuscript(
+                        claim_name=f"article{i}_r{rev}",
+                        bid=0.001,
+                        file_path=f"/tmp/article{i}.pdf",
+                        submission_date=now,
+                        title=f"Title of article {i}",
+                        abstract="Abstract " * 50,
+                        authors="Steve Tremblay and Bob Roberts",
+                        tags="test;benchmark",
+                    )
+                )
+            session.add(article)
+
+        for i in range(NUM_REVIEWS):
+            session.add(
+                Review(
+                    submission_title=f"Title of article {i}",
+                    submission_claim_name=f"article{i}_r0",
+                    submission_channel_name=f"@Author{i % 500}",
+                    submission_authors="Steve Tremblay and Bob Roberts",
+                    submission_date=now,
+                    review_text="Review text " * 100,
+                    review_rating=rng.randint(1, 5),
+                    server=rng.choice(servers),
+                )
+            )
+        session.commit()
+
+
+def populated_engine():
+    engine = make_engine()
+    populate(engine)
+    return engine
+
+
+@benchmark("db_article_by_claim_name", number=100)
+def bench_article_by_claim_name(workdir):
+    engine = populated_engine()
+    rng = random.Random(1)
+
+    def run():
+        with Session(engine) as session:
+            session.execute(
+                select(Article).filter_by(
+                    base_claim_name=f"article{rng.randrange(NUM_ARTICLES)}"
+                )
+            ).scalar_one()
+
+    return run
+
+
+@benchmark("db_article_count_by_claim_name", number=100)
+def bench_article_count(workdir):
+    engine = populated_engine()
+    rng = random.Random(2)
+
+    def run():
+        with Session(engine) as session:
+            session.execute(
+                select(func.count()).select_from(
+                    select(Article)
+                    .filter_by(base_claim_name=f"article{rng.randrange(NUM_ARTICLES)}")
+                    .subquery()
+                )
+            ).scalar_one()
+
+    return run
+
+
+@benchmark("db_article_latest_manuscript", number=100)
+def bench_latest_manuscript(workdir):
+    engine = populated_engine()
+    rng = random.Random(3)
+
+    def run():
+        with Session(engine) as session:
+            article = session.execute(
+                select(Article).filter_by(
+                    base_claim_name=f"article{rng.randrange(NUM_ARTICLES)}"
+                )
+            ).scalar_one()
+            article.title, article.review_server.name
+
+    return run
+
+
+@benchmark("db_review_by_submission", number=100)
+def bench_review_by_submission(workdir):
+    engine = populated_engine()
+    rng = random.Random(4)
+
+    def run():
+        with Session(engine) as session:
+            session.execute(
+                select(Review).filter_by(
+                    submission_claim_name=f"article{rng.randrange(NUM_REVIEWS)}_r0"
+                )
+            ).scalar_one()
+
+    return run
+
+
+@benchmark("db_list_articles_of_server", number=10)
+def bench_list_articles_of_server(workdir):
+    engine = populated_engine()
+
+    def run():
+        with Session(engine) as session:
+            server = session.execute(
+                select(Server).filter_by(name="Server 0")
+            ).scalar_one()
+            [article.base_claim_name for article in server.reviewed_articles]
+
+    return run
@@ -0,0 +1,68 @@
+import io
+import os
+import asyncio
+import itertools
+
+from papr.chunking import iter_chunks
+
+from benchmarks.runner import benchmark
+from benchmarks.fixtures import make_offline_daemon, add_article
+from benchmarks.bench_crypto import write_random_file, MiB
+
+for size_label, size in (("1MiB", MiB), ("8MiB", 8 * MiB)):
+    for encrypt in (False, True):
+        name = f"publish_manuscript[{size_label},{'encrypted' if encrypt else 'plain'}]"
+
+        @benchmark(name, repeat=3, size=size, encrypt=encrypt)
+        def bench_publish_manuscript(workdir, size, encrypt):
+            daemon = make_offline_daemon(workdir)
+            add_article(daemon, "bench", encrypt)
+            file_path = write_random_file(workdir, size)
+
+            stream_create = daemon.jsonrpc_stream_create
+
+            async def stream_create_and_discard(name, bid, file_path=None, **kwargs):
+                tx = await stream_create(name, bid, file_path=file_path, **kwargs)
+                os.remove(file_path)
+                return tx
+
+            daemon.jsonrpc_stream_create = stream_create_and_discard
+
+            loop = asyncio.new_event_loop()
+            revisions = itertools.count()
+
+            def run():
+                tx = loop.run_until_complete(
+                    daemon._publish_manuscript(
+                        "bench",
+                        "0.001",
+                        file_path,
+                        "Benchmark title",
+                        "Benchmark abstract",
+                        "Benchmark authors",
+                        ["benchmark"],
+                        revision=next(revisions),
+                        encrypt=encrypt,
+                        ignore_duplicate_names=True,
+                    )
+                )
+                assert not isinstance(tx, dict), tx
+
+            def teardown():
+                loop.close()
+                # The workers spawned to process the files
+                if daemon.bundle_pool is not None:
+                    daemon.bundle_pool.shutdown()
+
+            return run, teardown
+
+
+for vectorized in (True, False):
+    name = f"content_defined_chunking[32MiB,{'numpy' if vectorized else 'python'}]"
+
+    @benchmark(name, repeat=3, size=32 * MiB, vectorized=vectorized)
+    def bench_content_defined_chunking(workdir, size, vectorized):
+        data = os.urandom(size)
+        return lambda: sum(
+            1 for _ in iter_chunks(io.BytesIO(data), vectorized=vectorized)
+        )
@@ -0,0 +1,64 @@
+import decimal
+
+from papr import codec
+
+from benchmarks.runner import benchmark
+
+SIZES = {"1k": 1000, "10k": 10000}
+
+
+def default(o):
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    raise TypeError(o)
+
+
+def make_result(num_items):
+    # Shaped like the result of stream_list
+    return {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "result": {
+            "items": [
+                {
+                    "claim_id": f"{i:040x}",
+                    "name": f"article{i}_r0",
+                    "normalized_name": f"article{i}_r0",
+                    "amount": decimal.Decimal("0.001"),
+                    "height": 1000 + i,
+                    "confirmations": 12,
+                    "is_my_output": True,
+                    "value_type": "stream",
+                    "value": {
+                        "title": f"Title of article {i}",
+                        "description": "Abstract " * 50,
+                        "tags": ["test", "benchmark"],
+                        "source": {"sha384": "ab" * 48, "size": "1048576"},
+                    },
+                }
+                for i in range(num_items)
+            ],
+            "page": 1,
+            "page_size": num_items,
+            "total_items": num_items,
+        },
+    }
+
+
+content_types = {"json": codec.JSON}
+if codec.available(codec.MSGPACK):
+    content_types["msgpack"] = codec.MSGPACK
+
+for size_label, num_items in SIZES.items():
+    for type_label, content_type in content_types.items():
+
+        @benchmark(
+            f"rpc_response_roundtrip[{type_label},{size_label}]",
+            num_items=num_items,
+            content_type=content_type,
+        )
+        def bench_roundtrip(workdir, num_items, content_type):
+            result = make_result(num_items)
+            return lambda: codec.decode(
+                codec.encode(result, content_type, default=default), content_type
+            )
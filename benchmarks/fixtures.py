@@ -0,0 +1,61 @@
+import types
+import collections
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from papr.daemon import PaprDaemon
+from papr.models import Base, Article, Server
+from papr.encryption import DerivedKeyCache
+from papr.channels import ChannelContext
+
+
+async def stub_stream_create(name, bid, file_path=None, **kwargs):
+    return types.SimpleNamespace(id=f"txid_{name}", hash=f"txhash_{name}")
+
+
+def make_engine():
+    engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+    Base.metadata.create_all(engine)
+    return engine
+
+
+def make_offline_daemon(workdir):
+    """
+    Builds a PaprDaemon without starting any lbry component.
+    Only the state used by the packaging and database code paths is initialized
+    and `jsonrpc_stream_create` is replaced by a stub.
+    The pool of worker processes started by the first publication, `daemon.bundle_pool`, must be shut down by the caller.
+    """
+    daemon = PaprDaemon.__new__(PaprDaemon)
+    daemon.conf = types.SimpleNamespace(
+        submission_dir=workdir, bundle_workers=0, bundle_compress_level=6
+    )
+    daemon.engine = make_engine()
+    daemon.default_channel = ChannelContext("@Benchmark", "0" * 40)
+    daemon.channels = {"@Benchmark": daemon.default_channel}
+    daemon.publish_progress = collections.OrderedDict()
+    daemon.derived_keys = DerivedKeyCache()
+    daemon.bundle_pool = None
+    daemon.jsonrpc_stream_create = stub_stream_create
+    return daemon
+
+
+def add_article(daemon, base_claim_name, encrypt):
+    with Session(daemon.engine) as session:
+        server = Server(
+            name="Benchmark Server",
+            channel_name="@BenchmarkServer",
+            url="http://localhost",
+        )
+        article = Article(
+            base_claim_name=base_claim_name,
+            channel_name=daemon.channel_name,
+            reviewed=False,
+            revision=0,
+            review_server=server,
+        )
+        if encrypt:
+            article.encryption_passphrase = "benchmark passphrase of seven words"
+        session.add(article)
+        session.commit()
@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import datetime
+import statistics
+import subprocess
+
+BENCHMARKS = {}
+
+# Relative slowdown of the median time above which a benchmark is reported as a regression
+DEFAULT_THRESHOLD = 0.2
+
+
+class Benchmark:
+    def __init__(self, name, setup, number, repeat, params):
+        self.name = name
+        self.setup = setup
+        self.number = number
+        self.repeat = repeat
+        self.params = params
+
+    def run(self, workdir):
+        """
+        Calls the setup function, then times the function it returns.
+        The setup may also return a (function, teardown) pair, teardown being called once the function was timed.
+        The setup and teardown times are not measured.
+        """
+        fn = self.setup(workdir, **self.params)
+        teardown = None
+        if isinstance(fn, tuple):
+            fn, teardown = fn
+
+        try:
+            fn()  # warm-up
+            samples = []
+            for _ in range(self.repeat):
+                start = time.perf_counter()
+                for _ in range(self.number):
+                    fn()
+                samples.append((time.perf_counter() - start) / self.number)
+        finally:
+            if teardown is not None:
+                teardown()
+
+        result = {
+            "min": min(samples),
+            "median": statistics.median(samples),
+            "mean": statistics.mean(samples),
+            "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            "number": self.number,
+            "repeat": self.repeat,
+            "params": self.params,
+        }
+        if "size" in self.params:
+            # Bytes processed per second, from the median time
+            result["throughput"] = self.params["size"] / result["median"]
+        return result
+
+
+def benchmark(name=None, number=1, repeat=5, **params):
+    """
+    Registers a benchmark. The decorated function receives a temporary working directory and `params`,
+    and returns the function to time, or the function to time and its teardown.
+    """
+
+    def decorator(setup):
+        _name = name or setup.__name__
+        BENCHMARKS[_name] = Benchmark(_name, setup, number, repeat, params)
+        return setup
+
+    return decorator
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(pattern=""):
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if pattern not in name:
+            continue
+
+        workdir = tempfile.mkdtemp(prefix="papr-bench-")
+        try:
+            results[name] = bench.run(workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        throughput = results[name].get("throughput")
+        print(
+            f"{name:<48} median {results[name]['median'] * 1e3:10.3f} ms  "
+            f"(min {results[name]['min'] * 1e3:.3f} ms)"
+            + (f"  {throughput / 2**20:.1f} MiB/s" if throughput else ""),
+            file=sys.stderr,
+        )
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "date": datetime.datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Returns the benchmarks whose median time increased by more than `threshold` relative to the baseline.
+    """
+    regressions = {}
+    for name, res in current["results"].items():
+        if name not in baseline["results"]:
+            continue
+        ratio = res["median"] / baseline["results"][name]["median"]
+        if ratio > 1 + threshold:
+            regressions[name] = ratio
+    return regressions
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Runs the papr benchmark suite")
+    parser.add_argument(
+        "-k", "--pattern", default="", help="Only run matching benchmarks"
+    )
+    parser.add_argument(
+        "-o", "--output", help="Path of the JSON file to write the results to"
+    )
+    parser.add_argument(
+        "--compare", help="JSON results of a previous run to compare to"
+    )
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.pattern)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+        regressions = compare(baseline, results, args.threshold)
+        for name, ratio in regressions.items():
+            print(f"REGRESSION {name}: {ratio:.2f}x slower", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
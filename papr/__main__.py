@@ -0,0 +1,4 @@
+from papr.cli import cli
+
+if __name__ == "__main__":
+    cli(prog_name="papr")
@@ -0,0 +1,644 @@
+import io
+import os
+import json
+import base64
+import zlib
+import bisect
+import shutil
+import asyncio
+import hashlib
+import zipfile
+
+from papr.chunking import iter_chunks
+from papr.encryption import (
+    Header,
+    KEY_RAW,
+    KEY_SCRYPT,
+    DEFAULT_CHUNK_SIZE,
+    TAG_SIZE,
+    encrypt_stream,
+    decrypt_chunks,
+    passphrase_key,
+)
+
+# Manuscript bundle format
+#
+# A bundle is a ZIP64 archive of the manuscript, its supplementary files and `manifest.json`,
+# which lists for each file its size and SHA-256 digest before any processing.
+# Encrypted files are first compressed with raw deflate when it is worth it, then encrypted into a
+# papr container (see papr.encryption) and stored as they are; the digest of the stored entry is
+# also listed so that the archive can be checked without the key. The fields describing the content of
+# encrypted files (SEALED_FIELDS) are not published as they are: `sealed` is a container, encrypted with the
+# key of the files, of the {name: fields} of these files (see `unseal_manifest`).
+# Unencrypted files are deflated by the archive itself.
+# Deflated files are fully flushed every READ_SIZE bytes of content, so that they can be decompressed from
+# any of these points: `sync_points` lists their (content offset, deflated offset) pairs.
+#
+# In chunked bundles, files are split with content-defined chunking (see papr.chunking) and each
+# distinct chunk is stored in `chunks/<id>`, where the id is the SHA-256 of the stored chunk.
+# Encrypted chunks are containers of their own whose plaintext starts with a byte telling whether
+# the rest is deflated. The manifest entry of a file lists its chunk ids, and `chunks` maps the ids of the
+# chunks stored in the bundles of previous revisions to the claim name of these bundles, which
+# are thus not uploaded again. `chunk_offsets` lists the offset of each chunk in the content of the file.
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# Fields of the manifest entries of encrypted files which are only readable with their key
+SEALED_FIELDS = ("size", "sha256", "sync_points", "chunk_offsets")
+
+READ_SIZE = 1024 * 1024
+
+# Files are compressed before encryption when a sample of their start shrinks below this ratio
+COMPRESSION_SAMPLE_SIZE = 1024 * 1024
+MIN_COMPRESSION_RATIO = 0.9
+
+
+class IntegrityError(Exception):
+    pass
+
+
+class _HashingReader:
+    def __init__(self, f):
+        self.f = f
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.hash.update(data)
+        self.size += len(data)
+        return data
+
+
+class _HashingWriter:
+    def __init__(self, f):
+        self.f = f
+        self.hash = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.hash.update(data)
+        self.size += len(data)
+        return self.f.write(data)
+
+
+class _DeflateReader:
+    """
+    Deflates a file while it is read, fully flushing after every READ_SIZE bytes read
+    so that decompression can start at any of the `sync_points`
+    """
+
+    def __init__(self, f, level):
+        self.f = f
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        self.buffer = bytearray()
+        self.eof = False
+
+        self.sync_points = []  # (offset in the file, offset in the deflated data)
+        self._read = 0
+        self._written = 0
+
+    def read(self, size):
+        while len(self.buffer) < size and not self.eof:
+            data = self.f.read(READ_SIZE)
+            if data:
+                self.sync_points.append((self._read, self._written))
+                deflated = self.compressor.compress(data) + self.compressor.flush(
+                    zlib.Z_FULL_FLUSH
+                )
+                self._read += len(data)
+                self._written += len(deflated)
+                self.buffer += deflated
+            else:
+                self.buffer += self.compressor.flush()
+                self.eof = True
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def _is_compressible(path, level):
+    with open(path, "rb") as f:
+        sample = f.read(COMPRESSION_SAMPLE_SIZE)
+    if not sample:
+        return False
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    compressed = len(compressor.compress(sample)) + len(compressor.flush())
+    return compressed < MIN_COMPRESSION_RATIO * len(sample)
+
+
+def process_file(
+    path,
+    out_path=None,
+    key=None,
+    scrypt=None,
+    compress_level=6,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    """
+    Hashes a file and, with a key, compresses and encrypts it into `out_path`.
+    Runs in the worker processes of the bundle pool: files are streamed and never fully loaded in memory.
+    With `scrypt` (salt, n, r, p), `key` is the key derived from a passphrase with these parameters.
+    Returns the manifest entry of the file, without its name.
+    """
+    with open(path, "rb") as f:
+        src = _HashingReader(f)
+
+        if key is None:
+            while src.read(READ_SIZE):
+                pass
+            return {
+                "size": src.size,
+                "sha256": src.hash.hexdigest(),
+                "compression": "none",
+                "encrypted": False,
+            }
+
+        compress = compress_level > 0 and _is_compressible(path, compress_level)
+        reader = _DeflateReader(src, compress_level) if compress else src
+        header = Header.new(
+            KEY_SCRYPT if scrypt else KEY_RAW, chunk_size=chunk_size, scrypt=scrypt
+        )
+        with open(out_path, "wb") as out:
+            dst = _HashingWriter(out)
+            encrypt_stream(key, reader, dst, header=header)
+
+    entry = {
+        "size": src.size,
+        "sha256": src.hash.hexdigest(),
+        "compression": "deflate" if compress else "none",
+        "encrypted": True,
+        "stored_size": dst.size,
+        "stored_sha256": dst.hash.hexdigest(),
+    }
+    if compress:
+        entry["sync_points"] = reader.sync_points
+    return entry
+
+
+# First byte of the plaintext of encrypted chunks
+CHUNK_RAW = b"\x00"
+CHUNK_DEFLATE = b"\x01"
+
+
+def _store_chunk(data, key, header, compress_level):
+    if key is None:
+        return data
+
+    # Whether to compress is decided per chunk, as chunks are shared by revisions of files
+    payload = CHUNK_RAW + data
+    if compress_level > 0:
+        compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        compressed = compressor.compress(data) + compressor.flush()
+        if len(compressed) < MIN_COMPRESSION_RATIO * len(data):
+            payload = CHUNK_DEFLATE + compressed
+
+    out = io.BytesIO()
+    encrypt_stream(key, io.BytesIO(payload), out, header=header)
+    return out.getvalue()
+
+
+def process_file_chunked(
+    path,
+    work_dir,
+    known=frozenset(),
+    key=None,
+    scrypt=None,
+    compress_level=6,
+    chunk_size=DEFAULT_CHUNK_SIZE,
+):
+    """
+    Splits a file in content-defined chunks and processes those whose digest is not in `known` into `work_dir`.
+    Runs in the worker processes of the bundle pool.
+    Returns the manifest entry of the file, with for each chunk its digest, and its id and stored size if it is new.
+    """
+    file_hash = hashlib.sha256()
+    size = 0
+    chunks = []
+    offsets = []
+    with open(path, "rb") as f:
+        for data in iter_chunks(f):
+            offsets.append(size)
+            file_hash.update(data)
+            size += len(data)
+            digest = hashlib.sha256(data).hexdigest()
+            if digest in known:
+                chunks.append({"digest": digest})
+                continue
+
+            header = None
+            if key is not None:
+                # Each chunk is a container of its own, so that it can be read from any bundle
+                header = Header.new(
+                    KEY_SCRYPT if scrypt else KEY_RAW,
+                    chunk_size=chunk_size,
+                    scrypt=scrypt,
+                )
+            stored = _store_chunk(data, key, header, compress_level)
+            chunk_id = hashlib.sha256(stored).hexdigest()
+            with open(os.path.join(work_dir, chunk_id), "wb") as out:
+                out.write(stored)
+            chunks.append({"digest": digest, "id": chunk_id, "size": len(stored)})
+
+    return {
+        "size": size,
+        "sha256": file_hash.hexdigest(),
+        "compression": "chunk" if key is not None else "none",
+        "encrypted": key is not None,
+        "chunks": chunks,
+        "chunk_offsets": offsets,
+    }
+
+
+async def process_files(
+    files,
+    work_dir,
+    executor=None,
+    key=None,
+    scrypt=None,
+    compress_level=6,
+    known_chunks=None,
+):
+    """
+    Processes the {archive name: path} files in parallel on `executor`.
+    Returns the manifest entries, and the {archive name: path} of the files to write in the bundle.
+
+    With `known_chunks`, a {digest: (chunk id, claim name)} dict of the chunks of previous revisions,
+    the files are chunked and the known chunks are referenced instead of being stored again.
+    The manifest entries then also map the digests to the ids of the chunks (`chunk_digests`)
+    and the chunks to the claim name of their bundle (`chunk_claims`), to be removed before publication.
+    """
+    loop = asyncio.get_running_loop()
+
+    sources = {}
+    futures = []
+    for i, (name, path) in enumerate(files.items()):
+        if known_chunks is not None:
+            future = loop.run_in_executor(
+                executor,
+                process_file_chunked,
+                path,
+                work_dir,
+                frozenset(known_chunks),
+                key,
+                scrypt,
+                compress_level,
+            )
+        else:
+            out_path = None
+            if key is not None:
+                out_path = os.path.join(work_dir, f"{i}.enc")
+            sources[name] = out_path or path
+            future = loop.run_in_executor(
+                executor,
+                process_file,
+                path,
+                out_path,
+                key,
+                scrypt,
+                compress_level,
+            )
+        futures.append(future)
+
+    entries = await asyncio.gather(*futures)
+    manifest = [{"name": name, **entry} for name, entry in zip(files, entries)]
+
+    if known_chunks is not None:
+        sources = _merge_chunks(manifest, work_dir, known_chunks)
+    return manifest, sources
+
+
+def _merge_chunks(manifest, work_dir, known_chunks):
+    new = {}  # digest -> chunk id
+    sources = {}
+    for entry in manifest:
+        ids = []
+        for chunk in entry["chunks"]:
+            digest = chunk["digest"]
+            if digest in known_chunks:
+                ids.append(known_chunks[digest][0])
+            elif digest in new:
+                # Processed concurrently by another worker
+                ids.append(new[digest])
+            else:
+                new[digest] = chunk["id"]
+                sources[f"chunks/{chunk['id']}"] = os.path.join(work_dir, chunk["id"])
+                ids.append(chunk["id"])
+
+        entry["chunk_digests"] = {
+            c["digest"]: chunk_id for c, chunk_id in zip(entry["chunks"], ids)
+        }
+        entry["chunks"] = ids
+
+    claims = {chunk_id: claim_name for chunk_id, claim_name in known_chunks.values()}
+    for entry in manifest:
+        entry["chunk_claims"] = {
+            chunk_id: claims[chunk_id]
+            for chunk_id in entry["chunks"]
+            if chunk_id in claims
+        }
+    return sources
+
+
+def make_manifest(files, encryption=None, key=None, scrypt=None):
+    """
+    Returns the manifest.json of the entries returned by `process_files`.
+    The content fields of encrypted files are sealed with `key`, derived from a passphrase with `scrypt` if given.
+    """
+    manifest = {"version": MANIFEST_VERSION, "encryption": encryption, "files": []}
+    references = {}
+    sealed = {}
+    for entry in files:
+        entry = dict(entry)
+        # The digests of the plain chunks are only kept locally
+        entry.pop("chunk_digests", None)
+        references.update(entry.pop("chunk_claims", {}))
+        if entry["encrypted"]:
+            sealed[entry["name"]] = {
+                field: entry.pop(field) for field in SEALED_FIELDS if field in entry
+            }
+        manifest["files"].append(entry)
+
+    if any("chunks" in entry for entry in manifest["files"]):
+        manifest["chunks"] = references
+
+    if sealed:
+        if key is None:
+            raise ValueError("The manifest of encrypted files requires their key")
+        header = Header.new(KEY_SCRYPT if scrypt else KEY_RAW, scrypt=scrypt)
+        out = io.BytesIO()
+        encrypt_stream(key, io.BytesIO(json.dumps(sealed).encode()), out, header=header)
+        manifest["sealed"] = base64.b64encode(out.getvalue()).decode()
+    return json.dumps(manifest, indent=1)
+
+
+def write_bundle(zip_path, files, paths=None):
+    """
+    Writes a ZIP64 bundle of the {name: data} `files` and of the {name: (path, compress)} `paths`, streamed from disk.
+    Encrypted files should not be compressed by the archive, as they cannot shrink.
+    """
+    with zipfile.ZipFile(
+        zip_path, "w", compression=zipfile.ZIP_DEFLATED, allowZip64=True
+    ) as z:
+        for name, data in files.items():
+            z.writestr(name, data)
+
+        for name, (path, compress) in (paths or {}).items():
+            info = zipfile.ZipInfo.from_file(path, name)
+            info.compress_type = (
+                zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+            )
+            # The size in the info makes the entry ZIP64 when needed
+            with open(path, "rb") as src, z.open(info, "w") as dst:
+                shutil.copyfileobj(src, dst, READ_SIZE)
+
+
+def read_manifest(z):
+    return json.loads(z.read(MANIFEST_NAME))
+
+
+def unseal_manifest(manifest, key=None, passphrase=None, cache=None, scope=None):
+    """
+    Returns the manifest with the sealed content fields of its encrypted files, decrypted with `key` or `passphrase`
+    """
+    if "sealed" not in manifest:
+        return manifest
+
+    f = io.BytesIO(base64.b64decode(manifest["sealed"]))
+    header = Header.read(f)
+    if key is None:
+        key = passphrase_key(passphrase, header, cache, scope)
+    sealed = json.loads(b"".join(decrypt_chunks(key, f, header=header)))
+
+    unsealed = {k: v for k, v in manifest.items() if k != "sealed"}
+    unsealed["files"] = [
+        {**entry, **sealed.get(entry["name"], {})} for entry in manifest["files"]
+    ]
+    return unsealed
+
+
+def _iter_entry(f, entry, key, passphrase, cache, scope):
+    """
+    Yields the original content of a stored file or chunk
+    """
+    if entry["encrypted"]:
+        header = Header.read(f)
+        if key is None:
+            key = passphrase_key(passphrase, header, cache, scope)
+        chunks = decrypt_chunks(key, f, header=header)
+    else:
+        chunks = iter(lambda: f.read(READ_SIZE), b"")
+
+    if entry["compression"] == "chunk":
+        # A chunk of a chunked file, compressed or not as told by its first byte
+        data = b"".join(chunks)
+        if data[:1] == CHUNK_DEFLATE:
+            yield zlib.decompress(data[1:], -zlib.MAX_WBITS)
+        else:
+            yield data[1:]
+        return
+
+    if entry["compression"] != "deflate":
+        yield from chunks
+        return
+
+    yield from _inflate(chunks)
+
+
+def manifest_entry(manifest, name):
+    entry = next((e for e in manifest["files"] if e["name"] == name), None)
+    if entry is None:
+        raise KeyError(f"There is no file {name} in the bundle manifest")
+    return entry
+
+
+def _iter_plain(z, manifest, entry, key, passphrase, cache, scope, open_bundle):
+    if "chunks" not in entry:
+        with z.open(entry["name"]) as f:
+            yield from _iter_entry(f, entry, key, passphrase, cache, scope)
+        return
+    yield from _iter_chunks(
+        z, manifest, entry, key, passphrase, cache, scope, open_bundle
+    )
+
+
+def _iter_chunks(
+    z, manifest, entry, key, passphrase, cache, scope, open_bundle, first=0
+):
+    """
+    Yields the content of the chunks of a chunked file from chunk `first` on
+    """
+    name = entry["name"]
+    stored = set(z.namelist())
+    for chunk_id in entry["chunks"][first:]:
+        chunk_name = f"chunks/{chunk_id}"
+        if chunk_name in stored:
+            bundle = z
+        elif chunk_id in manifest.get("chunks", {}) and open_bundle is not None:
+            bundle = open_bundle(manifest["chunks"][chunk_id])
+        else:
+            raise IntegrityError(f"Chunk {chunk_id} of {name} cannot be found")
+
+        # Chunks may come from other bundles: they are checked against their id before being used
+        with bundle.open(chunk_name) as f:
+            stored_chunk = f.read()
+        if hashlib.sha256(stored_chunk).hexdigest() != chunk_id:
+            raise IntegrityError(f"Chunk {chunk_id} of {name} does not match its id")
+        yield from _iter_entry(
+            io.BytesIO(stored_chunk), entry, key, passphrase, cache, scope
+        )
+
+
+def iter_bundle_file(
+    z,
+    name,
+    key=None,
+    passphrase=None,
+    cache=None,
+    scope=None,
+    manifest=None,
+    open_bundle=None,
+):
+    """
+    Yields the original content of a file of an opened bundle, decrypted with `key` or `passphrase` if encrypted.
+    The digest of the content is checked against the manifest at the end of the file.
+    Chunks stored in the bundles of previous revisions are read from the ZipFile returned by `open_bundle(claim_name)`.
+    """
+    manifest = unseal_manifest(
+        manifest or read_manifest(z), key, passphrase, cache, scope
+    )
+    entry = manifest_entry(manifest, name)
+
+    h = hashlib.sha256()
+    for data in _iter_plain(
+        z, manifest, entry, key, passphrase, cache, scope, open_bundle
+    ):
+        h.update(data)
+        yield data
+
+    if h.hexdigest() != entry["sha256"]:
+        raise IntegrityError(f"The content of {name} does not match its digest")
+
+
+def read_bundle_file(z, name, **kwargs):
+    return b"".join(iter_bundle_file(z, name, **kwargs))
+
+
+def _slice(chunks, start, end, position=0):
+    """
+    Yields the bytes in [start, end) of consecutive chunks, the first of which starts at `position`
+    """
+    for data in chunks:
+        next_position = position + len(data)
+        if next_position > start:
+            yield data[max(0, start - position) : end - position]
+        position = next_position
+        if position >= end:
+            return
+
+
+def iter_bundle_range(
+    z,
+    name,
+    start=0,
+    end=None,
+    key=None,
+    passphrase=None,
+    cache=None,
+    scope=None,
+    manifest=None,
+    open_bundle=None,
+):
+    """
+    Yields the bytes in [start, end) of the original content of a file of an opened bundle.
+    Files are read from the chunk, or the sync point of deflated files, preceding the range on.
+    Files of bundles written before their manifest listed these offsets are read from their start.
+    The digest is not checked, but every decrypted chunk is authenticated.
+    """
+    manifest = unseal_manifest(
+        manifest or read_manifest(z), key, passphrase, cache, scope
+    )
+    entry = manifest_entry(manifest, name)
+    end = entry["size"] if end is None else min(end, entry["size"])
+    if start >= end:
+        return
+
+    if "chunks" in entry:
+        offsets = entry.get("chunk_offsets")
+        first = bisect.bisect_right(offsets, start) - 1 if offsets else 0
+        chunks = _iter_chunks(
+            z, manifest, entry, key, passphrase, cache, scope, open_bundle, first
+        )
+        yield from _slice(chunks, start, end, offsets[first] if offsets else 0)
+        return
+
+    if entry["compression"] != "none" and "sync_points" not in entry:
+        chunks = _iter_plain(
+            z, manifest, entry, key, passphrase, cache, scope, open_bundle
+        )
+        yield from _slice(chunks, start, end)
+        return
+
+    with z.open(name) as f:
+        if not entry["encrypted"]:
+            f.seek(start)
+            chunks = iter(lambda: f.read(READ_SIZE), b"")
+            yield from _slice(chunks, 0, end - start)
+            return
+
+        header = Header.read(f)
+        if key is None:
+            key = passphrase_key(passphrase, header, cache, scope)
+
+        if entry["compression"] == "none":
+            index = start // header.chunk_size
+            f.seek(len(header.raw) + index * (header.chunk_size + TAG_SIZE))
+            chunks = decrypt_chunks(key, f, header=header, start_chunk=index)
+            yield from _slice(chunks, start, end, index * header.chunk_size)
+            return
+
+        points = entry["sync_points"]
+        position, offset = points[
+            bisect.bisect_right([point[0] for point in points], start) - 1
+        ]
+        index = offset // header.chunk_size
+        f.seek(len(header.raw) + index * (header.chunk_size + TAG_SIZE))
+        chunks = decrypt_chunks(key, f, header=header, start_chunk=index)
+        yield from _slice(
+            _inflate(chunks, offset - index * header.chunk_size), start, end, position
+        )
+
+
+def _inflate(chunks, skip=0):
+    """
+    Yields the inflated content of the deflated data in `chunks`, from the sync point `skip` bytes in
+    """
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    for chunk in chunks:
+        if skip:
+            chunk, skip = chunk[skip:], max(0, skip - len(chunk))
+        yield decompressor.decompress(chunk)
+    yield decompressor.flush()
+
+
+def open_bundle_range(path, name, start=0, end=None, bundle_paths=None, **kwargs):
+    """
+    Same as `iter_bundle_range` for the bundle at `path`,
+    the bundles of previous revisions being at the {claim name: path} `bundle_paths`
+    """
+    bundles = {}
+
+    def open_bundle(claim_name):
+        if claim_name not in bundles:
+            bundles[claim_name] = zipfile.ZipFile(bundle_paths[claim_name])
+        return bundles[claim_name]
+
+    try:
+        with zipfile.ZipFile(path) as z:
+            yield from iter_bundle_range(
+                z, name, start, end, open_bundle=open_bundle, **kwargs
+            )
+    finally:
+        for bundle in bundles.values():
+            bundle.close()
@@ -0,0 +1,43 @@
+import asyncio
+import contextvars
+
+# Channel of the JSON-RPC call being processed, None for the default channel of the daemon
+current_channel = contextvars.ContextVar("papr_channel", default=None)
+
+
+class ChannelContext:
+    """
+    State of a channel the daemon acts as: its claim, its tokens to each review server
+    and the limit of its concurrent requests to the review servers.
+    """
+
+    __slots__ = ("name", "claim_id", "channel", "tokens", "requests", "_token_locks")
+
+    def __init__(self, name, claim_id=None, channel=None, concurrency=8):
+        self.name = name
+        self.claim_id = claim_id
+        self.channel = channel
+
+        self.tokens = {}  # review server url -> request headers
+        self.requests = asyncio.Semaphore(concurrency)
+        self._token_locks = {}
+
+    @classmethod
+    def from_claim(cls, res, concurrency=8):
+        return cls(res.claim_name, res.claim_id, res.claim.channel, concurrency)
+
+    def token_lock(self, base_url):
+        """
+        Lock held while a token is requested from a review server, so that it is requested once
+        """
+        lock = self._token_locks.get(base_url)
+        if lock is None:
+            lock = self._token_locks[base_url] = asyncio.Lock()
+        return lock
+
+    def status(self):
+        return {
+            "name": self.name,
+            "claim_id": self.claim_id,
+            "authenticated_servers": sorted(self.tokens),
+        }
@@ -0,0 +1,156 @@
+import random
+import functools
+
+# Content-defined chunking with a gear rolling hash (as in FastCDC)
+#
+# A chunk ends where the hash of the bytes before it matches a mask, so boundaries move with the content:
+# inserting or removing bytes only changes the chunks around the edit and the other chunks of a
+# revised file are identical to those of the previous revision.
+# The hash only depends on the last 64 bytes, so hashing starts just before the minimum chunk size.
+# A stricter mask is used before the average size and a looser one after it, which narrows the
+# distribution of the chunk sizes.
+# With numpy, the hashes of a block of positions are computed at once: the hash at a position is the sum of
+# GEAR[byte] << distance over the last 64 bytes, which is built by doubling the window six times.
+
+KiB = 1024
+MIN_CHUNK_SIZE = 256 * KiB
+AVG_CHUNK_SIZE = 1024 * KiB
+MAX_CHUNK_SIZE = 4096 * KiB
+
+_MASK64 = (1 << 64) - 1
+
+# Must never change: chunk boundaries, and thus deduplication between revisions, depend on it
+_rng = random.Random(0x9A9E)
+GEAR = tuple(_rng.getrandbits(64) for _ in range(256))
+del _rng
+
+
+# Number of positions hashed at once with numpy
+BLOCK_SIZE = 64 * KiB
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    try:
+        import numpy
+    except ImportError:  # Optional, install papr[numpy]
+        return None
+    return numpy
+
+
+def _mask(bits):
+    # The high bits of the hash depend on the most bytes
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+def find_boundary(
+    data,
+    min_size=MIN_CHUNK_SIZE,
+    avg_size=AVG_CHUNK_SIZE,
+    max_size=MAX_CHUNK_SIZE,
+    vectorized=True,
+):
+    """
+    Returns the size of the first chunk of `data`, which must hold at least `max_size` bytes unless it is the end of the file.
+    With `vectorized`, the hashes are computed with numpy if it is installed.
+    """
+    size = len(data)
+    if size <= min_size:
+        return size
+
+    end = min(size, max_size)
+    normal = min(avg_size, end)
+    bits = avg_size.bit_length() - 1
+    mask_strict = _mask(bits + 1)
+    mask_loose = _mask(bits - 1)
+
+    np = _numpy() if vectorized else None
+    if np is not None:
+        return _find_boundary_numpy(
+            np, data, min_size, normal, end, mask_strict, mask_loose
+        )
+
+    gear = GEAR
+    h = 0
+    for i in range(max(0, min_size - 64), min_size):
+        h = ((h << 1) + gear[data[i]]) & _MASK64
+
+    for i in range(min_size, normal):
+        h = ((h << 1) + gear[data[i]]) & _MASK64
+        if not h & mask_strict:
+            return i + 1
+
+    for i in range(normal, end):
+        h = ((h << 1) + gear[data[i]]) & _MASK64
+        if not h & mask_loose:
+            return i + 1
+
+    return end
+
+
+@functools.lru_cache(maxsize=None)
+def _gear_array(np):
+    return np.array(GEAR, dtype=np.uint64)
+
+
+def _gear_hashes(np, data, start, stop):
+    """
+    Returns the hashes at the positions [start, stop) of `data`
+    """
+    first = max(0, start - 63)
+    h = _gear_array(np)[
+        np.frombuffer(data, dtype=np.uint8, count=stop - first, offset=first)
+    ]
+    # h[i] covers the `width` bytes up to i, bytes before the start of data counting as zeros
+    width = 1
+    while width < 64:
+        shifted = np.zeros_like(h)
+        shifted[width:] = h[:-width]
+        h = (shifted << np.uint64(width)) + h
+        width *= 2
+    return h[start - first :]
+
+
+def _first_match(np, data, start, stop, mask):
+    mask = np.uint64(mask)
+    for block in range(start, stop, BLOCK_SIZE):
+        block_end = min(block + BLOCK_SIZE, stop)
+        matches = np.flatnonzero((_gear_hashes(np, data, block, block_end) & mask) == 0)
+        if matches.size:
+            return block + int(matches[0])
+    return None
+
+
+def _find_boundary_numpy(np, data, min_size, normal, end, mask_strict, mask_loose):
+    i = _first_match(np, data, min_size, normal, mask_strict)
+    if i is None:
+        i = _first_match(np, data, normal, end, mask_loose)
+    return end if i is None else i + 1
+
+
+def iter_chunks(
+    f,
+    min_size=MIN_CHUNK_SIZE,
+    avg_size=AVG_CHUNK_SIZE,
+    max_size=MAX_CHUNK_SIZE,
+    vectorized=True,
+):
+    """
+    Yields the content-defined chunks of the file-like `f`
+    """
+    buffer = bytearray()
+    eof = False
+    while True:
+        while not eof and len(buffer) < max_size:
+            data = f.read(max_size - len(buffer))
+            if data:
+                buffer += data
+            else:
+                eof = True
+
+        if not buffer:
+            return
+
+        cut = find_boundary(buffer, min_size, avg_size, max_size, vectorized)
+        yield bytes(buffer[:cut])
+        del buffer[:cut]
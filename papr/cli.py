@@ -1,8 +1,14 @@
 import os
+import sys
 import click
 import json
 import functools
-import requests
+import threading
+
+from papr.client import DEFAULT_URL
+
+# Subcommands import what they need when they run: keep the top-level imports
+# of this module cheap, they are paid on every invocation of `papr`.
 
 DEFAULT_CONFIG = {
     "blockchain_name": "lbrycrd_testnet",
@@ -10,34 +16,211 @@ DEFAULT_CONFIG = {
 }
 
 
-def call(method, **kwargs):
-    data = {"jsonrpc": "2.0", "method": method, "params": kwargs}
-    url = "http://localhost:5279/"
-    headers = {"Content-type": "application/json", "Accept": "text/plain"}
+@functools.lru_cache(maxsize=None)
+def _client(url, binary=False):
+    from papr.client import PaprClient
+
+    return PaprClient(url, binary=binary)
 
-    return requests.post(url, json=data, headers=headers)
+
+def get_client():
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or ctx.obj is None:
+        return _client(DEFAULT_URL)
+    return _client(ctx.obj["url"], ctx.obj.get("binary", False))
+
+
+def call(method, **kwargs):
+    return get_client().call(method, **kwargs)
 
 
 @click.group()
-def cli():
-    pass
+@click.option(
+    "--url",
+    default=DEFAULT_URL,
+    envvar="PAPR_DAEMON_URL",
+    help="URL of the JSON-RPC server of the papr daemon",
+)
+@click.option(
+    "--msgpack",
+    "binary",
+    is_flag=True,
+    envvar="PAPR_MSGPACK",
+    help="Encode the calls to the daemon with msgpack instead of JSON",
+)
+@click.pass_context
+def cli(ctx, url, binary):
+    ctx.obj = {"url": url, "binary": binary}
 
 
 @cli.command()
 def status():
-    resp = call("status")
+    from requests.exceptions import ConnectionError
+
+    try:
+        resp = call("status")
+    except ConnectionError:
+        print("Could not connect to the papr daemon, is it running?")
+        return "Failure"
     print(resp)
 
     return "Success"
 
 
+def read_publish_manifest(path):
+    """
+    Reads a JSON list of manuscripts to publish.
+    Each entry must contain at least `file_path` and may set any parameter of `papr_article_create`,
+    such as the list of `supplementary` files published with the manuscript.
+    """
+    with open(path) as f:
+        entries = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    for entry in entries:
+        entry["file_path"] = os.path.join(base_dir, entry["file_path"])
+        if "supplementary" in entry:
+            entry["supplementary"] = [
+                os.path.join(base_dir, p) for p in entry["supplementary"]
+            ]
+    return entries
+
+
+# Seconds between two polls of the publication progress by `papr publish`
+PROGRESS_POLL_INTERVAL = 0.5
+
+
+def publish_one(entry, progress_id, url, binary=False):
+    return _thread_client(url, binary).call(
+        "papr_article_create", progress_id=progress_id, **entry
+    )
+
+
+_local = threading.local()
+
+
+def _thread_client(url, binary=False):
+    # requests sessions are not thread-safe: each publishing thread gets its own
+    clients = getattr(_local, "clients", None)
+    if clients is None:
+        clients = _local.clients = {}
+    if (url, binary) not in clients:
+        from papr.client import PaprClient
+
+        clients[url, binary] = PaprClient(url, binary=binary)
+    return clients[url, binary]
+
+
 @cli.command()
-@click.argument("path", type=click.Path(exists=True))
+@click.argument("paths", nargs=-1, type=click.Path(exists=True))
 @click.option(
-    "--encrypt", default=False, help="Publish as an encrypted file for private review"
+    "--manifest",
+    type=click.Path(exists=True),
+    help="JSON file listing the manuscripts to publish with their metadata",
 )
-def publish(path, encrypt):
-    pass
+@click.option(
+    "--jobs",
+    "-j",
+    default=4,
+    type=click.IntRange(min=1),
+    help="Maximum number of manuscripts published at once",
+)
+@click.option(
+    "--encrypt", is_flag=True, help="Publish as an encrypted file for private review"
+)
+@click.option(
+    "--bid", "-b", default="0.0001", help="Amount of LBC to bid on each claim"
+)
+@click.option("--server", default="", help="Name of the review server")
+@click.option("--authors", default="", help="Authors of the manuscripts")
+@click.option("--tag", "tags", multiple=True, help="Tag of the manuscripts")
+@click.pass_context
+def publish(ctx, paths, manifest, jobs, encrypt, bid, server, authors, tags):
+    """
+    Publishes the manuscripts at PATHS and/or listed in the manifest, several at a time.
+    """
+    import uuid
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+    from requests.exceptions import RequestException
+
+    defaults = {
+        "bid": bid,
+        "encrypt": encrypt,
+        "server_name": server,
+        "authors": authors,
+        "tags": list(tags),
+        "abstract": "",
+    }
+
+    entries = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        entries.append({"file_path": os.path.abspath(path), "title": name})
+    if manifest:
+        entries.extend(read_publish_manifest(manifest))
+
+    if not entries:
+        print("Nothing to publish")
+        return "Success"
+
+    jobs_by_id = {}
+    for entry in entries:
+        entry = {**defaults, **entry}
+        entry.setdefault(
+            "base_claim_name",
+            os.path.splitext(os.path.basename(entry["file_path"]))[0],
+        )
+        entry.setdefault("title", entry["base_claim_name"])
+        jobs_by_id[uuid.uuid4().hex] = entry
+
+    url = ctx.obj["url"]
+    binary = ctx.obj.get("binary", False)
+    failed = 0
+    stages = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = {
+            pool.submit(publish_one, entry, progress_id, url, binary): progress_id
+            for progress_id, entry in jobs_by_id.items()
+        }
+        pending = set(futures)
+
+        while pending:
+            done, pending = wait(
+                pending, timeout=PROGRESS_POLL_INTERVAL, return_when=FIRST_COMPLETED
+            )
+
+            try:
+                progress = call(
+                    "papr_publish_progress", progress_ids=list(jobs_by_id)
+                ).get("result", {})
+            except RequestException:
+                # The publications report their own errors
+                progress = {}
+            for progress_id, info in progress.items():
+                if info and stages.get(progress_id) != info["stage"]:
+                    stages[progress_id] = info["stage"]
+                    name = jobs_by_id[progress_id]["base_claim_name"]
+                    print(f"{name}: {info['stage']}")
+
+            for future in done:
+                name = jobs_by_id[futures[future]]["base_claim_name"]
+                try:
+                    resp = future.result()
+                except Exception as e:
+                    resp = {"error": str(e)}
+
+                error = resp.get("error") or resp.get("result", {}).get("error")
+                if error:
+                    failed += 1
+                    print(f"{name}: failed ({error})")
+                else:
+                    print(f"{name}: published")
+
+    if failed:
+        print(f"{failed} of {len(jobs_by_id)} manuscript(s) could not be published")
+        return "Failure"
+    return "Success"
 
 
 @cli.command()
@@ -59,8 +242,7 @@ def create_channel(name, bid, yes):
             print("Channel creation aborted!")
             return
 
-    resp = call("channel_create", name=name, bid=bid)
-    data = resp.json()
+    data = call("channel_create", name=name, bid=bid)
 
     if "error" in data:
         if data["error"]["data"]["name"] == "InsufficientFundsError":
@@ -77,5 +259,56 @@ def create_channel(name, bid, yes):
         return "Success"
 
 
+@cli.command()
+@click.argument("path", type=click.Path(exists=True))
+@click.option(
+    "--batch-size",
+    default=100,
+    help="Maximum number of calls sent to the daemon in a single request",
+)
+def batch(path, batch_size):
+    """
+    Executes the calls of a JSONL file, one {"method": ..., "params": {...}} object per line.
+    The responses are printed as JSONL in the same order.
+    """
+
+    def read_calls():
+        with open(path) as f:
+            for number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise click.ClickException(
+                        f"Line {number} of {path} is not valid JSON: {e}"
+                    )
+                if (
+                    not isinstance(data, dict)
+                    or not isinstance(data.get("method"), str)
+                    or not isinstance(data.get("params", {}), dict)
+                ):
+                    raise click.ClickException(
+                        f'Line {number} of {path} is not a {{"method": ..., "params": {{...}}}} object'
+                    )
+                yield data["method"], data.get("params", {})
+
+    # The whole file is checked before any call is sent
+    for _ in read_calls():
+        pass
+
+    failed = 0
+    for resp in get_client().batch(read_calls(), batch_size=batch_size):
+        if "error" in resp:
+            failed += 1
+        sys.stdout.write(json.dumps(resp) + "\n")
+
+    if failed:
+        print(f"{failed} call(s) failed", file=sys.stderr)
+        return "Failure"
+    return "Success"
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,95 @@
+import itertools
+
+from papr import codec
+
+DEFAULT_URL = "http://localhost:5279/"
+DEFAULT_BATCH_SIZE = 100
+
+
+class PaprClient:
+    """
+    JSON-RPC 2.0 client for the papr daemon.
+
+    A single HTTP session is kept alive between calls and several calls can be sent in one request as a batch.
+    With `binary`, requests and responses are encoded with msgpack, which must be installed.
+    """
+
+    def __init__(self, url=DEFAULT_URL, timeout=None, binary=False):
+        import requests
+
+        self.url = url
+        self.timeout = timeout
+        self.content_type = codec.MSGPACK if binary else codec.JSON
+        if not codec.available(self.content_type):
+            raise codec.CodecError(
+                "msgpack must be installed to use the binary transport"
+            )
+
+        self.session = requests.Session()
+        self.session.headers.update(
+            {"Content-type": self.content_type, "Accept": self.content_type}
+        )
+        self._ids = itertools.count(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+
+    def _request(self, method, params=None):
+        return {
+            "jsonrpc": "2.0",
+            "id": next(self._ids),
+            "method": method,
+            "params": params or {},
+        }
+
+    def _post(self, data):
+        resp = self.session.post(
+            self.url,
+            data=codec.encode(data, self.content_type),
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        content_type = resp.headers.get("Content-Type", "").split(";")[0].strip()
+        if content_type != codec.MSGPACK:
+            content_type = codec.JSON
+        return codec.decode(resp.content, content_type)
+
+    def call(self, method, **params):
+        return self._post(self._request(method, params))
+
+    def batch(self, calls, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Sends the (method, params) pairs of `calls` as JSON-RPC batches of at most `batch_size` calls.
+        Yields the responses in the order of the calls.
+        """
+        calls = iter(calls)
+        while True:
+            requests_ = [
+                self._request(method, params)
+                for method, params in itertools.islice(calls, batch_size)
+            ]
+            if not requests_:
+                return
+
+            responses = self._post(requests_)
+            if isinstance(responses, dict):
+                # The whole batch was rejected by the daemon
+                yield from itertools.repeat(responses, len(requests_))
+                continue
+
+            by_id = {r.get("id"): r for r in responses}
+            for req in requests_:
+                yield by_id.get(
+                    req["id"],
+                    {
+                        "jsonrpc": "2.0",
+                        "id": req["id"],
+                        "error": {"message": "No response received for this call"},
+                    },
+                )
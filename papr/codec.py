@@ -0,0 +1,60 @@
+import json
+import functools
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+
+class CodecError(Exception):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def _msgpack():
+    # Imported on first use, so that JSON clients do not pay for it
+    try:
+        import msgpack
+    except ImportError:  # Optional, install papr[msgpack]
+        return None
+    return msgpack
+
+
+def available(content_type):
+    return content_type == JSON or (content_type == MSGPACK and _msgpack() is not None)
+
+
+def negotiate(accept):
+    """
+    Returns the content type of the response to a request with the given Accept header, JSON by default
+    """
+    if accept and MSGPACK in accept and _msgpack() is not None:
+        return MSGPACK
+    return JSON
+
+
+def encode(obj, content_type=JSON, default=None):
+    """
+    Serializes `obj`, calling `default` for the objects which cannot be serialized as they are
+    """
+    if content_type == MSGPACK:
+        msgpack = _msgpack()
+        if msgpack is None:
+            raise CodecError("msgpack is not installed")
+        return msgpack.packb(obj, default=default, use_bin_type=True)
+    return json.dumps(obj, default=default).encode()
+
+
+def decode(data, content_type=JSON):
+    if content_type == MSGPACK:
+        msgpack = _msgpack()
+        if msgpack is None:
+            raise CodecError("msgpack is not installed")
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except (ValueError, TypeError) as e:
+            raise CodecError(f"Invalid msgpack data: {e}")
+
+    try:
+        return json.loads(data)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise CodecError(f"Invalid JSON data: {e}")
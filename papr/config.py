@@ -5,7 +5,9 @@ import logging
 import appdirs
 
 from lbry.conf import Config as LbryConfig
-from lbry.conf import Path, String
+from lbry.conf import Path, String, Integer, Toggle
+
+from papr.constants import CHUNK_SIZE, ENCRYPTION_NUM_WORDS
 
 IS_TEST = "unittest" in sys.modules
 
@@ -14,9 +16,6 @@ if IS_TEST:
 else:
     USERDATA_DIR = appdirs.user_data_dir("papr", "papr")
 
-CHUNK_SIZE = 4096
-ENCRYPTION_NUM_WORDS = 7
-
 logger = logging.getLogger(__name__)
 
 
@@ -32,4 +31,107 @@ class Config(LbryConfig):
         metavar="DIR",
     )
 
+    database_url = String(
+        "SQLAlchemy URL of a database shared by several papr workers, instead of the local database"
+    )
+
+    worker_id = String(
+        "Identifier of this worker among those sharing the database (default: host name and process id)"
+    )
+
+    job_workers = Integer(
+        "Number of jobs run at once by this worker, 0 to only submit jobs", 1
+    )
+
+    job_lease_duration = Integer(
+        "Seconds after which a job or the background tasks of a worker which stopped responding are taken over",
+        60,
+    )
+
     active_channel = String("Channel to use for all publishing and reviewing actions")
+
+    rpc_batch_concurrency = Integer(
+        "Maximum number of calls of a JSON-RPC batch request executed concurrently", 16
+    )
+
+    tracing_file = Path(
+        "File to which finished tracing spans are appended in the OTLP/JSON lines format"
+    )
+
+    tracing_buffer_size = Integer(
+        "Number of finished tracing spans kept in memory and queryable with papr_traces",
+        4096,
+    )
+
+    log_file = Path("File to which the daemon logs are written in addition to stderr")
+
+    log_level = String("Minimum level of the logged messages", "INFO")
+
+    structured_logs = Toggle(
+        "Write the logs as JSON lines with structured fields", False
+    )
+
+    database_echo = Toggle("Log every SQL statement sent to the database", False)
+
+    review_verify_workers = Integer("Number of threads verifying review signatures", 4)
+
+    derived_key_cache_size = Integer(
+        "Number of keys derived from article encryption passphrases kept in memory",
+        64,
+    )
+
+    submission_cache_quota = Integer(
+        "Maximum number of bytes of downloaded submissions kept on disk, the least recently used being deleted first",
+        10 * 1024**3,
+    )
+
+    prefetch_concurrency = Integer(
+        "Number of submissions downloaded at once in the background", 2
+    )
+
+    prefetch_max_rate = Integer(
+        "Maximum rate in bytes per second of all the background downloads together, 0 for no limit",
+        0,
+    )
+
+    status_refresh_interval = Integer(
+        "Seconds between refreshes of the statuses of the articles, which are also refreshed on new blocks",
+        300,
+    )
+
+    server_concurrency = Integer(
+        "Number of requests made at once to each review server", 4
+    )
+
+    channel_concurrency = Integer(
+        "Number of requests made at once to the review servers on behalf of each channel",
+        8,
+    )
+
+    server_events = Toggle(
+        "Subscribe to the events of the review servers instead of polling them", True
+    )
+
+    http_cache_size = Integer(
+        "Number of review server responses cached to make conditional requests", 1024
+    )
+
+    bundle_workers = Integer(
+        "Number of processes hashing, compressing and encrypting the files of manuscript bundles (0: one per CPU)",
+        0,
+    )
+
+    bundle_compress_level = Integer(
+        "Level (0-9) of the compression of encrypted files before their encryption, 0 to disable it",
+        6,
+    )
+
+    derived_key_cache_ttl = Integer(
+        "Seconds after which a cached key derived from a passphrase is zeroed and evicted",
+        600,
+    )
+
+    config_reload_interval = Integer(
+        "Seconds between checks for changes of the configuration file, 0 to only reload it on request",
+        5,
+    )
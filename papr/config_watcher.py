@@ -0,0 +1,84 @@
+import os
+import asyncio
+import logging
+import datetime
+
+from papr.localdata import load_config
+from papr.utilities import DualLogger
+
+logger = DualLogger(logging.getLogger(__name__))
+
+
+class ConfigWatcher:
+    """
+    Checks every `interval` seconds whether the configuration file at `path` changed and, if it did,
+    passes the new configuration to `reload(config)`, a coroutine function returning a report of the reload.
+    Invalid configurations are ignored until the file changes again.
+    """
+
+    def __init__(self, path, reload, interval=5):
+        self.path = path
+        self.reload = reload
+        self.interval = interval
+
+        self.last_report = None
+        self.reloaded_at = None
+        self.error = None
+
+        self._stat = self._file_stat()
+        self._task = None
+
+    def _file_stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def start(self):
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                stat = self._file_stat()
+                if stat is None or stat == self._stat:
+                    continue
+                self._stat = stat
+                await self.check()
+            except Exception as e:
+                # Kept watching, the file may be fixed
+                self.error = f"Could not reload the configuration: {e}"
+                logger.exception("Could not reload the configuration")
+
+    async def check(self):
+        """
+        Reloads the configuration file right away
+        """
+        config = load_config(self.path)
+        if config is None:
+            self.error = f"Could not load the configuration from {self.path}"
+            return {"error": self.error}
+
+        report = await self.reload(config)
+        self.error = report.get("error")
+        if self.error is None:
+            self.last_report = report
+            self.reloaded_at = datetime.datetime.utcnow()
+        return report
+
+    def status(self):
+        return {
+            "path": self.path,
+            "reloaded_at": self.reloaded_at.isoformat() if self.reloaded_at else None,
+            "last_reload": self.last_report,
+            "error": self.error,
+        }
@@ -1,5 +1,8 @@
 import binascii
 
+CHUNK_SIZE = 4096
+ENCRYPTION_NUM_WORDS = 7
+
 # Way too small, but whatever for now
 WORDS = [
     "organic",
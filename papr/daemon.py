@@ -10,32 +10,123 @@ import zipfile
 import base64
 import json
 import binascii
+import functools
+import tempfile
+import mimetypes
+import contextlib
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 
 import aiohttp
+from aiohttp import web
 from aiohttp.web import GracefulExit
 
 from sqlalchemy import create_engine, select, func
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, joinedload
 
-from lbry.extras.daemon.daemon import Daemon, JSONRPCServerType
+from lbry.extras.daemon.daemon import Daemon, JSONRPCServerType, JSONRPCError
+from lbry.extras.daemon.json_response_encoder import JSONResponseEncoder
+from lbry.extras.daemon.security import ensure_request_allowed
 from lbry.extras.cli import ensure_directory_exists
 from lbry.extras.daemon.componentmanager import ComponentManager
 from lbry.wallet.transaction import Output
-from lbry.wallet.bip32 import PublicKey
 from lbry.crypto.crypt import better_aes_encrypt, better_aes_decrypt
 
 from papr.utilities import SECP_decrypt_text
-from papr.models import Base, Article, Manuscript, Server, Review
+from papr.models import (
+    Article,
+    Manuscript,
+    Server,
+    Review,
+    WrappedKey,
+    Chunk,
+    upgrade_schema,
+)
 from papr.config import Config, IS_TEST, CHUNK_SIZE
 from papr.exceptions import PaprException
+from papr.encryption import (
+    DecryptionError,
+    DerivedKeyCache,
+    new_content_key,
+    passphrase_encryption_key,
+    wrap_key,
+    unwrap_key,
+)
+from papr.bundle import (
+    MANIFEST_NAME,
+    process_files,
+    make_manifest,
+    write_bundle,
+    read_manifest,
+    unseal_manifest,
+    manifest_entry,
+    open_bundle_range,
+)
+from papr import codec
+from papr.payloads import (
+    PayloadError,
+    ChannelRegistration,
+    ArticleSubmission,
+    ArticleAcceptance,
+    ReviewSubmission,
+    ReviewerRecommendation,
+)
+from papr.metrics import REGISTRY as METRICS, instrument
+from papr.tracing import tracer, otlp_request
+from papr.logs import setup_logging
+from papr.verification import ReviewVerifier
+from papr.submission_cache import SubmissionCache
+from papr.prefetch import Prefetcher
+from papr.status_tracker import StatusTracker
+from papr.http_cache import HTTPCache
+from papr.events import ServerEvents, CONNECTED
+from papr.config_watcher import ConfigWatcher
+from papr.channels import ChannelContext, current_channel
+from papr.jobs import JobStore, JobWorker, LeaderElection
 from papr.utilities import (
-    generate_rsa_keys,
     generate_human_readable_passphrase,
     DualLogger,
 )
 
 logger = DualLogger(logging.getLogger(__name__))
 
+# Settings applied by reload_config without restarting the daemon
+RELOADABLE_SETTINGS = {
+    "active_channel",
+    "server_events",
+    "log_level",
+    "rpc_batch_concurrency",
+    "server_concurrency",
+    "http_cache_size",
+    "derived_key_cache_size",
+    "derived_key_cache_ttl",
+    "submission_cache_quota",
+    "prefetch_concurrency",
+    "prefetch_max_rate",
+    "status_refresh_interval",
+    "bundle_workers",
+    "bundle_compress_level",
+}
+
+# Methods which can be run as jobs by any worker, with the parameter keying their jobs:
+# jobs of the same article never run at the same time
+JOB_METHODS = {
+    "papr_article_create": "base_claim_name",
+    "papr_article_revise": "base_claim_name",
+}
+
+# Parameters of the job methods holding paths of files, read by the worker running the job
+JOB_FILE_PARAMS = ("file_path", "supplementary")
+
+ENVELOPE_CIPHER = "papr-aes256gcm-chunked-v1"
+
+# Number of files served by papr_manuscript_open at once
+MAX_OPEN_MANUSCRIPTS = 64
+
+# Number of publication progress entries kept for clients polling them
+MAX_PUBLISH_PROGRESS = 1024
+
 
 class PAPRJSONRPCServerType(JSONRPCServerType):
     def __new__(mcs, name, bases, newattrs):
@@ -54,7 +145,7 @@ class PAPRJSONRPCServerType(JSONRPCServerType):
 
             method = getattr(klass, methodname)
             if not hasattr(method, "_deprecated"):
-                klass.callable_methods.update({name: method})
+                klass.callable_methods.update({name: instrument(name, method)})
             else:
                 klass.deprecated_methods.update({name: method})
         return klass
@@ -62,67 +153,738 @@ class PAPRJSONRPCServerType(JSONRPCServerType):
 
 class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
     def __init__(
-        self, conf: Config, component_manager: typing.Optional[ComponentManager] = None
+        self,
+        conf: Config,
+        component_manager: typing.Optional[ComponentManager] = None,
+        config_path=None,
     ):
         super().__init__(conf, component_manager)
 
         if IS_TEST:
             self.engine = create_engine(
-                "sqlite+pysqlite:///:memory:", echo=True, future=True
+                "sqlite+pysqlite:///:memory:", echo=conf.database_echo, future=True
             )
         else:
+            # Workers scaled over several processes or machines share the database given by `database_url`
             self.engine = create_engine(
-                f"sqlite+pysqlite:///{conf.database_dir}/papr.sqlite",
-                echo=True,
+                conf.database_url
+                or f"sqlite+pysqlite:///{conf.database_dir}/papr.sqlite",
+                echo=conf.database_echo,
                 future=True,
             )
 
         self.conn = self.engine.connect()
-        self.channel_id = None
-        self.channel_name = None
-        self.channel = None
+        # Channels the daemon acts as, the default one unless a call sets `as_channel`
+        self.channels = {}
+        self.default_channel = None
+
+        self.http_cache = HTTPCache(conf.http_cache_size)
+        self.publish_progress = collections.OrderedDict()
+
+        upgrade_schema(self.conn)
+        self.conn.commit()
+
+        self.app.router.add_get("/papr/metrics", self.handle_papr_metrics)
+        self.app.router.add_get(
+            "/papr/manuscripts/{token}", self.handle_papr_manuscript
+        )
+        self.open_manuscripts = collections.OrderedDict()
+
+        tracer.configure(
+            max_spans=conf.tracing_buffer_size, export_path=conf.tracing_file
+        )
+
+        self.review_verifier = ReviewVerifier(
+            self.jsonrpc_resolve, workers=conf.review_verify_workers
+        )
 
-        self.headers = {}
+        self.submission_cache = SubmissionCache(
+            self.engine, conf.submission_cache_quota, self._delete_submission
+        )
+
+        self.status_tracker = StatusTracker(
+            self.engine, self._fetch_article_statuses, conf.status_refresh_interval
+        )
+
+        self.server_events = ServerEvents(
+            self.engine,
+            self._server_headers,
+            self._apply_server_event,
+            self._on_server_events_state,
+        )
+
+        self.prefetcher = Prefetcher(
+            self._get_submission,
+            concurrency=conf.prefetch_concurrency,
+            max_rate=conf.prefetch_max_rate,
+        )
 
-        Base.metadata.create_all(self.conn)
+        self.derived_keys = DerivedKeyCache(
+            conf.derived_key_cache_size, conf.derived_key_cache_ttl
+        )
+        self.bundle_pool = None
+
+        self.jobs = JobStore(self.engine, conf.worker_id, conf.job_lease_duration)
+        self.job_worker = JobWorker(self.jobs, self._run_job, conf.job_workers)
+        self.leadership = LeaderElection(
+            self.jobs, "background_tasks", self._on_leadership
+        )
+
+        self.config_watcher = None
+        if config_path is not None:
+            self.config_watcher = ConfigWatcher(
+                config_path, self.reload_config, conf.config_reload_interval
+            )
+
+    def _channel_context(self):
+        return current_channel.get() or self.default_channel
+
+    @property
+    def channel_name(self):
+        context = self._channel_context()
+        return context.name if context is not None else None
+
+    @property
+    def channel_id(self):
+        context = self._channel_context()
+        return context.claim_id if context is not None else None
+
+    @property
+    def channel(self):
+        context = self._channel_context()
+        return context.channel if context is not None else None
+
+    async def _process_rpc_call(self, data):
+        # Calls act as the default channel, or as the channel of the wallet given with `as_channel`
+        params = data.get("params")
+        name = params.pop("as_channel", None) if isinstance(params, dict) else None
+        if name is None:
+            return await super()._process_rpc_call(data)
+
+        try:
+            context = await self._load_channel(name)
+        except PaprException as e:
+            return JSONRPCError(str(e), JSONRPCError.CODE_INVALID_PARAMS)
+
+        token = current_channel.set(context)
+        try:
+            return await super()._process_rpc_call(data)
+        finally:
+            current_channel.reset(token)
 
     async def initialize(self):
         await super().initialize()
 
+        self.prefetcher.start()
+        self._schedule_pending_reviews()
+
+        self.leadership.start()
+        if self.conf.job_workers:
+            self.job_worker.start()
+
+        self.status_tracker.start()
+        if "wallet" in self.component_manager.get_components_status():
+            self.ledger.on_header.listen(
+                lambda _: self.status_tracker.on_block(self.ledger.headers.height)
+            )
+
+        if self.config_watcher is not None:
+            self.config_watcher.start()
+
         if self.conf.active_channel:
             try:
-                await self.channel_load(conf.active_channel)
+                await self.channel_load(self.conf.active_channel)
             except PaprException:
                 logger.warning(
-                    f"Could not load channel {conf.active_channel}, some features will not be available"
+                    "Could not load channel %s, some features will not be available",
+                    self.conf.active_channel,
                 )
             else:
-                logger.info(f"Channel {conf.active_channel} loaded")
+                logger.info("Channel %s loaded", self.conf.active_channel)
 
     async def stop(self):
+        if self.config_watcher is not None:
+            await self.config_watcher.stop()
+        await self.prefetcher.stop()
+        await self.job_worker.stop()
+        await self.leadership.stop()
+        await self.status_tracker.stop()
+        await self.server_events.stop()
         await super().stop()
         self.conn.close()
         self.engine.dispose()
+        tracer.flush()
+
+        self.review_verifier.close()
+        self.derived_keys.clear()
+        if self.bundle_pool is not None:
+            self.bundle_pool.shutdown(wait=False)
+
+    async def handle_old_jsonrpc(self, request):
+        body = await request.read()
+        response_type = codec.negotiate(request.headers.get("Accept"))
+        binary = request.content_type == codec.MSGPACK or response_type == codec.MSGPACK
+        if not binary and not body.lstrip().startswith(b"["):
+            return await super().handle_old_jsonrpc(request)
+
+        # The checks of the base handler: the origin of the request is checked once for the whole batch,
+        # the others are made for each call by _process_rpc_call
+        ensure_request_allowed(request, self.conf)
+
+        request_type = (
+            codec.MSGPACK if request.content_type == codec.MSGPACK else codec.JSON
+        )
+        if not codec.available(request_type):
+            return web.Response(status=415, text="msgpack is not installed")
+
+        try:
+            calls = codec.decode(body, request_type)
+        except codec.CodecError:
+            calls = None
+
+        semaphore = asyncio.Semaphore(self.conf.rpc_batch_concurrency)
+        if isinstance(calls, dict):
+            responses = await self._process_batch_call(calls, semaphore)
+        elif not calls or not isinstance(calls, list):
+            responses = self._batch_error(None, "Invalid batch request")
+        else:
+            responses = await asyncio.gather(
+                *(self._process_batch_call(data, semaphore) for data in calls)
+            )
+            # Notifications (calls without id) do not get a response
+            responses = [r for r in responses if r is not None]
+
+        ledger = None
+        if "wallet" in self.component_manager.get_components_status():
+            ledger = self.ledger
+
+        if response_type == codec.MSGPACK:
+            return web.Response(
+                body=codec.encode(
+                    responses,
+                    codec.MSGPACK,
+                    default=JSONResponseEncoder(ledger=ledger).default,
+                ),
+                content_type=codec.MSGPACK,
+            )
+        return web.Response(
+            text=json.dumps(responses, cls=JSONResponseEncoder, ledger=ledger),
+            content_type="application/json",
+        )
 
-    async def channel_load(self, name):
+    async def handle_papr_metrics(self, request):
+        return web.Response(
+            text=METRICS.to_prometheus(),
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    async def handle_papr_manuscript(self, request):
+        opened = self.open_manuscripts.get(request.match_info["token"])
+        if opened is None:
+            raise web.HTTPNotFound()
+
+        size = opened["size"]
+        try:
+            requested = request.http_range
+        except ValueError:
+            raise web.HTTPRequestRangeNotSatisfiable(
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+
+        start, end = requested.start or 0, requested.stop or size
+        if start < 0:  # Suffix range
+            start = max(0, size + start)
+        end = min(end, size)
+        partial = "Range" in request.headers
+        if partial and start >= size:
+            raise web.HTTPRequestRangeNotSatisfiable(
+                headers={"Content-Range": f"bytes */{size}"}
+            )
+
+        response = web.StreamResponse(status=206 if partial else 200)
+        response.content_type = opened["content_type"]
+        response.content_length = max(0, end - start)
+        response.headers["Accept-Ranges"] = "bytes"
+        if partial:
+            response.headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        await response.prepare(request)
+
+        # Chunks are read and decrypted in the executor one at a time, so that only one is held in memory
+        loop = asyncio.get_running_loop()
+        chunks = open_bundle_range(
+            opened["path"],
+            opened["name"],
+            start,
+            end,
+            bundle_paths=opened["bundle_paths"],
+            key=opened["key"],
+            passphrase=opened["passphrase"],
+            cache=self.derived_keys,
+            scope=opened["claim_name"],
+            manifest=opened["manifest"],
+        )
+        try:
+            while True:
+                data = await loop.run_in_executor(None, next, chunks, None)
+                if data is None:
+                    break
+                await response.write(data)
+        finally:
+            await loop.run_in_executor(None, chunks.close)
+
+        await response.write_eof()
+        return response
+
+    async def papr_manuscript_open(
+        self,
+        claim_name,
+        file_name=None,
+        passphrase=None,
+        wrapped_key=None,
+        sender_public_key=None,
+    ):
+        """
+        Downloads a submission and serves one of its files (the manuscript by default) at the returned URL of the API server.
+        The file is decrypted chunk by chunk as it is read, without writing plaintext to disk, and range requests allow seeking in it.
+        Encrypted files are decrypted with `passphrase`, or with the content key wrapped for the loaded channel: in the bundle,
+        or given with `wrapped_key` and `sender_public_key` as returned by papr_article_share to the sharing author.
+        """
+        bundle = await self._download_bundle(claim_name)
+        if "error" in bundle:
+            return bundle
+        path, manifest, keys = bundle["path"], bundle["manifest"], bundle["keys"]
+
+        if file_name is None:
+            file_name = next(
+                (
+                    e["name"]
+                    for e in manifest["files"]
+                    if e["name"].startswith("Manuscript_")
+                ),
+                None,
+            )
+        try:
+            entry = manifest_entry(manifest, file_name)
+        except KeyError:
+            return logger.error(f"Submission {claim_name} has no file {file_name}")
+
+        key = None
+        if entry["encrypted"] and manifest["encryption"] == "envelope":
+            key = await self._unwrap_bundle_key(
+                claim_name, keys, wrapped_key, sender_public_key
+            )
+            if isinstance(key, dict):
+                return key
+        elif entry["encrypted"] and passphrase is None:
+            return logger.error(
+                f"A passphrase is required to open {file_name} of {claim_name}"
+            )
+
+        # The sizes and digests of encrypted files are only readable with their key
+        try:
+            manifest = await asyncio.get_running_loop().run_in_executor(
+                None,
+                unseal_manifest,
+                manifest,
+                key,
+                passphrase,
+                self.derived_keys,
+                claim_name,
+            )
+        except DecryptionError as e:
+            return logger.error(f"Could not decrypt the manifest of {claim_name}: {e}")
+        entry = manifest_entry(manifest, file_name)
+
+        # Chunks may be stored in the bundles of previous revisions, which are published by the same channel
+        others = set(manifest.get("chunks", {}).values())
+        if others:
+            channel_id = await self._signing_channel_id(claim_name)
+            for other in others:
+                if (
+                    channel_id is None
+                    or await self._signing_channel_id(other) != channel_id
+                ):
+                    return logger.error(
+                        f"Submission {claim_name} uses chunks of {other}, which was not published by the same channel"
+                    )
+
+        bundle_paths = {}
+        for other in others:
+            other_bundle = await self._download_bundle(other)
+            if "error" in other_bundle:
+                return other_bundle
+            bundle_paths[other] = other_bundle["path"]
+
+        token = os.urandom(16).hex()
+        self.open_manuscripts[token] = {
+            "claim_name": claim_name,
+            "path": path,
+            "name": file_name,
+            "size": entry["size"],
+            "content_type": mimetypes.guess_type(file_name)[0]
+            or "application/octet-stream",
+            "manifest": manifest,
+            "bundle_paths": bundle_paths,
+            "key": key,
+            "passphrase": passphrase,
+        }
+        while len(self.open_manuscripts) > MAX_OPEN_MANUSCRIPTS:
+            self.open_manuscripts.popitem(last=False)
+
+        return {
+            "token": token,
+            "url": f"http://{self.conf.api_host}:{self.conf.api_port}/papr/manuscripts/{token}",
+            "file_name": file_name,
+            "size": entry["size"],
+            "files": [e["name"] for e in manifest["files"]],
+        }
+
+    async def papr_manuscript_close(self, token):
+        """
+        Stops serving a file opened with papr_manuscript_open.
+        """
+        if self.open_manuscripts.pop(token, None) is None:
+            return logger.error(f"No opened manuscript with token {token}")
+        return {"closed": token}
+
+    async def _download_bundle(self, claim_name):
+        await self.prefetcher.wait(claim_name)
+        res = await self._get_submission(claim_name)
+        if "error" in res:
+            return res
+
+        def read(path):
+            with zipfile.ZipFile(path) as z:
+                names = z.namelist()
+                if MANIFEST_NAME not in names:
+                    return None, None
+                keys = json.loads(z.read("keys.json")) if "keys.json" in names else None
+                return read_manifest(z), keys
+
+        path = res["download_path"]
+        manifest, keys = await asyncio.get_running_loop().run_in_executor(
+            None, read, path
+        )
+        if manifest is None:
+            return logger.error(
+                f"Submission {claim_name} was published before bundles had a manifest and cannot be opened"
+            )
+        return {"path": path, "manifest": manifest, "keys": keys}
+
+    async def _signing_channel_id(self, claim_name):
+        hits = await self.jsonrpc_resolve(claim_name)
+        claim = hits.get(claim_name)
+        if not isinstance(claim, Output) or claim.signing_channel is None:
+            return None
+        return claim.signing_channel.claim_id
+
+    async def _unwrap_bundle_key(
+        self, claim_name, keys, wrapped_key=None, sender_public_key=None
+    ):
+        # Keys shared after the publication (see papr_article_share) are not in the bundle
+        keys = keys or {}
+        if wrapped_key is None:
+            wrapped_key = keys.get("recipients", {}).get(self.channel_name)
+        if wrapped_key is None:
+            return logger.error(
+                f"The key of {claim_name} was not shared with channel {self.channel_name}"
+            )
+        sender_public_key = sender_public_key or keys.get("sender_public_key")
+        if sender_public_key is None:
+            return logger.error(
+                f"The public key of the channel which shared the key of {claim_name} is required"
+            )
+
+        channel_keys = await self._channel_keys()
+        if channel_keys is None:
+            return logger.error(f"Could not find channel {self.channel_name}")
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, unwrap_key, channel_keys[0], sender_public_key, wrapped_key
+            )
+        except Exception as e:
+            return logger.error(
+                f"Could not unwrap the key of {claim_name} for channel {self.channel_name}: {e}"
+            )
+
+    async def papr_http_cache_status(self):
+        """
+        Returns the number of cached review server responses and how many requests they answered.
+        """
+        return self.http_cache.stats()
+
+    async def papr_metrics(self, reset=False):
+        """
+        Returns the number of calls, the number of errors and the latency histogram of every JSON-RPC method called since startup.
+        Also exposed in the Prometheus text format at /papr/metrics.
+        """
+        metrics = METRICS.to_dict()
+        if reset:
+            METRICS.reset()
+        return metrics
+
+    async def papr_traces(self, trace_id=None, name=None, limit=100, otlp=False):
+        """
+        Returns the most recent tracing spans, optionally only those of a trace or with a given name.
+        With `otlp`, the spans are returned as an OTLP/JSON ExportTraceServiceRequest.
+        """
+        spans = tracer.query(trace_id=trace_id, name=name, limit=limit)
+        if otlp:
+            return otlp_request(spans)
+        return [span.to_dict() for span in spans]
+
+    @staticmethod
+    def _batch_error(call_id, message):
+        return {
+            "jsonrpc": "2.0",
+            "id": call_id,
+            "error": {"code": JSONRPCError.CODE_INVALID_REQUEST, "message": message},
+        }
+
+    async def _process_batch_call(self, data, semaphore):
+        if not isinstance(data, dict):
+            return self._batch_error(None, "Invalid call in batch request")
+
+        params = data.get("params", {})
+        if isinstance(params, dict):
+            params.pop("include_protobuf", None)
+
+        async with semaphore:
+            result = await self._process_rpc_call(data)
+
+        if "id" not in data:
+            return None
+
+        if isinstance(result, JSONRPCError):
+            return {"jsonrpc": "2.0", "id": data["id"], "error": result.to_dict()}
+        return {"jsonrpc": "2.0", "id": data["id"], "result": result}
+
+    async def _find_channel(self, name):
         tx = await self.jsonrpc_channel_list()
         for res in tx["items"]:
             if res.claim_name == name:
-                self.channel_id = res.claim_id
-                self.channel_name = res.claim_name
-                self.channel = res.claim.channel
-                break
+                return res
+        raise PaprException(f"Could not find channel {name}")
+
+    def _add_channel(self, res):
+        context = self.channels.get(res.claim_name)
+        if context is None:
+            context = ChannelContext.from_claim(res, self.conf.channel_concurrency)
+            self.channels[res.claim_name] = context
+        return context
+
+    async def _load_channel(self, name):
+        """
+        Returns the context of a channel of the wallet, loading it on first use
+        """
+        context = self.channels.get(name)
+        if context is None:
+            context = self._add_channel(await self._find_channel(name))
+        return context
+
+    def _set_channel(self, res):
+        self.default_channel = None if res is None else self._add_channel(res)
+        self._sync_server_events()
+
+    async def channel_load(self, name):
+        """
+        Makes a channel of the wallet the default channel of the calls
+        """
+        self._set_channel(await self._find_channel(name))
+
+    async def papr_channels(self):
+        """
+        Returns the default channel and the channels the daemon acted as, with the review servers they are authenticated to.
+        Calls act as another channel of the wallet with the `as_channel` parameter.
+        """
+        return {
+            "default": self.channel_name,
+            "channels": [context.status() for context in self.channels.values()],
+        }
+
+    async def reload_config(self, conf):
+        """
+        Applies the settings of `conf` which can be changed while the daemon runs, all at once.
+        Returns the names of the reloaded settings and of the changed settings which require a restart.
+        """
+        changed = [
+            setting.name
+            for setting in Config.get_settings()
+            if getattr(conf, setting.name) != getattr(self.conf, setting.name)
+        ]
+        reloaded = [name for name in changed if name in RELOADABLE_SETTINGS]
+        restart_required = [name for name in changed if name not in reloaded]
+
+        # What can fail is done before any setting is changed
+        channel = None
+        if "active_channel" in reloaded and conf.active_channel:
+            try:
+                channel = await self._find_channel(conf.active_channel)
+            except PaprException as e:
+                return logger.error(f"Configuration not reloaded: {e}")
+
+        for name in reloaded:
+            setattr(self.conf, name, getattr(conf, name))
+        for name in reloaded:
+            self._apply_setting(name, channel)
+
+        if reloaded:
+            logger.info("Reloaded settings %s", ", ".join(reloaded))
+        if restart_required:
+            logger.warning(
+                "Settings %s changed, the daemon must be restarted to apply them",
+                ", ".join(restart_required),
+            )
+        return {"reloaded": reloaded, "restart_required": restart_required}
+
+    def _apply_setting(self, name, channel=None):
+        conf = self.conf
+        if name == "active_channel":
+            self._set_channel(channel)
+            if conf.server_events:
+                # Subscriptions are authenticated with the token of the channel
+                asyncio.ensure_future(self._restart_server_events())
+        elif name == "server_events":
+            if conf.server_events:
+                self._sync_server_events()
+            else:
+                asyncio.ensure_future(self.server_events.stop())
+        elif name == "log_level":
+            logging.getLogger().setLevel(conf.log_level)
+        elif name == "http_cache_size":
+            self.http_cache.max_entries = conf.http_cache_size
+        elif name == "derived_key_cache_size":
+            self.derived_keys.max_size = conf.derived_key_cache_size
+        elif name == "derived_key_cache_ttl":
+            self.derived_keys.ttl = conf.derived_key_cache_ttl
+        elif name == "submission_cache_quota":
+            self.submission_cache.quota = conf.submission_cache_quota
+            asyncio.ensure_future(self.submission_cache.evict())
+        elif name == "prefetch_concurrency":
+            self.prefetcher.resize(conf.prefetch_concurrency)
+        elif name == "prefetch_max_rate":
+            self.prefetcher.max_rate = conf.prefetch_max_rate
+        elif name == "status_refresh_interval":
+            self.status_tracker.interval = conf.status_refresh_interval
+        elif name == "bundle_workers":
+            # Created again on next use, running jobs finish in the previous pool
+            if self.bundle_pool is not None:
+                self.bundle_pool.shutdown(wait=False)
+                self.bundle_pool = None
+        # The other settings are read when they are used
+
+    async def _restart_server_events(self):
+        await self.server_events.stop()
+        self._sync_server_events()
+
+    def _sync_server_events(self):
+        # Only the leader subscribes, the other workers read the statuses it stores
+        if self.conf.server_events and self.leadership.is_leader:
+            self.server_events.sync()
+
+    def _on_leadership(self, is_leader):
+        self.status_tracker.following = not is_leader
+        if is_leader:
+            self._sync_server_events()
         else:
-            raise PaprException(f"Could not find channel {name}")
+            asyncio.ensure_future(self.server_events.stop())
+
+    async def papr_job_submit(self, method, params=None):
+        """
+        Queues a call to be run by any of the workers sharing the database, such as the publication of an article,
+        as the channel given with `as_channel` in `params` or as the channel of this call. Returns the id of the job, whose state and result are returned by `papr_job_status`.
+        The files given in `params` are read by the worker running the job: the workers must share the storage
+        holding them, under the same paths.
+        """
+        if method not in JOB_METHODS:
+            return logger.error(
+                f"Method {method} cannot be run as a job, use one of {', '.join(sorted(JOB_METHODS))}"
+            )
+        params = params or {}
+        if not isinstance(params, dict):
+            return logger.error("The parameters of a job must be a dict")
+
+        for name in JOB_FILE_PARAMS:
+            paths = params.get(name) or []
+            for path in [paths] if isinstance(paths, str) else paths:
+                if not os.path.isabs(path) or not os.path.isfile(path):
+                    return logger.error(
+                        f"The file {path} of the job must be given by an absolute path on the storage shared by the workers"
+                    )
+
+        # Run as the channel of this call, not the default channel of the worker claiming the job
+        params = {"as_channel": self.channel_name, **params}
+        job_id = self.jobs.submit(method, params, key=params.get(JOB_METHODS[method]))
+        return {"job_id": job_id}
+
+    async def papr_job_status(self, job_id):
+        """
+        Returns the state of a job, the worker running it and its result or error once finished.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return logger.error(f"No job with id {job_id}")
+        return job
+
+    async def papr_job_list(self, state=None, limit=100):
+        """
+        Returns the latest jobs, optionally only those in `state` (queued, running, done or failed).
+        """
+        return self.jobs.list(state, limit)
+
+    async def papr_workers(self):
+        """
+        Returns the id of this worker, the jobs it runs and whether it runs the background tasks.
+        """
+        return {
+            **self.job_worker.status(),
+            "leader": self.leadership.is_leader,
+        }
+
+    async def _run_job(self, method, params):
+        name = params.pop("as_channel", None)
+        if name is not None:
+            try:
+                # Jobs run in their own task
+                current_channel.set(await self._load_channel(name))
+            except PaprException as e:
+                return {"error": str(e)}
+
+        res = await getattr(self, method)(**params)
+        ledger = None
+        if "wallet" in self.component_manager.get_components_status():
+            ledger = self.ledger
+        # Stored as JSON
+        return json.loads(json.dumps(res, cls=JSONResponseEncoder, ledger=ledger))
+
+    async def papr_config_reload(self):
+        """
+        Reloads the configuration file. Returns the settings which were reloaded and those which
+        changed but require a restart of the daemon.
+        """
+        if self.config_watcher is None:
+            return logger.error("The daemon was not started from a configuration file")
+        return await self.config_watcher.check()
+
+    async def papr_config_status(self):
+        """
+        Returns the time and the result of the last reload of the configuration file.
+        """
+        if self.config_watcher is None:
+            return logger.error("The daemon was not started from a configuration file")
+        return self.config_watcher.status()
 
     async def verify_claim_free(self, name):
         hits = await self.jsonrpc_resolve(name)
 
         if not isinstance(hits[name], Output):
-            logger.info(f"Found no claim with name {name}")
+            logger.info("Found no claim with name %s", name)
             return True
 
-        logger.warning(f"Found claim(s) with name {name}")
+        logger.warning("Found claim(s) with name %s", name)
 
         return False
 
@@ -133,7 +895,8 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
         hits = await self.jsonrpc_resolve(channel_name)
 
         if not isinstance(hits[channel_name], Output):
-            return logger.info(f"Found no claim with name {channel_name}")
+            logger.info("Found no claim with name %s", channel_name)
+            return {"info": f"Found no claim with name {channel_name}"}
 
         tpub_hex = hits[channel_name].claim.channel.public_key
         tpub = base64.b64encode(bytes.fromhex(tpub_hex)).decode()
@@ -145,13 +908,11 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
         if self.channel_name is None:
             return logger.error(f"Cannot register to the server, no channel is loaded")
 
-        payload = {
-            "channel_name": self.channel_name,
-        }
+        payload = ChannelRegistration(self.channel_name)
 
         async with aiohttp.ClientSession() as session:
             async with session.post(
-                f"{url}/api/channel/register", json=payload
+                f"{url}/api/channel/register", json=payload.to_dict()
             ) as resp:
                 status_code = resp.status
                 data = await resp.json()
@@ -162,8 +923,11 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
                 session.add(server)
                 session.commit()
                 logger.info(
-                    f"Added server {server.name} ({server.channel_name}) to the list of known servers!"
+                    "Added server %s (%s) to the list of known servers!",
+                    server.name,
+                    server.channel_name,
                 )
+            self._sync_server_events()
         else:
             return logger.error(
                 f"Could not register to {url}, received status code {status_code}"
@@ -171,27 +935,107 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
 
         return data
 
-    async def papr_review_create(self, submission_claim_name, review_text=""):
-        sub_claim = await self.jsonrpc_get(submission_claim_name)
+    async def _get_submission(self, claim_name, throttle=None):
+        """
+        Returns the path of a downloaded submission, downloading it to the submission cache if needed.
+        With `throttle`, the submission is read from the streaming server of the SDK, awaiting `throttle(nbytes)`
+        after each chunk, instead of being saved by the SDK at full speed.
+        """
+        path = self.submission_cache.lookup(claim_name)
+        if path is not None:
+            return {"download_path": path}
+
+        res = await self.jsonrpc_get(
+            claim_name,
+            download_directory=self.conf.review_dir,
+            save_file=throttle is None,
+        )
+        if isinstance(res, dict):
+            return logger.error(f"Could not download {claim_name}: {res['error']}")
 
-        if "error" in sub_claim:
-            return logger.error(
-                f"Failed to resolve submission {submission_claim_name}: {sub_claim['error']}"
-            )
+        if throttle is None:
+            await res.finished_writing.wait()
+            download_path = res.download_path
+        else:
+            download_path = os.path.join(self.conf.review_dir, res.file_name)
+            try:
+                await self._stream_to_file(res.stream_url, download_path, throttle)
+            except (aiohttp.ClientError, OSError) as e:
+                return logger.error(f"Could not download {claim_name}: {e}")
+
+        self.submission_cache.add(claim_name, download_path)
+        await self.submission_cache.evict(keep=claim_name)
+        return {"download_path": download_path}
+
+    @staticmethod
+    async def _stream_to_file(url, path, throttle):
+        # Written to a temporary file so that an interrupted download is never taken for a submission
+        partial = f"{path}.part"
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url) as resp:
+                    resp.raise_for_status()
+                    with open(partial, "wb") as f:
+                        async for chunk in resp.content.iter_any():
+                            f.write(chunk)
+                            await throttle(len(chunk))
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+
+    async def _delete_submission(self, claim_name, path):
+        await self.jsonrpc_file_delete(
+            delete_from_download_dir=True, claim_name=claim_name
+        )
+        if os.path.isfile(path):
+            os.remove(path)
+        self.prefetcher.discard(claim_name)
+
+    async def papr_submission_cache_status(self):
+        """
+        Returns the size, quota, hit rate and evictions of the cache of downloaded submissions.
+        Submissions with a review which was not sent yet are pinned.
+        """
+        return self.submission_cache.stats()
+
+    async def papr_submission_cache_evict(self, claim_name=None, quota=None):
+        """
+        Evicts a downloaded submission, or the least recently used ones until they fit in `quota` bytes
+        (by default the configured quota). Pinned submissions are never evicted.
+        """
+        evicted = await self.submission_cache.evict(quota=quota, claim_name=claim_name)
+        return {"evicted": evicted, **self.submission_cache.stats()}
 
-        submission = sub_resolve["result"][submission_claim_name]
+    async def papr_review_create(
+        self, submission_claim_name, review_text="", deadline=None
+    ):
+        """
+        Creates the review of a submission, which is then downloaded in the background.
+        `deadline` is the ISO 8601 date by which the review is due, used to prioritize the downloads.
+        """
+        if deadline is not None:
+            deadline = datetime.datetime.fromisoformat(deadline)
+
+        hits = await self.jsonrpc_resolve(submission_claim_name)
+        if not isinstance(hits.get(submission_claim_name), Output):
+            return logger.error(f"Failed to resolve submission {submission_claim_name}")
+        # Same format as the resolve JSON-RPC method
+        submission = json.loads(
+            json.dumps(hits, cls=JSONResponseEncoder, ledger=self.ledger)
+        )[submission_claim_name]
 
         submission_ts = submission["timestamp"]
         submission_date = datetime.datetime.utcfromtimestamp(submission_ts)
 
         if "author" not in submission["value"]:
-            logger.warning(f"No author list for {submission_claim_name}")
+            logger.warning("No author list for %s", submission_claim_name)
             submission_authors = "Unknown"
         else:
             submission_authors = submission["value"]["author"]
 
         if "author" not in submission["value"]:
-            logger.warning(f"No title for {submission_claim_name}")
+            logger.warning("No title for %s", submission_claim_name)
             submission_title = "Untitled"
         else:
             submission_title = submission["value"]["title"]
@@ -211,11 +1055,43 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
                 submission_authors=submission_authors,
                 submission_date=submission_date,
                 review_text=review_text,
+                deadline=deadline,
             )
             session.add(review)
             session.commit()
 
-        logger.info(f"Review created for submission {submission_claim_name}")
+        logger.info("Review created for submission %s", submission_claim_name)
+
+        prefetch = self.prefetcher.schedule(submission_claim_name, deadline)
+        return {
+            "submission_claim_name": submission_claim_name,
+            "prefetch": prefetch.to_dict(),
+        }
+
+    async def papr_prefetch(self, claim_name, deadline=None):
+        """
+        Downloads a submission (e.g. newly assigned for review) in the background, by order of deadline (ISO 8601 date).
+        """
+        if deadline is not None:
+            deadline = datetime.datetime.fromisoformat(deadline)
+        return self.prefetcher.schedule(claim_name, deadline).to_dict()
+
+    async def papr_prefetch_status(self, claim_names=None):
+        """
+        Returns the state (queued, downloading, ready or failed) of the background downloads of submissions.
+        """
+        return self.prefetcher.status(claim_names)
+
+    def _schedule_pending_reviews(self):
+        with Session(self.engine) as session:
+            reviews = session.execute(
+                select(Review).where(Review.review_date.is_(None))
+            ).scalars()
+            for review in reviews:
+                if review.submission_claim_name:
+                    self.prefetcher.schedule(
+                        review.submission_claim_name, review.deadline
+                    )
 
     async def papr_review_save(
         self, reviewed_submission_claim_name: str, text: str, rating: int
@@ -230,75 +1106,122 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
 
             session.commit()
 
-        logger.info(f"Review of {reviewed_submission_claim_name} saved")
+        logger.info("Review of %s saved", reviewed_submission_claim_name)
 
     async def papr_review_send(
         self, reviewed_submission_claim_name: str, server_channel_name: str
     ):
-        with Session(self.engine) as session:
-            review = session.execute(
-                select(Review).filter_by(
-                    submission_claim_name=reviewed_submission_claim_name
-                )
-            ).scalar_one()
-            server = session.execute(
-                select(Server).filter_by(channel_name=server_channel_name)
-            ).scalar_one()
-
-            full_review = f"Review for submission {review.submission_name} ({review.submission_claim_name}) by {review.submission_authors_name} ({review.submission_channel_name})"
-            review_hex = binascii.hexlify(full_review.encode("UTF-8")).decode("UTF-8")
-
-            signed = await self.jsonrpc_channel_sign(
-                channel_name=self.channel_name, hexdata=review_hex
-            )
+        with tracer.span(
+            "review_send",
+            submission=reviewed_submission_claim_name,
+            server=server_channel_name,
+        ) as span:
+            with Session(self.engine) as session:
+                review = session.execute(
+                    select(Review).filter_by(
+                        submission_claim_name=reviewed_submission_claim_name
+                    )
+                ).scalar_one()
+                server = session.execute(
+                    select(Server).filter_by(channel_name=server_channel_name)
+                ).scalar_one()
 
-            review.signature = signed["signature"]
-            review.signing_ts = datetime.datetime.utcfromtimestamp(signed["signing_ts"])
-            session.commit()
+                full_review = f"Review for submission {review.submission_name} ({review.submission_claim_name}) by {review.submission_authors_name} ({review.submission_channel_name})"
+                review_hex = binascii.hexlify(full_review.encode("UTF-8")).decode(
+                    "UTF-8"
+                )
 
-            link = f"{server.url}/api/review/submit"
+                with tracer.span("review_send.sign", bytes=len(full_review)):
+                    signed = await self.jsonrpc_channel_sign(
+                        channel_name=self.channel_name, hexdata=review_hex
+                    )
 
-        # TODO: encrypt for server?
-        payload = {
-            "manuscript": review.submission_claim_name,
-            "rating": review.review_rating,  # Add to review so that it is signed
-            "review": full_review,
-            "signature": signed["signature"],
-            "signing_ts": signed["signing_ts"],
-        }
+                review.signature = signed["signature"]
+                review.signing_ts = datetime.datetime.utcfromtimestamp(
+                    signed["signing_ts"]
+                )
+                session.commit()
 
-        async with aiohttp.ClientSession() as session:  # wrapper to handle token
-            async with session.post(link, json=payload) as resp:
-                status_code = resp.status
-                if status_code == 201:
-                    logger.info(
-                        f"Review of {reviewed_submission_claim_name} accepted by {server_channel_name}"
+                link = f"{server.url}/api/review/submit"
+                review_id = review.id
+
+                # TODO: encrypt for server?
+                try:
+                    payload = ReviewSubmission(
+                        review.submission_claim_name,
+                        review.review_rating,  # Add to review so that it is signed
+                        full_review,
+                        signed["signature"],
+                        signed["signing_ts"],
                     )
-                else:
-                    text = await resp.text()
+                except PayloadError as e:
                     return logger.error(
-                        f"Error while submitting the review of {reviewed_submission_claim_name} to {server_channel_name}\nStatus code: {status_code}\nReason: {text['reason']}"
+                        f"Cannot submit the review of {reviewed_submission_claim_name}: {e}"
                     )
 
-    async def papr_review_verify(review, channel_name):
+            async with aiohttp.ClientSession() as session:  # wrapper to handle token
+                async with session.post(link, json=payload.to_dict()) as resp:
+                    status_code = resp.status
+                    span.set_attribute("status_code", status_code)
+                    if status_code == 201:
+                        logger.info(
+                            "Review of %s accepted by %s",
+                            reviewed_submission_claim_name,
+                            server_channel_name,
+                        )
+                    else:
+                        text = await resp.text()
+                        return logger.error(
+                            f"Error while submitting the review of {reviewed_submission_claim_name} to {server_channel_name}\nStatus code: {status_code}\nReason: {text}"
+                        )
+
+            # The submission is no longer pinned in the submission cache
+            with Session(self.engine) as session:
+                session.get(Review, review_id).review_date = datetime.datetime.now()
+                session.commit()
+
+    async def papr_review_verify(self, review, channel_name):
         """
         Verifies that a review has been signed by the expected channel.
+        Returns {"valid": bool}, with an `error` key when the review could not be checked.
         Used by: Server
         """
+        res = await self.papr_review_verify_many(
+            [{**review, "channel_name": channel_name}]
+        )
+        return res[0]
 
-        # TODO: use channel_id to further verify the claim
-
-        signature = binascii.unhexlify(review["signature"].encode())
+    async def papr_review_verify_many(self, reviews):
+        """
+        Verifies a batch of reviews, each with the keys `review`, `signature`, `signing_ts`, `channel_name` and optionally `channel_id`.
+        Returns a list of {"valid": bool} dicts in the same order, with an `error` key when a review could not be checked.
+        Used by: Server
+        """
+        with tracer.span("review_verify_many", reviews=len(reviews)):
+            return await self.review_verifier.verify_many(reviews)
 
-        ext_reviewer_chan = await daemon.jsonrpc_resolve(channel_name)
-        res = ext_reviewer_chan[channel_name]
+    async def papr_review_verify_status(self):
+        """
+        Returns the state of the channel public key and verified signature caches.
+        """
+        return self.review_verifier.stats()
 
-        pubkey = PublicKey.from_compressed(res.claim.channel.public_key_bytes)
-        digest = sha256(
-            review["signing_ts"].encode() + res.claim_hash + review["review"].encode()
-        )
+    async def papr_key_cache_status(self):
+        """
+        Returns the state of the cache of keys derived from the encryption passphrases of the articles.
+        """
+        return self.derived_keys.stats()
 
-        return pubkey.verify(signature, digest)
+    async def papr_key_cache_evict(self, base_claim_name=None):
+        """
+        Zeroes and removes the cached keys derived from the passphrase of an article, or of all articles.
+        Copies of the keys in use by running calls are not zeroed.
+        """
+        if base_claim_name is None:
+            self.derived_keys.clear()
+        else:
+            self.derived_keys.evict(base_claim_name)
+        return self.derived_keys.stats()
 
     async def papr_reviewround_publish(self, sub_name, sub_channel_id, encrypt=True):
         """
@@ -325,6 +1248,31 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
 
         return tx
 
+    def _set_publish_progress(self, progress_id, stage, **info):
+        if progress_id is None:
+            return
+
+        self.publish_progress[progress_id] = {
+            "stage": stage,
+            "timestamp": datetime.datetime.utcnow().timestamp(),
+            **info,
+        }
+        self.publish_progress.move_to_end(progress_id)
+
+        while len(self.publish_progress) > MAX_PUBLISH_PROGRESS:
+            self.publish_progress.popitem(last=False)
+
+    async def papr_publish_progress(self, progress_ids=None):
+        """
+        Returns the current stage of the publications started with the given progress ids (all known publications by default).
+        """
+        if progress_ids is None:
+            return dict(self.publish_progress)
+        return {
+            progress_id: self.publish_progress.get(progress_id)
+            for progress_id in progress_ids
+        }
+
     async def _publish_manuscript(
         self,
         base_claim_name,
@@ -337,22 +1285,100 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
         revision=0,
         encrypt=True,
         ignore_duplicate_names=False,
+        progress_id=None,
+        supplementary=None,
+    ):
+        with tracer.span(
+            "publish_manuscript",
+            base_claim_name=base_claim_name,
+            revision=revision,
+            encrypt=encrypt,
+        ) as span:
+            try:
+                ret = await self._do_publish_manuscript(
+                    base_claim_name,
+                    bid,
+                    file_path,
+                    title,
+                    abstract,
+                    authors,
+                    tags,
+                    revision=revision,
+                    encrypt=encrypt,
+                    ignore_duplicate_names=ignore_duplicate_names,
+                    progress_id=progress_id,
+                    supplementary=supplementary,
+                )
+            except Exception as e:
+                self._set_publish_progress(progress_id, "failed", error=str(e))
+                raise
+
+            if isinstance(ret, dict):
+                span.error = ret.get("error")
+                self._set_publish_progress(progress_id, "failed", **ret)
+            else:
+                span.set_attribute("txid", ret.id)
+                self._set_publish_progress(progress_id, "done", txid=ret.id)
+        return ret
+
+    def _bundle_executor(self):
+        # Created on first use. The workers are spawned rather than forked from the threaded daemon.
+        if self.bundle_pool is None:
+            self.bundle_pool = ProcessPoolExecutor(
+                max_workers=self.conf.bundle_workers or None,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self.bundle_pool
+
+    @contextlib.contextmanager
+    def _publish_stage(self, progress_id, stage, claim_name=None, **attributes):
+        """
+        Reports the publication stage to progress pollers and traces it as a span
+        """
+        if claim_name is None:
+            self._set_publish_progress(progress_id, stage)
+        else:
+            self._set_publish_progress(progress_id, stage, claim_name=claim_name)
+            attributes["claim_name"] = claim_name
+
+        with tracer.span(f"publish_manuscript.{stage}", **attributes) as span:
+            yield span
+
+    async def _do_publish_manuscript(
+        self,
+        base_claim_name,
+        bid,
+        file_path,
+        title,
+        abstract,
+        authors,
+        tags,
+        revision=0,
+        encrypt=True,
+        ignore_duplicate_names=False,
+        progress_id=None,
+        supplementary=None,
     ):
 
         if not os.path.isfile(file_path):
             return logger.error(
                 f"Cannot create a new manuscript: file {file_path} does not exist"
             )
-            return
 
-        raw_file = b""
-        with open(file_path, "rb") as raw:
-            while True:
-                chunk = raw.read(CHUNK_SIZE)
+        supplementary = supplementary or []
+        for path in supplementary:
+            if not os.path.isfile(path):
+                return logger.error(
+                    f"Cannot create a new manuscript: supplementary file {path} does not exist"
+                )
 
-                if chunk == b"":
-                    break
-                raw_file += chunk
+        names = [os.path.basename(path) for path in supplementary]
+        if len(set(names)) != len(names):
+            return logger.error(
+                "Cannot create a new manuscript: supplementary files must have distinct names"
+            )
+
+        loop = asyncio.get_running_loop()
 
         with Session(self.engine) as session:
             article = session.execute(
@@ -379,12 +1405,53 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
                         f"No server given for publishing the unreviewed manuscript {claim_name}"
                     )
 
-            if encrypt:
-                processed_file = better_aes_encrypt(
-                    article.encryption_passphrase, raw_file
+            files = {f"Manuscript_{claim_name}.pdf": file_path}  # pdf hardcoded
+            for path in supplementary:
+                files[f"supplementary/{os.path.basename(path)}"] = path
+
+            bundle_files = {
+                "server.json": json.dumps(article.review_server.information)
+            }
+            key = scrypt = encryption = content_key = None
+            if encrypt and article.envelope_encryption:
+                # The files are encrypted with a random content key,
+                # which is then wrapped for each recipient
+                encryption = "envelope"
+                content_key = new_content_key()
+                if article.chunked:
+                    # Revisions share chunks, and thus their key
+                    previous = [
+                        m.content_key for m in article.manuscripts if m.content_key
+                    ]
+                    if previous:
+                        content_key = base64.b64decode(previous[-1])
+                key = content_key
+                keys = await self._wrap_content_key_for_server(
+                    content_key, article.review_server
                 )
-            else:
-                processed_file = raw_file
+                if "error" in keys:
+                    return keys
+                bundle_files["keys.json"] = json.dumps(keys)
+            elif encrypt:
+                encryption = "passphrase"
+                key, scrypt = await loop.run_in_executor(
+                    None,
+                    functools.partial(
+                        passphrase_encryption_key,
+                        article.encryption_passphrase,
+                        cache=self.derived_keys,
+                        scope=article.base_claim_name,
+                    ),
+                )
+
+            known_chunks = None
+            if article.chunked:
+                chunks = session.execute(
+                    select(Chunk).filter_by(
+                        article_id=article.id, encryption=encryption
+                    )
+                ).scalars()
+                known_chunks = {c.digest: (c.chunk_id, c.claim_name) for c in chunks}
 
             zip_path = os.path.join(self.conf.submission_dir, claim_name + ".zip")
 
@@ -394,37 +1461,80 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
                 )
 
             if not ignore_duplicate_names:
-                is_free = await self.verify_claim_free(claim_name)
+                with self._publish_stage(
+                    progress_id, "verifying", claim_name=claim_name
+                ):
+                    is_free = await self.verify_claim_free(claim_name)
 
                 if not is_free:
                     return logger.error(
                         f"Cannot submit manuscript: another claim with this name exists"
                     )
 
-            with zipfile.ZipFile(zip_path, "w") as z:
-                z.writestr(
-                    f"Manuscript_{claim_name}.pdf", processed_file
-                )  # pdf hardcoded
-                z.writestr("server.json", json.dumps(article.review_server.information))
+            # The files are hashed, compressed and encrypted in parallel by worker processes,
+            # then streamed into the bundle
+            with tempfile.TemporaryDirectory(dir=self.conf.submission_dir) as work_dir:
+                with self._publish_stage(
+                    progress_id,
+                    "processing",
+                    claim_name=claim_name,
+                    files=len(files),
+                    bytes=sum(os.path.getsize(path) for path in files.values()),
+                    chunked=known_chunks is not None,
+                ) as span:
+                    manifest, sources = await process_files(
+                        files,
+                        work_dir,
+                        executor=self._bundle_executor(),
+                        key=key,
+                        scrypt=scrypt,
+                        compress_level=self.conf.bundle_compress_level,
+                        known_chunks=known_chunks,
+                    )
+                    if known_chunks is not None:
+                        span.set_attribute("new_chunks", len(sources))
+                bundle_files[MANIFEST_NAME] = make_manifest(
+                    manifest, encryption, key, scrypt
+                )
+
+                with self._publish_stage(
+                    progress_id, "packaging", claim_name=claim_name, files=len(files)
+                ):
+                    await loop.run_in_executor(
+                        None,
+                        write_bundle,
+                        zip_path,
+                        bundle_files,
+                        {
+                            name: (path, encryption is None)
+                            for name, path in sources.items()
+                        },
+                    )
 
             # Thumbnail
             try:
-                tx = await self.jsonrpc_stream_create(  # explicit review server request
-                    claim_name,
-                    bid,
-                    file_path=zip_path,
-                    title=title,
-                    author=authors,
-                    description=abstract,
-                    tags=tags,
-                    channel_id=self.channel_id,
-                    channel_name=self.channel_name,
-                )
+                with self._publish_stage(
+                    progress_id,
+                    "publishing",
+                    claim_name=claim_name,
+                    bytes=os.path.getsize(zip_path),
+                ):
+                    tx = await self.jsonrpc_stream_create(  # explicit review server request
+                        claim_name,
+                        bid,
+                        file_path=zip_path,
+                        title=title,
+                        author=authors,
+                        description=abstract,
+                        tags=tags,
+                        channel_id=self.channel_id,
+                        channel_name=self.channel_name,
+                    )
             except Exception as e:
                 session.rollback()
                 return logger.error(f"Could not submit the document: {str(e)}")
 
-            logger.info(f"Manuscript published as {claim_name}!")
+            logger.info("Manuscript published as %s!", claim_name)
 
             _tags = ";".join(tags)
             man = Manuscript(
@@ -440,65 +1550,303 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
                 txid=tx.id,
                 txhash=tx.hash,
             )
+            if content_key is not None:
+                man.content_key = base64.b64encode(content_key).decode()
+                for recipient, wrapped_key in keys["recipients"].items():
+                    man.wrapped_keys.append(
+                        WrappedKey(
+                            recipient_channel_name=recipient,
+                            recipient_public_key=article.review_server.public_key,
+                            wrapped_key=wrapped_key,
+                            creation_date=datetime.datetime.utcnow(),
+                        )
+                    )
+            if known_chunks is not None:
+                # The new chunks of this bundle can be referenced by the next revisions
+                for entry in manifest:
+                    for digest, chunk_id in entry["chunk_digests"].items():
+                        if digest in known_chunks:
+                            continue
+                        known_chunks[digest] = (chunk_id, claim_name)
+                        session.add(
+                            Chunk(
+                                article=article,
+                                digest=digest,
+                                chunk_id=chunk_id,
+                                claim_name=claim_name,
+                                encryption=encryption,
+                            )
+                        )
             session.add(man)
             session.add(article)
 
-            session.commit()
+            with tracer.span("publish_manuscript.db_commit", claim_name=claim_name):
+                session.commit()
 
         return tx
 
-    async def _get_api_token(self, base_url):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{base_url}/api/token/{self.channel_name}") as resp:
-                if resp.status != 200:
-                    raise Exception(
-                        f"Could not get token from API server at {base_url}/api/token/{self.channel_name}"
-                    )
-                data = await resp.json()
-
+    async def _channel_keys(self, channel_name=None):
+        """
+        Returns the private and public SECP256k1 keys of a channel of the wallet as base64 strings
+        """
+        channel_name = channel_name or self.channel_name
         chans = (await self.jsonrpc_channel_list())["items"]
         for c in chans:
-            if c.claim_name == self.channel_name:
-                private_pem = c.private_key.to_pem()
-                break
-        else:
+            if c.claim_name == channel_name:
+                return (
+                    base64.b64encode(c.private_key.to_pem()).decode(),
+                    base64.b64encode(c.private_key.public_key.pubkey_bytes).decode(),
+                )
+        return None
+
+    async def _wrap_content_key(self, content_key, recipient_public_keys):
+        """
+        Wraps a content key for each recipient of the {channel name: base64 public key} dict
+        """
+        keys = await self._channel_keys()
+        if keys is None:
             return logger.error(
-                f"Could not find channel {self.channel_name} in the channel list, authentication to API server aborted..."
+                f"Could not find channel {self.channel_name} in the channel list, cannot wrap the content key"
             )
+        private_key, public_key = keys
 
-        # Inflates the private key... could be marginally more efficient
-        private_key = base64.b64encode(private_pem).decode()
+        loop = asyncio.get_running_loop()
+        recipients = {}
+        for recipient, recipient_public_key in recipient_public_keys.items():
+            recipients[recipient] = await loop.run_in_executor(
+                None, wrap_key, private_key, recipient_public_key, content_key
+            )
 
-        self.token_access = SECP_decrypt_text(
-            private_key, data["pub_key"], data["access"]
-        )
+        return {
+            "cipher": ENVELOPE_CIPHER,
+            "sender": self.channel_name,
+            "sender_public_key": public_key,
+            "recipients": recipients,
+        }
 
-        # The refresh token should be used too
-        self.token_refresh = SECP_decrypt_text(
-            private_key, data["pub_key"], data["refresh"]
+    async def _wrap_content_key_for_server(self, content_key, server):
+        if server is None or not server.public_key:
+            return logger.error(
+                "Cannot use envelope encryption: the review server public key is unknown"
+            )
+        return await self._wrap_content_key(
+            content_key, {server.channel_name: server.public_key}
         )
 
-        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {str(self.token_access)}"}
+    async def papr_article_share(self, base_claim_name, channel_name, claim_name=None):
+        """
+        Gives a channel (e.g. a reviewer) access to an envelope-encrypted revision of an article (the latest unless `claim_name` is given).
+        Only the content key of the revision is wrapped for the channel: the bundle is not re-encrypted.
+        The recipient opens the revision by giving the returned `wrapped_key` and `sender_public_key` to papr_manuscript_open.
+        """
+        pubkey = await self.macro_get_public_key(channel_name)
+        if "public_key" not in pubkey:
+            return logger.error(
+                f"Cannot share article {base_claim_name}: channel {channel_name} not found"
+            )
+
+        with Session(self.engine) as session:
+            article = session.execute(
+                select(Article).filter_by(base_claim_name=base_claim_name)
+            ).scalar_one_or_none()
+
+            if article is None or not article.manuscripts:
+                return logger.error(
+                    f"Cannot share article {base_claim_name}: no such article found"
+                )
+
+            if claim_name is None:
+                manuscript = article.latest_manuscript
+            else:
+                manuscript = next(
+                    (m for m in article.manuscripts if m.claim_name == claim_name),
+                    None,
+                )
+                if manuscript is None:
+                    return logger.error(
+                        f"Cannot share article {base_claim_name}: it has no manuscript {claim_name}"
+                    )
+
+            if not manuscript.content_key:
+                return logger.error(
+                    f"Cannot share {manuscript.claim_name}: it is not envelope-encrypted"
+                )
+
+            keys = await self._wrap_content_key(
+                base64.b64decode(manuscript.content_key),
+                {channel_name: pubkey["public_key"]},
+            )
+            if "error" in keys:
+                return keys
+
+            wrapped = WrappedKey(
+                recipient_channel_name=channel_name,
+                recipient_public_key=pubkey["public_key"],
+                wrapped_key=keys["recipients"][channel_name],
+                creation_date=datetime.datetime.utcnow(),
+            )
+            manuscript.wrapped_keys.append(wrapped)
+            session.commit()
+
+            return {
+                "claim_name": manuscript.claim_name,
+                "cipher": keys["cipher"],
+                "sender": keys["sender"],
+                "sender_public_key": keys["sender_public_key"],
+                "recipient": channel_name,
+                "wrapped_key": wrapped.wrapped_key,
+            }
+
+    async def _get_api_token(self, base_url):
+        """
+        Requests a token of the current channel from a review server
+        """
+        context = self._channel_context()
+        if context is None:
+            return logger.error(
+                f"Cannot authenticate to {base_url}, no channel is loaded"
+            )
+
+        with tracer.span("http.get_api_token", url=base_url):
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    f"{base_url}/api/token/{self.channel_name}"
+                ) as resp:
+                    if resp.status != 200:
+                        raise Exception(
+                            f"Could not get token from API server at {base_url}/api/token/{self.channel_name}"
+                        )
+                    data = await resp.json()
+
+        keys = await self._channel_keys()
+        if keys is None:
+            return logger.error(
+                f"Could not find channel {self.channel_name} in the channel list, authentication to API server aborted..."
+            )
+
+        private_key, _ = keys
+
+        token_access = SECP_decrypt_text(private_key, data["pub_key"], data["access"])
+
+        # The refresh token (data["refresh"]) should be used too
 
-    async def _get_url(self, base_url, suburl):
-        if self.headers == {}:
-            error = await self._get_api_token(base_url)
-            if error:
-                return error
+        context.tokens[base_url] = {"HTTP_AUTHORIZATION": f"Bearer {str(token_access)}"}
 
+    async def _server_headers(self, base_url, renew=False):
+        """
+        Returns the headers authenticating the current channel to a review server, requesting a token if needed
+        """
+        context = self._channel_context()
+        if context is None:
+            return logger.error(
+                f"Cannot authenticate to {base_url}, no channel is loaded"
+            )
+
+        if renew:
+            context.tokens.pop(base_url, None)
+        async with context.token_lock(base_url):
+            if base_url not in context.tokens:
+                try:
+                    error = await self._get_api_token(base_url)
+                except Exception as e:
+                    error = {"error": str(e)}
+                if error:
+                    return error
+        return context.tokens[base_url]
+
+    def _on_server_events_state(self, server_id, state):
+        # Articles of servers pushing their events are not polled
+        if state == CONNECTED:
+            self.status_tracker.pushed_servers.add(server_id)
+        else:
+            self.status_tracker.pushed_servers.discard(server_id)
+
+    async def _apply_server_event(self, server_id, event):
+        """
+        Updates the status of an article after a review round, decision or reviewer assignment event.
+        The status is taken from the event if it contains it, otherwise it is fetched.
+        """
+        data = event.json()
+        if not isinstance(data, dict) or "base_claim_name" not in data:
+            return
+        base_claim_name = data["base_claim_name"]
+
+        with Session(self.engine) as session:
+            article = session.execute(
+                select(Article).filter_by(
+                    base_claim_name=base_claim_name, review_server_id=server_id
+                )
+            ).scalar_one_or_none()
+            if article is None:
+                return
+            status = {
+                "reviewed": article.reviewed,
+                "revision": article.revision,
+                "review_server": article.review_server.name,
+            }
+
+        logger.debug("Received %s event for article %s", event.type, base_claim_name)
+        if "status" in data:
+            status["article"] = data["status"]
+            self.status_tracker.apply(base_claim_name, status)
+        else:
+            await self.status_tracker.refresh([base_claim_name])
+
+    async def papr_server_events(self):
+        """
+        Returns the state of the event subscription to each review server.
+        """
+        return self.server_events.status()
+
+    async def _conditional_get(self, session, url, headers):
+        """
+        Gets `url`, conditionally if a response is cached, and returns the status, the parsed body and the text
+        of the response, and whether it was answered from the cache.
+        A 304 response to a request made before its cached response was evicted is requested again unconditionally.
+        """
+        requests = self._channel_context().requests
+        validators = self.http_cache.validators(url, headers)
+        while True:
+            async with requests, session.get(
+                url, headers={**headers, **validators}
+            ) as resp:
+                status = resp.status
+                if status == 304 and validators:
+                    cached = self.http_cache.get(url, headers)
+                    if cached is not None:
+                        return 200, cached[0], cached[1], True
+                else:
+                    msg = await resp.text()
+                    data = _parse_json(msg)
+                    if status == 200:
+                        self.http_cache.store(url, headers, resp.headers, data, msg)
+                    return status, data, msg, False
+            validators = {}
+
+    async def _get_url(self, base_url, suburl, session=None):
+        headers = await self._server_headers(base_url)
+        if "error" in headers:
+            return headers
+
+        if session is None:
+            async with aiohttp.ClientSession() as session:
+                return await self._get_url(base_url, suburl, session)
+
+        url = f"{base_url}{suburl}"
+        status = None
         for attempt in range(2):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        f"{base_url}{suburl}",
-                        headers=self.headers,
-                    ) as resp:
-                        msg = await resp.text()
-                        data = await resp.json()
-                        status = resp.status
+                with tracer.span("http.get", url=url, attempt=attempt) as span:
+                    status, data, msg, not_modified = await self._conditional_get(
+                        session, url, headers
+                    )
+                    span.set_attribute("status_code", status)
+                    span.set_attribute("not_modified", not_modified)
+                    span.set_attribute("bytes", len(msg))
                 if (
                     status == 401
-                    and data["detail"].find(
+                    and isinstance(data, dict)
+                    and data.get("detail", "").find(
                         "Authentication credentials were not provided."
                     )
                     != -1
@@ -508,17 +1856,19 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
                             "error": f"Could not authenticate and get {base_url}",
                             "status_code": status,
                         }
-                    error = await self._get_api_token(base_url)
-                    if error:
-                        return error
-                    else:
-                        continue
+                    headers = await self._server_headers(base_url, renew=True)
+                    if "error" in headers:
+                        return headers
+                    continue
 
                 if status in [200, 201, 204]:
-                    return {"status_code": resp.status, "json": data, "content": msg}
+                    return {"status_code": status, "json": data, "content": msg}
             except aiohttp.client_exceptions.ClientConnectionError:
                 logger.info(
-                    f"Error while trying to get {base_url}{suburl}  (Code {status})..."
+                    "Error while trying to get %s%s (Code %s)...",
+                    base_url,
+                    suburl,
+                    status,
                 )
 
         else:
@@ -528,25 +1878,31 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
             }
 
     async def _post_to_url(self, base_url, suburl, payload):
-        if self.headers == {}:
-            error = await self._get_api_token(base_url)
-            if error:
-                return error
+        headers = await self._server_headers(base_url)
+        if "error" in headers:
+            return headers
 
+        requests = self._channel_context().requests
         for attempt in range(2):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                        f"{base_url}{suburl}",
-                        json=payload,
-                        headers=self.headers,
-                    ) as resp:
-                        msg = await resp.text()
-                        data = await resp.json()
-                        status = resp.status
+                with tracer.span(
+                    "http.post", url=f"{base_url}{suburl}", attempt=attempt
+                ) as span:
+                    async with requests, aiohttp.ClientSession() as session:
+                        async with session.post(
+                            f"{base_url}{suburl}",
+                            json=payload,
+                            headers=headers,
+                        ) as resp:
+                            msg = await resp.text()
+                            data = _parse_json(msg)
+                            status = resp.status
+                    span.set_attribute("status_code", status)
+                    span.set_attribute("bytes", len(msg))
                 if (
                     status == 401
-                    and data["detail"].find(
+                    and isinstance(data, dict)
+                    and data.get("detail", "").find(
                         "Authentication credentials were not provided."
                     )
                     != -1
@@ -558,17 +1914,23 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
                             ),
                             "status_code": status,
                         }
-                    error = await self._get_api_token(base_url)
-                    if error:
-                        return error
-                    else:
-                        continue
+                    headers = await self._server_headers(base_url, renew=True)
+                    if "error" in headers:
+                        return headers
+                    continue
 
                 if status in [200, 201, 204]:
-                    return {"status_code": resp.status, **data}
+                    # No content for 204 responses
+                    return {
+                        "status_code": status,
+                        **(data if isinstance(data, dict) else {}),
+                    }
             except aiohttp.client_exceptions.ClientConnectionError:
                 logger.info(
-                    f"Error while trying to post to {base_url}{suburl}  (Code {status})..."
+                    "Error while trying to post to %s%s (Code %s)...",
+                    base_url,
+                    suburl,
+                    status,
                 )
 
         else:
@@ -597,15 +1959,22 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
                     f"Cannot send a review request for article {article_claim} to server {server_name}: no such server found"
                 )
 
-            payload = {
-                "title": article.title,
-                "article": article.base_claim_name,
-                "claim_name": article.latest_manuscript.claim_name,
-                "authors": article.authors,
-                "corresponding_author": article.channel_name,
-                "revision": article.revision,
-            }
-            return await self._post_to_url(server.url, "/api/article/submit", payload)
+            try:
+                payload = ArticleSubmission(
+                    article.title,
+                    article.base_claim_name,
+                    article.latest_manuscript.claim_name,
+                    article.authors,
+                    article.channel_name,
+                    article.revision,
+                )
+            except PayloadError as e:
+                return logger.error(
+                    f"Cannot send a review request for article {article_claim}: {e}"
+                )
+            return await self._post_to_url(
+                server.url, "/api/article/submit", payload.to_dict()
+            )
 
     async def papr_article_create(
         self,
@@ -618,7 +1987,19 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
         tags,
         server_name="",
         encrypt=False,
+        envelope=False,
+        progress_id=None,
+        supplementary=None,
+        chunked=False,
     ):
+        """
+        Creates an article and publishes its first manuscript.
+        With `encrypt`, the manuscript is encrypted with a passphrase returned in `encryption_passphrase`,
+        or with `envelope` too, with a random key wrapped for the review server (see papr_article_share).
+        `supplementary` lists paths of files (data, code, figures...) published in the same bundle.
+        With `chunked`, files are split in content-defined chunks and the bundles of the revisions only
+        contain the chunks which changed, referencing the others in the bundles of previous revisions.
+        """
 
         # serverless?
 
@@ -664,7 +2045,10 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
             article.review_passphrase = generate_human_readable_passphrase()
             ret["review_passphrase"] = article.review_passphrase
 
-            if encrypt:
+            article.chunked = chunked
+            if encrypt and envelope:
+                article.envelope_encryption = True
+            elif encrypt:
                 article.encryption_passphrase = generate_human_readable_passphrase()
                 ret["encryption_passphrase"] = article.encryption_passphrase
 
@@ -681,6 +2065,8 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
             tags,
             revision=0,
             encrypt=encrypt,
+            progress_id=progress_id,
+            supplementary=supplementary,
         )
 
         if isinstance(tx, dict):
@@ -700,6 +2086,8 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
         authors,
         tags,
         encrypt=False,
+        progress_id=None,
+        supplementary=None,
     ):
         with Session(self.engine) as session:
             article = session.execute(
@@ -723,6 +2111,8 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
             tags=tags,
             revision=rev,
             encrypt=encrypt,
+            progress_id=progress_id,
+            supplementary=supplementary,
         )
 
         if isinstance(tx, dict):
@@ -746,25 +2136,31 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
 
             article.reviewed = True
             article.revision = 1
+            # Accepted articles are no longer encrypted
+            self.derived_keys.evict(base_claim_name)
 
-            payload = {
-                "base_claim_name": article.base_claim_name,
-                "channel_name": article.channel_name,
-                "review_passphrase": article.review_passphrase,
-                "revision": article.revision,
-                "title": article.title,
-                "abstract": article.abstract,
-                "authors": article.authors,
-                "tags": article.tags,
-            }
-
-            if article.encryption_passphrase:
-                payload["encryption_passphrase"] = article.encryption_passphrase
+            try:
+                payload = ArticleAcceptance(
+                    article.base_claim_name,
+                    article.channel_name,
+                    article.review_passphrase,
+                    article.revision,
+                    article.title,
+                    article.abstract,
+                    article.authors,
+                    article.tags,
+                    encryption_passphrase=article.encryption_passphrase or None,
+                )
+            except PayloadError as e:
+                session.rollback()
+                return logger.error(
+                    f"Cannot send the acceptance of {base_claim_name}: {e}"
+                )
 
             # get server
             async with aiohttp.ClientSession() as session:
                 async with session.post(
-                    f"{article.review_server.url}/accept", json=payload
+                    f"{article.review_server.url}/accept", json=payload.to_dict()
                 ) as resp:
                     status_code = resp.status
                     msg = await resp.text()
@@ -778,42 +2174,152 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
             session.add(article)
             session.commit()
 
-        return logger.info(
-            f"Sent review acceptance of article {article.base_claim_name} to the server"
+        logger.info(
+            "Sent review acceptance of article %s to the server", base_claim_name
         )
+        return {
+            "info": f"Sent review acceptance of article {base_claim_name} to the server"
+        }
 
-    async def papr_article_status(
-        self,
-        base_claim_name,
-    ):
-        with Session(self.engine) as session:
-            article = session.execute(
-                select(Article).filter_by(base_claim_name=base_claim_name)
-            ).scalar_one_or_none()
-
-            if article is None:
+    async def papr_article_status(self, base_claim_name, refresh=False):
+        """
+        Returns the status of an article, as last fetched from its review server by the status tracker,
+        with its age (`refreshed_at`, `age` in seconds and whether it is `stale`).
+        The status is fetched right away with `refresh`, or if it was never fetched.
+        """
+        status = None if refresh else self.status_tracker.get(base_claim_name)
+        if status is None:
+            statuses = await self.status_tracker.refresh([base_claim_name])
+            status = statuses[base_claim_name]
+            if status is None:
                 return logger.error(
-                    f"Cannot revise the article with claim name {base_claim_name}: such an article does not exists"
+                    f"Could not get the status of article {base_claim_name}: {self._status_error(base_claim_name)}"
                 )
+        return status
 
-            status = {
-                "reviewed": article.reviewed,
-                "revision": article.revision,
-                "review_server": article.review_server.name,
-            }
-            server_status = await self._get_url(
-                article.review_server.url, f"/api/article/status/{base_claim_name}"
+    async def papr_article_status_many(self, base_claim_names=None, refresh=False):
+        """
+        Returns the statuses of several articles (all the articles with a review server by default) by base claim name,
+        as `papr_article_status` does. The statuses that were never fetched, or all of them with `refresh`,
+        are fetched with concurrent requests to each review server. Statuses that could not be fetched are an `error`.
+        """
+        if base_claim_names is None:
+            base_claim_names = self.status_tracker.tracked()
+
+        statuses = {
+            name: None if refresh else self.status_tracker.get(name)
+            for name in base_claim_names
+        }
+        missing = [name for name, status in statuses.items() if status is None]
+        if missing:
+            statuses.update(await self.status_tracker.refresh(missing))
+
+        for name, status in statuses.items():
+            if status is None:
+                statuses[name] = {
+                    "error": f"Could not get the status of article {name}: {self._status_error(name)}"
+                }
+        return statuses
+
+    def _status_error(self, base_claim_name):
+        # The statuses of articles which are not local are not kept
+        entry = self.status_tracker.statuses.get(base_claim_name)
+        if entry is None:
+            return f"No article with claim name {base_claim_name}"
+        return entry["error"]
+
+    async def _fetch_article_statuses(self, base_claim_names):
+        statuses = {
+            name: {"error": f"No article with claim name {name}"}
+            for name in base_claim_names
+        }
+        # Statuses are requested as the channel of each article
+        by_server = collections.defaultdict(list)
+
+        with Session(self.engine) as session:
+            articles = session.execute(
+                select(Article)
+                .where(Article.base_claim_name.in_(base_claim_names))
+                .options(joinedload(Article.review_server))
+            ).scalars()
+
+            for article in articles:
+                if article.review_server is None:
+                    statuses[article.base_claim_name] = {
+                        "error": f"Article {article.base_claim_name} has no review server"
+                    }
+                    continue
+                by_server[article.review_server.url, article.channel_name].append(
+                    {
+                        "base_claim_name": article.base_claim_name,
+                        "reviewed": article.reviewed,
+                        "revision": article.revision,
+                        "review_server": article.review_server.name,
+                    }
+                )
+
+        # The requests to a server are limited whatever the channels they are made as
+        semaphores = {
+            server_url: asyncio.Semaphore(self.conf.server_concurrency)
+            for server_url, _ in by_server
+        }
+        await asyncio.gather(
+            *(
+                self._fetch_server_statuses(
+                    server_url, channel_name, articles, statuses, semaphores[server_url]
+                )
+                for (server_url, channel_name), articles in by_server.items()
             )
-            status["article"] = server_status["json"]
-        return status
+        )
+        return statuses
+
+    async def _fetch_server_statuses(
+        self, server_url, channel_name, articles, statuses, semaphore
+    ):
+        """
+        Fetches the statuses of articles from their review server over one HTTP session, as their channel,
+        with at most `server_concurrency` requests at once to the server
+        """
+        if channel_name is not None and channel_name != self.channel_name:
+            try:
+                # Runs in its own task, the default channel of the other tasks is kept
+                current_channel.set(await self._load_channel(channel_name))
+            except PaprException as e:
+                # Not requested as another channel, which may not be allowed to see the article
+                for article in articles:
+                    statuses[article["base_claim_name"]] = {
+                        "error": f"Could not load channel {channel_name} of article {article['base_claim_name']}: {e}"
+                    }
+                return
+
+        headers = await self._server_headers(server_url)
+        if "error" in headers:
+            for article in articles:
+                statuses[article["base_claim_name"]] = headers
+            return
+
+        async def fetch(session, status):
+            name = status.pop("base_claim_name")
+            async with semaphore:
+                server_status = await self._get_url(
+                    server_url, f"/api/article/status/{name}", session
+                )
+            if "error" in server_status:
+                statuses[name] = server_status
+            else:
+                status["article"] = server_status["json"]
+                statuses[name] = status
+
+        async with aiohttp.ClientSession() as session:
+            await asyncio.gather(*(fetch(session, article) for article in articles))
 
     async def _get_article_review_server(self, claim_name):
-        res = await self.jsonrpc_get(claim_name)
+        res = await self._get_submission(claim_name)
 
-        if isinstance(res, dict):
-            return logger.error(f"Could not resolve {claim_name}: {res['error']}")
+        if "error" in res:
+            return res
 
-        with zipfile.ZipFile(res.download_path) as z:
+        with zipfile.ZipFile(res["download_path"]) as z:
             zipped_files = z.namelist()
             if "server.json" not in zipped_files:
                 return logger.error(
@@ -850,26 +2356,29 @@ class PaprDaemon(Daemon, metaclass=PAPRJSONRPCServerType):
         # Add reason text possibly
         # Add recommendation degree
 
-        payload = {
-            "article": "_".join(claim_name.split("_")[:-1]),
-            "reviewer_name": reviewer_name,
-        }
-
-        if reviewer_channel:
-            payload["reviewer"] = reviewer_channel
-
-        if reviewer_email:
-            # Currently would not work
-            payload["reviewer_email"] = reviewer_email
-
-        if not self.headers:
-            self._get_api_token(server_data["url"])
+        try:
+            payload = ReviewerRecommendation(
+                "_".join(claim_name.split("_")[:-1]),
+                reviewer_name,
+                reviewer=reviewer_channel or None,
+                # Currently would not work
+                reviewer_email=reviewer_email or None,
+            )
+        except PayloadError as e:
+            return logger.error(f"Cannot submit reviewer recommendation: {e}")
 
         return await self._post_to_url(
-            server_data["url"], "/api/review/recommend", payload
+            server_data["url"], "/api/review/recommend", payload.to_dict()
         )
 
 
+def _parse_json(text):
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
 def run_daemon(daemon):
     loop = asyncio.get_event_loop()
 
@@ -894,7 +2403,7 @@ def run_daemon(daemon):
         loop.run_until_complete(loop.shutdown_asyncgens())
 
 
-def run_from_args(args):
+def run_from_args(args, config_path=None):
     conf = Config(**args)
 
     for directory in (
@@ -907,13 +2416,22 @@ def run_from_args(args):
     ):
         ensure_directory_exists(directory)
 
-    pd = PaprDaemon(conf)
-    run_daemon(pd)
+    listener = setup_logging(
+        level=conf.log_level, path=conf.log_file, structured=conf.structured_logs
+    )
+
+    try:
+        pd = PaprDaemon(conf, config_path=config_path)
+        run_daemon(pd)
+    finally:
+        listener.stop()
 
 
 if __name__ == "__main__":
+    args, config_path = {}, None
     if os.path.isfile("papr.json"):
-        with open("papr.json") as f:
+        config_path = os.path.abspath("papr.json")
+        with open(config_path) as f:
             args = json.load(f)
 
-    run_from_args(args)
+    run_from_args(args, config_path)
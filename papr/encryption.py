@@ -0,0 +1,386 @@
+import os
+import io
+import time
+import base64
+import struct
+import hashlib
+import threading
+import collections
+
+# Encrypted container format
+#
+#   header: MAGIC | key type (1 byte) | chunk size (4 bytes) | nonce prefix (7 bytes) [| key parameters]
+#   body:   chunks of `chunk size` plaintext bytes (the last one possibly shorter),
+#           each encrypted with AES-256-GCM followed by its 16-byte tag
+#
+# The nonce of a chunk is the nonce prefix, the chunk index (4 bytes) and a byte set to 1 for the last chunk only,
+# so chunks cannot be reordered or truncated. The header is authenticated with every chunk.
+# Chunks can be decrypted independently, which allows streaming and random access.
+#
+# With KEY_SCRYPT, the key is derived from a passphrase and the header is followed by
+# the scrypt salt (16 bytes), log2(n), r and p (1 byte each), so the key can be derived again for decryption.
+
+MAGIC = b"PAPRENC\x01"
+KEY_RAW = 0
+KEY_SCRYPT = 1
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+TAG_SIZE = 16
+NONCE_PREFIX_SIZE = 7
+CONTENT_KEY_SIZE = 32
+
+SALT_SIZE = 16
+SCRYPT_N = 1 << 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+_HEADER = struct.Struct(f">{len(MAGIC)}sBI{NONCE_PREFIX_SIZE}s")
+HEADER_SIZE = _HEADER.size
+_SCRYPT_PARAMS = struct.Struct(f">{SALT_SIZE}sBBB")
+
+
+class DecryptionError(Exception):
+    pass
+
+
+class Header:
+    __slots__ = ("key_type", "chunk_size", "nonce_prefix", "scrypt", "raw")
+
+    def __init__(self, key_type, chunk_size, nonce_prefix, scrypt=None):
+        self.key_type = key_type
+        self.chunk_size = chunk_size
+        self.nonce_prefix = nonce_prefix
+        self.scrypt = scrypt  # (salt, n, r, p) with KEY_SCRYPT
+        self.raw = _HEADER.pack(MAGIC, key_type, chunk_size, nonce_prefix)
+        if key_type == KEY_SCRYPT:
+            salt, n, r, p = scrypt
+            self.raw += _SCRYPT_PARAMS.pack(salt, n.bit_length() - 1, r, p)
+
+    @classmethod
+    def new(cls, key_type=KEY_RAW, chunk_size=DEFAULT_CHUNK_SIZE, scrypt=None):
+        return cls(key_type, chunk_size, os.urandom(NONCE_PREFIX_SIZE), scrypt)
+
+    @classmethod
+    def read(cls, f):
+        raw = f.read(HEADER_SIZE)
+        if len(raw) != HEADER_SIZE:
+            raise DecryptionError("Truncated header")
+        magic, key_type, chunk_size, nonce_prefix = _HEADER.unpack(raw)
+        if magic != MAGIC:
+            raise DecryptionError("Not a papr encrypted container")
+
+        scrypt = None
+        if key_type == KEY_SCRYPT:
+            params = f.read(_SCRYPT_PARAMS.size)
+            if len(params) != _SCRYPT_PARAMS.size:
+                raise DecryptionError("Truncated header")
+            salt, log_n, r, p = _SCRYPT_PARAMS.unpack(params)
+            scrypt = (salt, 1 << log_n, r, p)
+        elif key_type != KEY_RAW:
+            raise DecryptionError(f"Unknown key type {key_type}")
+
+        return cls(key_type, chunk_size, nonce_prefix, scrypt)
+
+    def nonce(self, index, last):
+        return self.nonce_prefix + struct.pack(">IB", index, 1 if last else 0)
+
+    def plaintext_size(self, encrypted_size):
+        """
+        Size of the plaintext of a container of `encrypted_size` bytes
+        """
+        body = encrypted_size - len(self.raw)
+        num_chunks = max(1, -(-body // (self.chunk_size + TAG_SIZE)))
+        return body - num_chunks * TAG_SIZE
+
+
+def new_content_key():
+    return os.urandom(CONTENT_KEY_SIZE)
+
+
+def _aead(key):
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    # Copied, as cached keys may be zeroed while in use
+    return AESGCM(bytes(key))
+
+
+def _read_full(f, size):
+    data = f.read(size)
+    while len(data) < size:
+        more = f.read(size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def encrypt_stream(key, src, dst, chunk_size=DEFAULT_CHUNK_SIZE, header=None):
+    """
+    Encrypts the file-like `src` into `dst`. Returns the number of bytes written.
+    """
+    aead = _aead(key)
+    header = header or Header.new(chunk_size=chunk_size)
+    dst.write(header.raw)
+    written = len(header.raw)
+
+    index = 0
+    chunk = _read_full(src, header.chunk_size)
+    while True:
+        # Read ahead to know whether the current chunk is the last one
+        next_chunk = _read_full(src, header.chunk_size) if chunk else b""
+        last = not next_chunk
+        encrypted = aead.encrypt(header.nonce(index, last), chunk, header.raw)
+        dst.write(encrypted)
+        written += len(encrypted)
+        if last:
+            return written
+        chunk = next_chunk
+        index += 1
+
+
+def decrypt_chunks(key, src, header=None, start_chunk=0):
+    """
+    Yields the decrypted chunks of the container `src` from chunk `start_chunk`.
+    `src` must be positioned after the header, at the start of that chunk.
+    """
+    aead = _aead(key)
+    header = header or Header.read(src)
+    size = header.chunk_size + TAG_SIZE
+
+    index = start_chunk
+    chunk = _read_full(src, size)
+    while True:
+        next_chunk = _read_full(src, size) if len(chunk) == size else b""
+        last = not next_chunk
+        try:
+            yield aead.decrypt(header.nonce(index, last), chunk, header.raw)
+        except Exception:
+            raise DecryptionError(f"Chunk {index} could not be decrypted") from None
+        if last:
+            return
+        chunk = next_chunk
+        index += 1
+
+
+def decrypt_stream(key, src, dst):
+    written = 0
+    for chunk in decrypt_chunks(key, src):
+        dst.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def encrypt_bytes(key, data, chunk_size=DEFAULT_CHUNK_SIZE):
+    out = io.BytesIO()
+    encrypt_stream(key, io.BytesIO(data), out, chunk_size=chunk_size)
+    return out.getvalue()
+
+
+def decrypt_bytes(key, data):
+    return b"".join(decrypt_chunks(key, io.BytesIO(data)))
+
+
+def derive_key(passphrase, salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """
+    Derives a content key from a passphrase with scrypt. The key is a bytearray so that it can be zeroed.
+    """
+    key = hashlib.scrypt(
+        passphrase.encode(),
+        salt=salt,
+        n=n,
+        r=r,
+        p=p,
+        maxmem=130 * r * (n + p),
+        dklen=CONTENT_KEY_SIZE,
+    )
+    return bytearray(key)
+
+
+def _zero(key):
+    key[:] = bytes(len(key))
+
+
+class DerivedKeyCache:
+    """
+    Keeps keys derived from passphrases in memory, by scope (e.g. an article) and scrypt parameters.
+
+    The first encryption of a scope derives a key with a new salt, which is reused by the following encryptions
+    of that scope while the key is cached; decrypting a container then only derives its key on a miss.
+    Keys expire after `ttl` seconds, the least recently used keys are evicted above `max_size` keys,
+    and evicted keys are overwritten with zeros. Callers are given copies, so that the cached keys are only
+    zeroed by the cache and cannot be altered by its callers: zeroing only clears the buffer of the cache,
+    the copies given to callers stay in memory until they are garbage collected.
+    """
+
+    def __init__(self, max_size=64, ttl=600):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # (scope, passphrase digest, salt, n, r, p) -> (key, expiry time)
+        self._keys = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, entry):
+        key, _ = self._keys.pop(entry)
+        _zero(key)
+        self.evictions += 1
+
+    def _expire(self):
+        now = time.monotonic()
+        for entry, (_, expires) in list(self._keys.items()):
+            if expires is not None and expires < now:
+                self._evict(entry)
+
+    def _lookup(self, entry):
+        with self._lock:
+            self._expire()
+            cached = self._keys.get(entry)
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._keys.move_to_end(entry)
+            return bytes(cached[0])
+
+    def _store(self, entry, key):
+        if self.max_size <= 0:
+            copy = bytes(key)
+            _zero(key)
+            return copy
+
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if entry in self._keys:
+                # Derived concurrently, keeps the key which may already be in use
+                _zero(key)
+                self._keys.move_to_end(entry)
+                return bytes(self._keys[entry][0])
+
+            self._keys[entry] = (key, expires)
+            copy = bytes(key)
+            while len(self._keys) > self.max_size:
+                self._evict(next(iter(self._keys)))
+            return copy
+
+    def get(self, scope, passphrase, salt, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+        """
+        Returns the key derived from `passphrase` with these scrypt parameters, deriving it on a miss
+        """
+        digest = hashlib.sha256(passphrase.encode()).digest()
+        entry = (scope, digest, salt, n, r, p)
+        key = self._lookup(entry)
+        if key is not None:
+            return key
+        # Derived outside of the lock, as it is slow
+        return self._store(entry, derive_key(passphrase, salt, n, r, p))
+
+    def encryption_key(self, scope, passphrase, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+        """
+        Returns a (salt, key) tuple for encrypting in `scope`, reusing the most recent cached key of the scope
+        """
+        digest = hashlib.sha256(passphrase.encode()).digest()
+        with self._lock:
+            self._expire()
+            for entry in reversed(self._keys):
+                if entry[:2] == (scope, digest) and entry[3:] == (n, r, p):
+                    self.hits += 1
+                    self._keys.move_to_end(entry)
+                    return entry[2], bytes(self._keys[entry][0])
+            self.misses += 1
+
+        salt = os.urandom(SALT_SIZE)
+        entry = (scope, digest, salt, n, r, p)
+        return salt, self._store(entry, derive_key(passphrase, salt, n, r, p))
+
+    def evict(self, scope):
+        """
+        Zeroes and removes the keys of a scope
+        """
+        with self._lock:
+            for entry in [e for e in self._keys if e[0] == scope]:
+                self._evict(entry)
+
+    def clear(self):
+        with self._lock:
+            for entry in list(self._keys):
+                self._evict(entry)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached_keys": len(self._keys),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def passphrase_encryption_key(passphrase, cache=None, scope=None):
+    """
+    Returns a key derived from `passphrase` for encrypting and its scrypt parameters (salt, n, r, p)
+    """
+    if cache is not None:
+        salt, key = cache.encryption_key(scope, passphrase)
+    else:
+        salt = os.urandom(SALT_SIZE)
+        key = derive_key(passphrase, salt)
+    return key, (salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+
+
+def encrypt_with_passphrase(
+    passphrase, data, cache=None, scope=None, chunk_size=DEFAULT_CHUNK_SIZE
+):
+    """
+    Encrypts `data` with a key derived from `passphrase`, taken from `cache` when given
+    """
+    key, scrypt = passphrase_encryption_key(passphrase, cache, scope)
+    header = Header.new(KEY_SCRYPT, chunk_size=chunk_size, scrypt=scrypt)
+    out = io.BytesIO()
+    encrypt_stream(key, io.BytesIO(data), out, header=header)
+    return out.getvalue()
+
+
+def passphrase_key(passphrase, header, cache=None, scope=None):
+    """
+    Returns the key of a container encrypted with `encrypt_with_passphrase` from its header
+    """
+    if header.key_type != KEY_SCRYPT:
+        raise DecryptionError("The container is not encrypted with a passphrase")
+    if cache is not None:
+        return cache.get(scope, passphrase, *header.scrypt)
+    return derive_key(passphrase, *header.scrypt)
+
+
+def decrypt_with_passphrase(passphrase, data, cache=None, scope=None):
+    src = io.BytesIO(data)
+    header = Header.read(src)
+    key = passphrase_key(passphrase, header, cache, scope)
+    return b"".join(decrypt_chunks(key, src, header=header))
+
+
+def wrap_key(sender_private_key: str, recipient_public_key: str, content_key: bytes):
+    """
+    Encrypts a content key for a recipient with a shared secret from ECDH of their SECP256k1 keys (base64 strings)
+    """
+    from papr.utilities import SECP_encrypt_text
+
+    return SECP_encrypt_text(
+        sender_private_key,
+        recipient_public_key,
+        base64.b64encode(content_key).decode(),
+    )
+
+
+def unwrap_key(recipient_private_key: str, sender_public_key: str, wrapped_key: str):
+    from papr.utilities import SECP_decrypt_text
+
+    return base64.b64decode(
+        SECP_decrypt_text(recipient_private_key, sender_public_key, wrapped_key)
+    )
@@ -0,0 +1,252 @@
+import json
+import asyncio
+import logging
+import datetime
+
+import aiohttp
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from papr.models import Server
+from papr.utilities import DualLogger
+
+logger = DualLogger(logging.getLogger(__name__))
+
+EVENTS_PATH = "/api/events/"
+
+# Seconds before reconnecting to a server, doubled after every failed attempt
+RECONNECT_DELAY = 1
+MAX_RECONNECT_DELAY = 60
+
+CONNECTING = "connecting"
+CONNECTED = "connected"
+DISCONNECTED = "disconnected"
+UNSUPPORTED = "unsupported"
+
+
+class Event:
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, id, type, data):
+        self.id = id
+        self.type = type
+        self.data = data
+
+    def json(self):
+        try:
+            return json.loads(self.data)
+        except json.JSONDecodeError:
+            return None
+
+
+async def iter_events(lines):
+    """
+    Parses server-sent events from an async iterable of lines (bytes)
+    """
+    event_id = None
+    event_type = "message"
+    data = []
+
+    async for line in lines:
+        line = line.decode("utf-8").rstrip("\r\n")
+        if not line:
+            if data:
+                yield Event(event_id, event_type, "\n".join(data))
+            event_type = "message"
+            data = []
+            continue
+        if line.startswith(":"):
+            continue  # Comment, used as keep-alive
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+        if field == "id":
+            event_id = value
+        elif field == "event":
+            event_type = value
+        elif field == "data":
+            data.append(value)
+
+
+class Subscription:
+    """
+    Persistent subscription to the events of a review server, reconnecting after drops
+    and resuming from the id of the last applied event: when an event cannot be applied,
+    the stream is dropped so that the event is received again.
+
+    `authenticate(url)` is a coroutine function returning the request headers, or a dict with an `error`.
+    `on_event(server_id, event)` is a coroutine function applying an event,
+    and `on_state(server_id, state)` is called when the subscription connects or disconnects.
+    """
+
+    def __init__(self, server_id, url, authenticate, on_event, on_state, cursor=None):
+        self.server_id = server_id
+        self.url = url
+        self.authenticate = authenticate
+        self.on_event = on_event
+        self.on_state = on_state
+
+        self.cursor = cursor
+        self.state = DISCONNECTED
+        self.connected_at = None
+        self.events = 0
+        self.reconnects = 0
+        self.error = None
+
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._set_state(DISCONNECTED)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            self.on_state(self.server_id, state)
+
+    async def _run(self):
+        delay = RECONNECT_DELAY
+        while True:
+            self._set_state(CONNECTING)
+            try:
+                received = await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                received = False
+                self.error = str(e)
+
+            if self.state == UNSUPPORTED:
+                logger.info(
+                    "Server %s does not publish events, its articles will be polled",
+                    self.url,
+                )
+                return
+
+            self._set_state(DISCONNECTED)
+            logger.debug(
+                "Event stream of %s dropped, reconnecting in %ss", self.url, delay
+            )
+            self.reconnects += 1
+            delay = RECONNECT_DELAY if received else min(delay * 2, MAX_RECONNECT_DELAY)
+            await asyncio.sleep(delay)
+
+    async def _listen(self):
+        """
+        Reads the event stream until it is closed, returns whether the connection was established
+        """
+        headers = await self.authenticate(self.url)
+        if "error" in headers:
+            self.error = headers["error"]
+            return False
+
+        headers = {**headers, "Accept": "text/event-stream"}
+        if self.cursor is not None:
+            headers["Last-Event-ID"] = self.cursor
+
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=None)
+        async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with session.get(f"{self.url}{EVENTS_PATH}", headers=headers) as resp:
+                if resp.status in (404, 405, 501):
+                    self._set_state(UNSUPPORTED)
+                    return False
+                if resp.status != 200:
+                    self.error = f"Received status code {resp.status}"
+                    return False
+
+                self.error = None
+                self.connected_at = datetime.datetime.utcnow()
+                self._set_state(CONNECTED)
+
+                async for event in iter_events(resp.content):
+                    try:
+                        await self.on_event(self.server_id, event)
+                    except Exception as e:
+                        # The cursor is not advanced: the event is received again after reconnecting
+                        logger.exception(
+                            "Could not apply event %s from %s", event.id, self.url
+                        )
+                        self.error = f"Could not apply event {event.id}: {e}"
+                        return False
+                    self.events += 1
+                    if event.id is not None:
+                        self.cursor = event.id
+        return True
+
+    def status(self):
+        return {
+            "url": self.url,
+            "state": self.state,
+            "connected_at": (
+                self.connected_at.isoformat() if self.connected_at else None
+            ),
+            "cursor": self.cursor,
+            "events": self.events,
+            "reconnects": self.reconnects,
+            "error": self.error,
+        }
+
+
+class ServerEvents:
+    """
+    Keeps one subscription per known review server. The id of the last event received from each server
+    is saved so that subscriptions resume where they stopped after a restart.
+    Servers whose events are received are reported to `on_state` so that their articles are not polled.
+    """
+
+    def __init__(self, engine, authenticate, on_event, on_state):
+        self.engine = engine
+        self.authenticate = authenticate
+        self.on_event = on_event
+        self.on_state = on_state
+
+        self.subscriptions = {}  # server id -> Subscription
+
+    def sync(self):
+        """
+        Subscribes to the servers which were added since the last call
+        """
+        with Session(self.engine) as session:
+            servers = session.execute(select(Server)).scalars().all()
+            for server in servers:
+                if server.id in self.subscriptions or not server.url:
+                    continue
+                subscription = Subscription(
+                    server.id,
+                    server.url,
+                    self.authenticate,
+                    self._apply,
+                    self.on_state,
+                    cursor=server.event_cursor,
+                )
+                self.subscriptions[server.id] = subscription
+                subscription.start()
+
+    async def _apply(self, server_id, event):
+        await self.on_event(server_id, event)
+        if event.id is not None:
+            with Session(self.engine) as session:
+                server = session.get(Server, server_id)
+                if server is not None:
+                    server.event_cursor = event.id
+                    session.commit()
+
+    async def stop(self):
+        await asyncio.gather(
+            *(subscription.stop() for subscription in self.subscriptions.values())
+        )
+        self.subscriptions = {}
+
+    def status(self):
+        return {
+            subscription.url: subscription.status()
+            for subscription in self.subscriptions.values()
+        }
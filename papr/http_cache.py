@@ -0,0 +1,79 @@
+import collections
+
+
+class HTTPCache:
+    """
+    Keeps the last successful response of GET requests with their validators (ETag and Last-Modified)
+    so that requests can be made conditional and 304 responses answered from the cache.
+    Entries are per URL and request headers (thus per channel token), the least recently used being dropped above `max_entries`.
+    Cached parsed bodies are shared and must not be mutated.
+    """
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+
+        self.not_modified = 0  # Responses answered from the cache
+        self.modified = 0
+
+    @staticmethod
+    def _key(url, headers):
+        return url, tuple(sorted(headers.items()))
+
+    def validators(self, url, headers):
+        """
+        Returns the headers making a request for `url` conditional, if a response was cached
+        """
+        entry = self._entries.get(self._key(url, headers))
+        if entry is None:
+            return {}
+        validators = {}
+        if entry["etag"]:
+            validators["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            validators["If-Modified-Since"] = entry["last_modified"]
+        return validators
+
+    def store(self, url, headers, response_headers, data, content):
+        etag = response_headers.get("ETag")
+        last_modified = response_headers.get("Last-Modified")
+        key = self._key(url, headers)
+        if not etag and not last_modified:
+            # Cannot be validated
+            self._entries.pop(key, None)
+            return
+
+        self.modified += 1
+        self._entries[key] = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "data": data,
+            "content": content,
+        }
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, url, headers):
+        """
+        Returns the (data, content) of the cached response for a 304 response, or None
+        """
+        key = self._key(url, headers)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self.not_modified += 1
+        self._entries.move_to_end(key)
+        return entry["data"], entry["content"]
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        requests = self.not_modified + self.modified
+        return {
+            "entries": len(self._entries),
+            "not_modified": self.not_modified,
+            "modified": self.modified,
+            "hit_rate": self.not_modified / requests if requests else None,
+        }
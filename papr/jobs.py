@@ -0,0 +1,391 @@
+import os
+import json
+import socket
+import asyncio
+import logging
+import datetime
+
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from papr.models import Job, Lease
+from papr.utilities import DualLogger
+
+logger = DualLogger(logging.getLogger(__name__))
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Number of times a job is started before it is failed, if its workers keep losing its lease
+MAX_ATTEMPTS = 3
+
+# Number of queued jobs considered by a worker looking for a job to claim
+CLAIM_BATCH = 16
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _is(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+class JobStore:
+    """
+    Queue of jobs in a database shared by several workers, each identified by `worker_id`.
+    A worker claims a job by taking a lease on it, which it renews while the job runs: a job whose lease expired
+    is claimed again by another worker. Claims are conditional updates, so a job is never held by two workers.
+    """
+
+    def __init__(self, engine, worker_id=None, lease_duration=60):
+        self.engine = engine
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_duration = lease_duration
+
+    def _expires(self, now):
+        return now + datetime.timedelta(seconds=self.lease_duration)
+
+    def submit(self, method, params, key=None):
+        with Session(self.engine) as session:
+            job = Job(
+                method=method,
+                params=json.dumps(params),
+                key=key,
+                state=QUEUED,
+                attempts=0,
+                created_at=datetime.datetime.utcnow(),
+            )
+            session.add(job)
+            session.commit()
+            return job.id
+
+    def claim(self):
+        """
+        Takes a lease on the oldest job which is queued or whose lease expired, returns it or None
+        """
+        now = datetime.datetime.utcnow()
+        expired = and_(Job.state == RUNNING, Job.lease_expires < now)
+
+        with Session(self.engine) as session:
+            session.execute(
+                update(Job)
+                .where(expired, Job.attempts >= MAX_ATTEMPTS)
+                .values(
+                    state=FAILED,
+                    error="The job was interrupted too many times",
+                    finished_at=now,
+                )
+            )
+            session.commit()
+
+            busy_keys = select(Job.key).where(
+                Job.state == RUNNING, Job.lease_expires >= now, Job.key.is_not(None)
+            )
+            candidates = session.execute(
+                select(Job.id, Job.state, Job.owner, Job.lease_expires)
+                .where(
+                    or_(Job.state == QUEUED, expired),
+                    or_(Job.key.is_(None), Job.key.not_in(busy_keys)),
+                )
+                .order_by(Job.id)
+                .limit(CLAIM_BATCH)
+            ).all()
+
+            for job_id, state, owner, lease_expires in candidates:
+                # Fails if another worker claimed the job since it was selected
+                res = session.execute(
+                    update(Job)
+                    .where(
+                        Job.id == job_id,
+                        _is(Job.state, state),
+                        _is(Job.owner, owner),
+                        _is(Job.lease_expires, lease_expires),
+                    )
+                    .values(
+                        state=RUNNING,
+                        owner=self.worker_id,
+                        lease_expires=self._expires(now),
+                        attempts=Job.attempts + 1,
+                    )
+                )
+                session.commit()
+                if res.rowcount != 1:
+                    continue
+
+                job = session.get(Job, job_id)
+                if job.key is not None and self._key_taken(session, job, now):
+                    self.release(job_id)
+                    continue
+                return self._to_dict(job)
+        return None
+
+    def _key_taken(self, session, job, now):
+        # Jobs with the same key claimed at the same time: the oldest one is kept
+        return (
+            session.execute(
+                select(Job.id).where(
+                    Job.key == job.key,
+                    Job.id < job.id,
+                    Job.state == RUNNING,
+                    Job.lease_expires >= now,
+                )
+            ).first()
+            is not None
+        )
+
+    def _update_own(self, job_id, **values):
+        with Session(self.engine) as session:
+            res = session.execute(
+                update(Job)
+                .where(
+                    Job.id == job_id,
+                    Job.owner == self.worker_id,
+                    Job.state == RUNNING,
+                )
+                .values(**values)
+            )
+            session.commit()
+            return res.rowcount == 1
+
+    def renew(self, job_id):
+        """
+        Extends the lease on a job, returns False if the lease was lost
+        """
+        return self._update_own(
+            job_id, lease_expires=self._expires(datetime.datetime.utcnow())
+        )
+
+    def release(self, job_id):
+        """
+        Queues a claimed job again
+        """
+        return self._update_own(
+            job_id,
+            state=QUEUED,
+            owner=None,
+            lease_expires=None,
+            attempts=Job.attempts - 1,
+        )
+
+    def finish(self, job_id, result=None, error=None):
+        return self._update_own(
+            job_id,
+            state=FAILED if error is not None else DONE,
+            result=json.dumps(result) if result is not None else None,
+            error=error,
+            lease_expires=None,
+            finished_at=datetime.datetime.utcnow(),
+        )
+
+    @staticmethod
+    def _to_dict(job):
+        return {
+            "id": job.id,
+            "method": job.method,
+            "params": json.loads(job.params) if job.params else {},
+            "key": job.key,
+            "state": job.state,
+            "owner": job.owner,
+            "attempts": job.attempts,
+            "result": json.loads(job.result) if job.result else None,
+            "error": job.error,
+            "created_at": job.created_at.isoformat() if job.created_at else None,
+            "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        }
+
+    def get(self, job_id):
+        with Session(self.engine) as session:
+            job = session.get(Job, job_id)
+            return self._to_dict(job) if job is not None else None
+
+    def list(self, state=None, limit=100):
+        query = select(Job).order_by(Job.id.desc()).limit(limit)
+        if state is not None:
+            query = query.where(Job.state == state)
+        with Session(self.engine) as session:
+            return [self._to_dict(job) for job in session.execute(query).scalars()]
+
+    def acquire(self, name):
+        """
+        Takes or renews the lease `name`, returns whether this worker holds it
+        """
+        now = datetime.datetime.utcnow()
+        with Session(self.engine) as session:
+            res = session.execute(
+                update(Lease)
+                .where(
+                    Lease.name == name,
+                    or_(Lease.owner == self.worker_id, Lease.expires < now),
+                )
+                .values(owner=self.worker_id, expires=self._expires(now))
+            )
+            session.commit()
+            if res.rowcount == 1:
+                return True
+
+            session.add(
+                Lease(name=name, owner=self.worker_id, expires=self._expires(now))
+            )
+            try:
+                session.commit()
+            except IntegrityError:
+                session.rollback()
+                return False
+            return True
+
+    def release_lease(self, name):
+        with Session(self.engine) as session:
+            session.execute(
+                update(Lease)
+                .where(Lease.name == name, Lease.owner == self.worker_id)
+                .values(expires=datetime.datetime.utcnow())
+            )
+            session.commit()
+
+
+class JobWorker:
+    """
+    Runs the jobs of a JobStore, at most `concurrency` at once, renewing their lease while they run.
+    `run(method, params)` is a coroutine function running a job and returning its result, or a dict with an `error`.
+    A job whose lease is lost is cancelled, as another worker may have claimed it.
+    """
+
+    def __init__(self, store, run, concurrency=1, poll_interval=1):
+        self.store = store
+        self.run = run
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+
+        self.running = {}  # job id -> job
+        self._workers = []
+
+    def start(self):
+        if not self._workers:
+            self._workers = [
+                asyncio.ensure_future(self._work()) for _ in range(self.concurrency)
+            ]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _work(self):
+        while True:
+            try:
+                job = self.store.claim()
+            except Exception:
+                logger.exception("Could not claim a job")
+                job = None
+            if job is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            self.running[job["id"]] = job
+            try:
+                await self._run_job(job)
+            except Exception:
+                logger.exception("Job %s could not be run", job["id"])
+            finally:
+                del self.running[job["id"]]
+
+    async def _run_job(self, job):
+        logger.info("Running job %s (%s)", job["id"], job["method"])
+        task = asyncio.ensure_future(self.run(job["method"], job["params"]))
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    [task], timeout=self.store.lease_duration / 3
+                )
+                if done:
+                    break
+                if not self.store.renew(job["id"]):
+                    task.cancel()
+                    logger.warning(
+                        "Lost the lease on job %s, it was cancelled", job["id"]
+                    )
+                    return
+        except asyncio.CancelledError:
+            task.cancel()
+            self.store.release(job["id"])
+            raise
+
+        try:
+            result = task.result()
+        except Exception as e:
+            self.store.finish(job["id"], error=str(e))
+            return
+
+        if isinstance(result, dict) and "error" in result:
+            self.store.finish(job["id"], error=str(result["error"]))
+        else:
+            self.store.finish(job["id"], result=result)
+
+    def status(self):
+        return {
+            "worker_id": self.store.worker_id,
+            "concurrency": self.concurrency,
+            "running": sorted(self.running),
+        }
+
+
+class LeaderElection:
+    """
+    Elects one of the workers sharing a JobStore through the lease `name`, renewed every third of its duration.
+    `on_change(is_leader)` is called when this worker is elected or loses the lease.
+    """
+
+    def __init__(self, store, name, on_change):
+        self.store = store
+        self.name = name
+        self.on_change = on_change
+
+        self.is_leader = False
+        self._task = None
+
+    def _check(self):
+        try:
+            leader = self.store.acquire(self.name)
+        except Exception:
+            logger.exception("Could not renew the lease %s", self.name)
+            leader = False
+        if leader != self.is_leader:
+            self.is_leader = leader
+            logger.info("%s the lease %s", "Acquired" if leader else "Lost", self.name)
+            self.on_change(leader)
+
+    def start(self):
+        # The first election is immediate so that a single worker starts as the leader
+        self._check()
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        try:
+            while True:
+                await asyncio.sleep(self.store.lease_duration / 3)
+                try:
+                    self._check()
+                except Exception:
+                    logger.exception("Could not check the lease %s", self.name)
+        finally:
+            # The lease is not renewed past this point, another worker will take it
+            if self.is_leader:
+                self.is_leader = False
+                self.on_change(False)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # Released even if the task already cleared is_leader, as the lease may still be held
+        self.store.release_lease(self.name)
+        if self.is_leader:
+            self.is_leader = False
+            self.on_change(False)
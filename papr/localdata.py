@@ -1,52 +1,35 @@
 import json
+import logging
 
 from papr.config import Config
 
-
-class PaprObject:
-
-    SAVED_FIELDS = []
-    LOADED_FIELDS = []
-
-    def __init__(self):
-        raise Exception("Initiator unimplemented")
-
-    @classmethod
-    def from_json(cls, **kwargs):
-        base_params = {}
-        for a, v in cls.SAVED_FIELDS.items():
-            if a not in kwargs:
-                raise Exception(
-                    f"JSON data for initiation of {type(self)}) is missing field {a}"
-                )
-            base_params[a] = v
-
-        obj = cls(**base_params)
-
-        for a, v in cls.LOADED_FIELDS.items():
-            if a in kwargs:
-                setattr(obj, a, v)
-
-        return obj
-
-    def to_json(self):
-        d = {}
-        for a in self.SAVED_FIELDS:
-            d[a] = getattr(self, a)
-        return d
+logger = logging.getLogger(__name__)
 
 
 def load_config(path):
+    """
+    Returns the configuration read from a JSON file, or None if it cannot be read or is invalid
+    """
     try:
-        data = json.loads(path)
+        with open(path) as f:
+            data = json.load(f)
+    except OSError as e:
+        logger.error("Cannot read configuration file %s: %s", path, e)
+        return
     except json.JSONDecodeError:
-        logger.error(f"Cannot decode configuration of {path}")
+        logger.error("Cannot decode configuration of %s", path)
         return
 
-    config = Config()
+    if not isinstance(data, dict):
+        logger.error("Configuration of %s is not a JSON object", path)
+        return
 
-    for k, v in data.items():
-        setattr(config, k, v)
+    try:
+        # Settings are validated when they are set
+        config = Config(**data)
+    except (AssertionError, ValueError, TypeError) as e:
+        logger.error("Invalid configuration in %s: %s", path, e)
+        return
 
-    logger.info(f"Configuration successfully loaded from {path}")
+    logger.info("Configuration successfully loaded from %s", path)
     return config
@@ -0,0 +1,74 @@
+import sys
+import json
+import queue
+import logging
+import datetime
+import logging.handlers
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-8s %(name)s: %(message)s"
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records as JSON lines, the structured fields passed to DualLogger being nested in `fields`
+    so that they cannot overwrite the time, level, logger or message of the record
+    """
+
+    def format(self, record):
+        data = {
+            "time": datetime.datetime.utcfromtimestamp(record.created).isoformat()
+            + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            data["fields"] = fields
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue as they are.
+    The standard QueueHandler formats the message in the logging thread;
+    here it is formatted by the handlers of the writer thread.
+    Arguments passed to the loggers must thus not be mutated after the call.
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            # Tracebacks reference frames which may change before the writer thread handles them
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(level="INFO", path=None, structured=False, stream=sys.stderr):
+    """
+    Sends the records of all loggers to a background thread writing them to `stream` and `path`.
+    Returns the started QueueListener, which must be stopped to flush the remaining records.
+    """
+    handlers = [logging.StreamHandler(stream)]
+    if path:
+        handlers.append(logging.FileHandler(path))
+
+    formatter = StructuredFormatter() if structured else logging.Formatter(TEXT_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    q = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(q))
+    root.setLevel(level)
+
+    listener.start()
+    return listener
@@ -0,0 +1,162 @@
+import time
+import bisect
+import asyncio
+import functools
+
+# Upper bounds (in seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class MethodMetrics:
+    __slots__ = ("calls", "errors", "total_time", "bucket_counts", "buckets")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.calls = 0
+        self.errors = 0
+        self.total_time = 0.0
+        # The last count is for the +Inf bucket
+        self.bucket_counts = [0] * (len(buckets) + 1)
+
+    def observe(self, elapsed, error=False):
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self.total_time += elapsed
+        self.bucket_counts[bisect.bisect_left(self.buckets, elapsed)] += 1
+
+    def cumulative_buckets(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.bucket_counts):
+            total += count
+            yield bound, total
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "total_time": self.total_time,
+            "mean_time": self.total_time / self.calls if self.calls else 0.0,
+            "buckets": {
+                ("+Inf" if bound == float("inf") else str(bound)): count
+                for bound, count in self.cumulative_buckets()
+            },
+        }
+
+
+class MetricsRegistry:
+    def __init__(self, namespace="papr", buckets=LATENCY_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self.methods = {}
+
+    def method(self, name):
+        if name not in self.methods:
+            self.methods[name] = MethodMetrics(self.buckets)
+        return self.methods[name]
+
+    def reset(self):
+        # Instrumented methods keep a reference to their metrics: reset them in place
+        for m in self.methods.values():
+            m.__init__(self.buckets)
+
+    def called_methods(self):
+        return sorted((name, m) for name, m in self.methods.items() if m.calls)
+
+    def to_dict(self):
+        return {name: m.to_dict() for name, m in self.called_methods()}
+
+    def to_prometheus(self):
+        """
+        Renders the metrics in the Prometheus text exposition format
+        """
+        ns = self.namespace
+        lines = [
+            f"# HELP {ns}_rpc_calls_total Number of calls of the JSON-RPC methods",
+            f"# TYPE {ns}_rpc_calls_total counter",
+        ]
+        methods = self.called_methods()
+        for name, m in methods:
+            lines.append(f'{ns}_rpc_calls_total{{method="{name}"}} {m.calls}')
+
+        lines += [
+            f"# HELP {ns}_rpc_errors_total Number of JSON-RPC calls which failed or returned an error",
+            f"# TYPE {ns}_rpc_errors_total counter",
+        ]
+        for name, m in methods:
+            lines.append(f'{ns}_rpc_errors_total{{method="{name}"}} {m.errors}')
+
+        lines += [
+            f"# HELP {ns}_rpc_latency_seconds Latency of the JSON-RPC methods",
+            f"# TYPE {ns}_rpc_latency_seconds histogram",
+        ]
+        for name, m in methods:
+            for bound, count in m.cumulative_buckets():
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'{ns}_rpc_latency_seconds_bucket{{method="{name}",le="{le}"}} {count}'
+                )
+            lines.append(
+                f'{ns}_rpc_latency_seconds_sum{{method="{name}"}} {m.total_time}'
+            )
+            lines.append(f'{ns}_rpc_latency_seconds_count{{method="{name}"}} {m.calls}')
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _is_error(result):
+    return isinstance(result, dict) and "error" in result
+
+
+async def _observe_coroutine(metrics, start, coro):
+    try:
+        result = await coro
+    except BaseException:
+        metrics.observe(time.perf_counter() - start, error=True)
+        raise
+    metrics.observe(time.perf_counter() - start, error=_is_error(result))
+    return result
+
+
+def instrument(name, method, registry=REGISTRY):
+    """
+    Wraps a JSON-RPC method to record its calls, errors and latency in `registry`.
+    Methods returning a coroutine are timed until the coroutine completes.
+    """
+    metrics = registry.method(name)
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = method(*args, **kwargs)
+        except BaseException:
+            metrics.observe(time.perf_counter() - start, error=True)
+            raise
+
+        if asyncio.iscoroutine(result):
+            return _observe_coroutine(metrics, start, result)
+
+        metrics.observe(time.perf_counter() - start, error=_is_error(result))
+        return result
+
+    return wrapper
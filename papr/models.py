@@ -1,8 +1,11 @@
 from sqlalchemy.orm import declarative_base, relationship
 from sqlalchemy import (
+    inspect,
+    text,
     Table,
     Column,
     Integer,
+    BigInteger,
     String,
     DateTime,
     Float,
@@ -30,6 +33,8 @@ class Article(Base):
 
     encryption_passphrase = Column(String(1024))
     review_passphrase = Column(String(1024))
+    envelope_encryption = Column(Boolean(), default=False)
+    chunked = Column(Boolean(), default=False)
 
     reviewed = Column(Boolean())
     revision = Column(Integer())
@@ -77,6 +82,114 @@ class Manuscript(Base):
     article = relationship("Article")
     article_id = Column(Integer, ForeignKey("articles.id"))
 
+    # Base64 key of the envelope-encrypted bundle of this revision
+    content_key = Column(String(KEY_LENGTH))
+    wrapped_keys = relationship("WrappedKey", back_populates="manuscript")
+
+
+class WrappedKey(Base):
+    __tablename__ = "wrapped_keys"
+
+    id = Column(Integer, primary_key=True)
+
+    manuscript = relationship("Manuscript", back_populates="wrapped_keys")
+    manuscript_id = Column(Integer, ForeignKey("manuscripts.id"))
+
+    recipient_channel_name = Column(String(CLAIM_NAME_LENGTH))
+    recipient_public_key = Column(String(KEY_LENGTH))
+    wrapped_key = Column(Text())
+    creation_date = Column(DateTime())
+
+    @property
+    def information(self):
+        return {
+            "claim_name": self.manuscript.claim_name,
+            "recipient": self.recipient_channel_name,
+            "wrapped_key": self.wrapped_key,
+        }
+
+
+class Chunk(Base):
+    """
+    Content-defined chunk stored in the bundle of a manuscript, which later revisions of the article reference
+    """
+
+    __tablename__ = "chunks"
+
+    id = Column(Integer, primary_key=True)
+
+    article = relationship("Article")
+    article_id = Column(Integer, ForeignKey("articles.id"), index=True)
+
+    digest = Column(String(64))  # SHA-256 of the plain chunk, never published
+    chunk_id = Column(String(64))  # SHA-256 of the stored chunk
+    claim_name = Column(String(CLAIM_NAME_LENGTH))  # Of the bundle storing the chunk
+    encryption = Column(String(16))
+
+
+class ArticleStatus(Base):
+    """
+    Last status of an article fetched from its review server
+    """
+
+    __tablename__ = "article_statuses"
+
+    base_claim_name = Column(String(CLAIM_NAME_LENGTH), primary_key=True)
+    status = Column(Text())  # JSON
+    refreshed_at = Column(DateTime())
+    height = Column(Integer())  # Of the blockchain when refreshed
+    error = Column(Text())  # Of the last refresh, if it failed
+
+
+class CachedSubmission(Base):
+    """
+    Submission downloaded for reviewing, evicted from the disk when the submission cache is full
+    """
+
+    __tablename__ = "cached_submissions"
+
+    claim_name = Column(String(CLAIM_NAME_LENGTH), primary_key=True)
+    download_path = Column(String(1024))
+    size = Column(BigInteger())
+    download_date = Column(DateTime())
+    last_access = Column(DateTime(), index=True)
+
+
+class Job(Base):
+    """
+    Call queued to be run by any of the workers sharing the database, which holds a lease on it while it runs
+    """
+
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    method = Column(String(128))
+    params = Column(Text())  # JSON
+    # Jobs with the same key, such as the base claim name of an article, never run at the same time
+    key = Column(String(CLAIM_NAME_LENGTH), index=True)
+
+    state = Column(String(16), index=True)
+    owner = Column(String(256))
+    lease_expires = Column(DateTime())
+    attempts = Column(Integer(), default=0)
+
+    result = Column(Text())  # JSON
+    error = Column(Text())
+    created_at = Column(DateTime())
+    finished_at = Column(DateTime())
+
+
+class Lease(Base):
+    """
+    Named lease held by one worker at a time, used to elect the worker running singleton background tasks
+    """
+
+    __tablename__ = "leases"
+
+    name = Column(String(128), primary_key=True)
+    owner = Column(String(256))
+    expires = Column(DateTime())
+
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -98,6 +211,7 @@ class Review(Base):
     review_rating = Column(Integer())
     review_signature = Column(Text())  # String
     review_signature_timestamp = Column(Text())  # String
+    deadline = Column(DateTime())
 
     server_id = Column(Integer, ForeignKey("servers.id"))
     server = relationship("Server")
@@ -122,6 +236,9 @@ class Server(Base):
     public_key = Column(String(KEY_LENGTH))
     reviewed_articles = relationship("Article", back_populates="review_server")
 
+    # Id of the last event received from the server
+    event_cursor = Column(String(512))
+
     @property
     def information(self):
         return {
@@ -130,3 +247,25 @@ class Server(Base):
             "url": self.url,
             "public_key": self.public_key,
         }
+
+
+def upgrade_schema(conn):
+    """
+    Creates the missing tables and adds the columns missing from the tables of databases created by earlier versions,
+    which `create_all` leaves as they are. Added columns are NULL in the existing rows.
+    """
+    Base.metadata.create_all(conn)
+
+    inspector = inspect(conn)
+    quote = conn.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            conn.execute(
+                text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                    f"{column.type.compile(dialect=conn.dialect)}"
+                )
+            )
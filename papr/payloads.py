@@ -0,0 +1,160 @@
+from papr.exceptions import PaprException
+
+
+class PayloadError(PaprException):
+    pass
+
+
+class Field:
+    """
+    Field of a payload. Optional fields default to None and are left out of the dict when None,
+    nullable fields accept None but are always present.
+    """
+
+    __slots__ = ("name", "types", "optional", "nullable")
+
+    def __init__(self, name, types, optional=False, nullable=False):
+        self.name = name
+        self.types = types if isinstance(types, tuple) else (types,)
+        self.optional = optional
+        self.nullable = nullable or optional
+
+
+def _compile(name, fields):
+    """
+    Generates the __init__, to_dict and from_dict functions of a payload class,
+    unrolled over its fields so that no reflection happens when building or parsing a payload
+    """
+    namespace = {"PayloadError": PayloadError}
+    params = []
+    init = []
+    to_dict = ["    d = {"]
+    optional = []
+    from_dict = []
+
+    for i, field in enumerate(fields):
+        types = f"_types{i}"
+        namespace[types] = field.types
+        params.append(f"{field.name}=None" if field.optional else field.name)
+
+        check = f"not isinstance({field.name}, {types})"
+        if any(t in (int, float) for t in field.types) and bool not in field.types:
+            check = f"({check} or {field.name} is True or {field.name} is False)"
+        if field.nullable:
+            check = f"{field.name} is not None and {check}"
+        expected = " or ".join(t.__name__ for t in field.types)
+        init += [
+            f"    if {check}:",
+            f"        raise PayloadError(",
+            f"            '{name}.{field.name} must be {expected}, not ' + type({field.name}).__name__",
+            f"        )",
+            f"    self.{field.name} = {field.name}",
+        ]
+
+        if field.optional:
+            optional += [
+                f"    if self.{field.name} is not None:",
+                f"        d[{field.name!r}] = self.{field.name}",
+            ]
+            from_dict.append(f"data.get({field.name!r})")
+        else:
+            to_dict.append(f"        {field.name!r}: self.{field.name},")
+            from_dict.append(f"data[{field.name!r}]")
+
+    source = "\n".join(
+        [
+            f"def __init__(self, {', '.join(params)}):",
+            *(init or ["    pass"]),
+            "",
+            "def to_dict(self):",
+            *to_dict,
+            "    }",
+            *optional,
+            "    return d",
+            "",
+            "def from_dict(cls, data):",
+            "    if not isinstance(data, dict):",
+            f"        raise PayloadError('{name} must be a dict, not ' + type(data).__name__)",
+            "    try:",
+            f"        return cls({', '.join(from_dict)})",
+            "    except KeyError as e:",
+            f"        raise PayloadError('{name} is missing field ' + str(e))",
+        ]
+    )
+    exec(source, namespace)
+    return namespace["__init__"], namespace["to_dict"], namespace["from_dict"]
+
+
+class PayloadType(type):
+    def __new__(mcs, name, bases, newattrs):
+        fields = newattrs.get("FIELDS", ())
+        newattrs["__slots__"] = tuple(field.name for field in fields)
+        if fields:
+            init, to_dict, from_dict = _compile(name, fields)
+            newattrs["__init__"] = init
+            newattrs["to_dict"] = to_dict
+            newattrs["from_dict"] = classmethod(from_dict)
+        return type.__new__(mcs, name, bases, newattrs)
+
+
+class Payload(metaclass=PayloadType):
+    """
+    Message exchanged with a review server, validated when it is built or parsed.
+    Subclasses list their `FIELDS`, from which their slots and converters are generated.
+    """
+
+    FIELDS = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class ChannelRegistration(Payload):
+    FIELDS = (Field("channel_name", str),)
+
+
+class ArticleSubmission(Payload):
+    FIELDS = (
+        Field("title", str),
+        Field("article", str),
+        Field("claim_name", str),
+        Field("authors", str, nullable=True),
+        Field("corresponding_author", str, nullable=True),
+        Field("revision", int),
+    )
+
+
+class ArticleAcceptance(Payload):
+    FIELDS = (
+        Field("base_claim_name", str),
+        Field("channel_name", str, nullable=True),
+        Field("review_passphrase", str, nullable=True),
+        Field("revision", int),
+        Field("title", str, nullable=True),
+        Field("abstract", str, nullable=True),
+        Field("authors", str, nullable=True),
+        Field("tags", str, nullable=True),
+        Field("encryption_passphrase", str, optional=True),
+    )
+
+
+class ReviewSubmission(Payload):
+    FIELDS = (
+        Field("manuscript", str),
+        Field("rating", int, nullable=True),
+        Field("review", str),
+        Field("signature", str),
+        Field("signing_ts", (int, str)),
+    )
+
+
+class ReviewerRecommendation(Payload):
+    FIELDS = (
+        Field("article", str),
+        Field("reviewer_name", str),
+        Field("reviewer", str, optional=True),
+        Field("reviewer_email", str, optional=True),
+    )
@@ -0,0 +1,219 @@
+import os
+import time
+import asyncio
+import logging
+import datetime
+import itertools
+
+from papr.utilities import DualLogger
+
+logger = DualLogger(logging.getLogger(__name__))
+
+QUEUED = "queued"
+DOWNLOADING = "downloading"
+READY = "ready"
+FAILED = "failed"
+
+
+class PrefetchEntry:
+    __slots__ = (
+        "claim_name",
+        "deadline",
+        "state",
+        "seq",
+        "queued_at",
+        "started_at",
+        "finished_at",
+        "size",
+        "error",
+        "done",
+    )
+
+    def __init__(self, claim_name, deadline, seq):
+        self.claim_name = claim_name
+        self.deadline = deadline
+        self.state = QUEUED
+        self.seq = seq
+        self.queued_at = datetime.datetime.utcnow()
+        self.started_at = None
+        self.finished_at = None
+        self.size = None
+        self.error = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            "claim_name": self.claim_name,
+            "state": self.state,
+            "deadline": self.deadline.isoformat() if self.deadline else None,
+            "queued_at": self.queued_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "size": self.size,
+            "error": self.error,
+        }
+
+
+class Prefetcher:
+    """
+    Downloads submissions in the background, those with the earliest deadline first
+    (submissions without a deadline last, in the order they were scheduled).
+
+    `fetch(claim_name, throttle)` is a coroutine function downloading a submission and returning a dict
+    with its `download_path`, or with an `error`. It awaits `throttle(nbytes)` after reading each chunk,
+    which waits as long as needed to keep the downloads of all workers below `max_rate` bytes per second.
+    At most `concurrency` submissions are downloaded at once by the workers.
+    The states of at most `max_entries` submissions are kept, those of the oldest finished downloads being forgotten.
+    """
+
+    def __init__(self, fetch, concurrency=2, max_rate=0, max_entries=1024):
+        self.fetch = fetch
+        self.concurrency = concurrency
+        self.max_rate = max_rate
+        self.max_entries = max_entries
+
+        self.entries = {}
+        self._seq = itertools.count()
+        self._allowed_at = (
+            0  # Time at which the bytes read so far are within the rate limit
+        )
+        self._queue = None
+        self._workers = []
+
+    def start(self):
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        for entry in self.entries.values():
+            if entry.state == QUEUED:
+                self._push(entry)
+        self._workers = [
+            asyncio.ensure_future(self._work()) for _ in range(self.concurrency)
+        ]
+
+    def resize(self, concurrency):
+        """
+        Changes the number of downloads made at once, interrupted downloads being queued again
+        """
+        self.concurrency = concurrency
+        if not self._workers:
+            return
+        while len(self._workers) < concurrency:
+            self._workers.append(asyncio.ensure_future(self._work()))
+        while len(self._workers) > concurrency:
+            self._workers.pop().cancel()
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _push(self, entry):
+        if self._queue is None:
+            return  # Queued when started
+        deadline = entry.deadline.timestamp() if entry.deadline else float("inf")
+        self._queue.put_nowait((deadline, entry.seq, entry.claim_name))
+
+    def schedule(self, claim_name, deadline=None):
+        """
+        Queues the download of a submission, or moves it up if it is queued with a later deadline
+        """
+        entry = self.entries.get(claim_name)
+        if entry is not None and entry.state in (DOWNLOADING, READY):
+            return entry
+
+        if entry is not None and entry.state == QUEUED:
+            if deadline is None or (entry.deadline and entry.deadline <= deadline):
+                return entry
+            # The previous queue item is skipped as its sequence number is outdated
+            entry.deadline = deadline
+            entry.seq = next(self._seq)
+        else:
+            entry = PrefetchEntry(claim_name, deadline, next(self._seq))
+            self.entries[claim_name] = entry
+            self._evict()
+
+        self._push(entry)
+        return entry
+
+    def _evict(self):
+        finished = [
+            name
+            for name, entry in self.entries.items()
+            if entry.state in (READY, FAILED)
+        ]
+        for name in finished[: max(0, len(self.entries) - self.max_entries)]:
+            del self.entries[name]
+
+    async def _work(self):
+        while True:
+            _, seq, claim_name = await self._queue.get()
+            entry = self.entries.get(claim_name)
+            if entry is None or entry.seq != seq or entry.state != QUEUED:
+                continue
+            await self._download(entry)
+
+    async def _download(self, entry):
+        # Claimed before the first await: the workers and the callers of `wait` skip entries which are not queued
+        entry.state = DOWNLOADING
+        entry.started_at = datetime.datetime.utcnow()
+        try:
+            res = await self.fetch(entry.claim_name, self.throttle)
+        except asyncio.CancelledError:
+            entry.state = QUEUED
+            self._push(entry)
+            raise
+        except Exception as e:
+            res = {"error": str(e)}
+
+        entry.finished_at = datetime.datetime.utcnow()
+        if "error" in res:
+            entry.state = FAILED
+            entry.error = res["error"]
+            logger.warning("Could not prefetch %s: %s", entry.claim_name, entry.error)
+        else:
+            entry.state = READY
+            entry.size = os.path.getsize(res["download_path"])
+            logger.debug("Prefetched %s", entry.claim_name, size=entry.size)
+        entry.done.set()
+        self._evict()
+
+    async def throttle(self, nbytes):
+        """
+        Accounts for `nbytes` read by a download, waiting until they are within the rate limit
+        """
+        if not self.max_rate:
+            return
+        now = time.monotonic()
+        self._allowed_at = max(self._allowed_at, now) + nbytes / self.max_rate
+        await asyncio.sleep(self._allowed_at - now)
+
+    def discard(self, claim_name):
+        """
+        Forgets a downloaded submission which was removed, so that it is downloaded again when scheduled
+        """
+        entry = self.entries.get(claim_name)
+        if entry is not None and entry.state == READY:
+            del self.entries[claim_name]
+
+    async def wait(self, claim_name):
+        """
+        Waits for the download of a submission if it is being prefetched,
+        or downloads it at once if it is still queued, so that it is never downloaded twice at the same time
+        """
+        entry = self.entries.get(claim_name)
+        if entry is None:
+            return
+        if entry.state == QUEUED:
+            await self._download(entry)
+        elif entry.state == DOWNLOADING:
+            await entry.done.wait()
+
+    def status(self, claim_names=None):
+        if claim_names is None:
+            claim_names = list(self.entries)
+        return {
+            name: self.entries[name].to_dict() if name in self.entries else None
+            for name in claim_names
+        }
@@ -0,0 +1,190 @@
+import json
+import asyncio
+import logging
+import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from papr.models import Article, ArticleStatus
+from papr.utilities import DualLogger
+
+logger = DualLogger(logging.getLogger(__name__))
+
+
+class StatusTracker:
+    """
+    Keeps the status of the local articles in memory and in the database, refreshed in the background
+    on every new block and every `interval` seconds.
+
+    `fetch(base_claim_names)` is a coroutine function returning the statuses of articles by base claim name,
+    each status being a dict with an `error` if it could not be fetched.
+    Statuses are served from memory with their age; a failed refresh keeps the previous status and records the error.
+    While `following`, the statuses are reloaded from the database, where another worker refreshes them.
+    """
+
+    def __init__(self, engine, fetch, interval=300):
+        self.engine = engine
+        self.fetch = fetch
+        self.interval = interval
+
+        self.statuses = {}  # base claim name -> status entry
+        # Ids of the servers pushing status events, whose articles are not refreshed periodically
+        self.pushed_servers = set()
+        self.height = None
+        self.refreshes = 0
+        self.following = False
+
+        self._task = None
+        self._refreshing = None
+        self._wakeup = None
+
+    def load(self):
+        with Session(self.engine) as session:
+            for row in session.execute(select(ArticleStatus)).scalars():
+                self.statuses[row.base_claim_name] = {
+                    "status": json.loads(row.status) if row.status else None,
+                    "refreshed_at": row.refreshed_at,
+                    "height": row.height,
+                    "error": row.error,
+                }
+
+    def start(self):
+        self.load()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                if self.following:
+                    self.load()
+                else:
+                    await self.refresh()
+            except Exception:
+                logger.exception("Could not refresh the statuses of the articles")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def on_block(self, height):
+        """
+        Refreshes the statuses as soon as possible after a new block
+        """
+        self.height = height
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def tracked(self, pushed=True):
+        """
+        Returns the articles with a review server, including those of servers pushing events if `pushed`
+        """
+        query = select(Article.base_claim_name).where(
+            Article.review_server_id.is_not(None)
+        )
+        if not pushed and self.pushed_servers:
+            query = query.where(Article.review_server_id.not_in(self.pushed_servers))
+        with Session(self.engine) as session:
+            return list(session.execute(query).scalars())
+
+    async def refresh(self, base_claim_names=None):
+        """
+        Fetches the statuses of the given articles, or of all the articles with a review server
+        which does not push events. Concurrent refreshes of all the articles are merged into one.
+        """
+        if base_claim_names is None:
+            if self._refreshing is not None:
+                return await asyncio.shield(self._refreshing)
+            self._refreshing = asyncio.ensure_future(
+                self._refresh(self.tracked(pushed=False))
+            )
+            try:
+                return await asyncio.shield(self._refreshing)
+            finally:
+                self._refreshing = None
+        return await self._refresh(base_claim_names)
+
+    async def _refresh(self, base_claim_names):
+        height = self.height
+        try:
+            fetched = await self.fetch(base_claim_names)
+        except Exception as e:
+            fetched = {}
+            logger.warning("Could not fetch the statuses of the articles: %s", e)
+
+        results = [
+            (name, fetched.get(name, {"error": "Status could not be fetched"}))
+            for name in base_claim_names
+        ]
+
+        self._store(results, height)
+        self.refreshes += 1
+        return {name: self.get(name) for name, _ in results}
+
+    def apply(self, base_claim_name, status):
+        """
+        Replaces the status of an article by one received from its review server
+        """
+        self._store([(base_claim_name, status)], self.height)
+
+    def _store(self, results, height):
+        now = datetime.datetime.utcnow()
+        with Session(self.engine) as session:
+            # Statuses of unknown articles, e.g. pushed by a server or requested by a client, are not kept
+            local = set(
+                session.execute(
+                    select(Article.base_claim_name).where(
+                        Article.base_claim_name.in_([name for name, _ in results])
+                    )
+                ).scalars()
+            )
+            for name, status in results:
+                if name not in local:
+                    continue
+                row = session.get(ArticleStatus, name)
+                if row is None:
+                    row = ArticleStatus(base_claim_name=name)
+                    session.add(row)
+
+                if "error" in status:
+                    row.error = status["error"]
+                else:
+                    row.status = json.dumps(status)
+                    row.refreshed_at = now
+                    row.height = height
+                    row.error = None
+
+                self.statuses[name] = {
+                    "status": json.loads(row.status) if row.status else None,
+                    "refreshed_at": row.refreshed_at,
+                    "height": row.height,
+                    "error": row.error,
+                }
+            session.commit()
+
+    def get(self, base_claim_name):
+        """
+        Returns the last known status of an article with its age, or None if it was never fetched
+        """
+        entry = self.statuses.get(base_claim_name)
+        if entry is None or entry["status"] is None:
+            return None
+
+        age = (datetime.datetime.utcnow() - entry["refreshed_at"]).total_seconds()
+        return {
+            **entry["status"],
+            "refreshed_at": entry["refreshed_at"].isoformat(),
+            "refreshed_height": entry["height"],
+            "age": age,
+            "stale": age > self.interval
+            or (self.height is not None and entry["height"] != self.height),
+            "refresh_error": entry["error"],
+        }
@@ -0,0 +1,148 @@
+import os
+import logging
+import datetime
+
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session
+
+from papr.models import CachedSubmission, Review
+from papr.utilities import DualLogger
+
+logger = DualLogger(logging.getLogger(__name__))
+
+
+def _pinned_claims():
+    # Submissions whose review was not sent yet
+    return select(Review.submission_claim_name).where(
+        Review.review_date.is_(None), Review.submission_claim_name.is_not(None)
+    )
+
+
+class SubmissionCache:
+    """
+    Keeps track of the downloaded submissions and their size, and evicts the least recently used ones
+    when they take more than `quota` bytes.
+    Submissions with a review which was not sent yet are pinned and never evicted.
+    `delete(claim_name, path)` is a coroutine function removing a downloaded submission.
+    """
+
+    def __init__(self, engine, quota, delete):
+        self.engine = engine
+        self.quota = quota
+        self.delete = delete
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def lookup(self, claim_name):
+        """
+        Returns the path of a cached submission, or None if it was not downloaded or its file was removed
+        """
+        with Session(self.engine) as session:
+            entry = session.get(CachedSubmission, claim_name)
+            if entry is None or not os.path.isfile(entry.download_path):
+                if entry is not None:
+                    session.delete(entry)
+                    session.commit()
+                self.misses += 1
+                return None
+
+            entry.last_access = datetime.datetime.utcnow()
+            session.commit()
+            self.hits += 1
+            return entry.download_path
+
+    def add(self, claim_name, path):
+        now = datetime.datetime.utcnow()
+        with Session(self.engine) as session:
+            entry = session.get(CachedSubmission, claim_name)
+            if entry is None:
+                entry = CachedSubmission(claim_name=claim_name, download_date=now)
+                session.add(entry)
+            entry.download_path = path
+            entry.size = os.path.getsize(path)
+            entry.last_access = now
+            session.commit()
+
+    async def evict(self, quota=None, claim_name=None, keep=None):
+        """
+        Evicts the least recently used unpinned submissions, except `keep`, until they take at most `quota` bytes,
+        or only `claim_name`. Returns the claim names of the evicted submissions.
+        """
+        quota = self.quota if quota is None else quota
+        with Session(self.engine) as session:
+            total = session.execute(
+                select(func.coalesce(func.sum(CachedSubmission.size), 0))
+            ).scalar_one()
+
+            query = select(CachedSubmission).where(
+                CachedSubmission.claim_name.not_in(_pinned_claims())
+            )
+            if keep is not None:
+                query = query.where(CachedSubmission.claim_name != keep)
+            if claim_name is not None:
+                query = query.where(CachedSubmission.claim_name == claim_name)
+            elif total <= quota:
+                return []
+            candidates = (
+                session.execute(query.order_by(CachedSubmission.last_access))
+                .scalars()
+                .all()
+            )
+
+            evicted = []
+            for entry in candidates:
+                if claim_name is None and total <= quota:
+                    break
+                try:
+                    await self.delete(entry.claim_name, entry.download_path)
+                except Exception as e:
+                    logger.warning(
+                        "Could not evict submission %s: %s", entry.claim_name, e
+                    )
+                    continue
+
+                total -= entry.size
+                self.evictions += 1
+                self.evicted_bytes += entry.size
+                evicted.append(entry.claim_name)
+                session.delete(entry)
+
+            session.commit()
+
+        if evicted:
+            logger.info(
+                "Evicted %d submissions from the cache", len(evicted), evicted=evicted
+            )
+        return evicted
+
+    def stats(self):
+        with Session(self.engine) as session:
+            count, size = session.execute(
+                select(
+                    func.count(CachedSubmission.claim_name),
+                    func.coalesce(func.sum(CachedSubmission.size), 0),
+                )
+            ).one()
+            pinned_count, pinned_size = session.execute(
+                select(
+                    func.count(CachedSubmission.claim_name),
+                    func.coalesce(func.sum(CachedSubmission.size), 0),
+                ).where(CachedSubmission.claim_name.in_(_pinned_claims()))
+            ).one()
+
+        requests = self.hits + self.misses
+        return {
+            "submissions": count,
+            "size": size,
+            "quota": self.quota,
+            "pinned_submissions": pinned_count,
+            "pinned_size": pinned_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else None,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+        }
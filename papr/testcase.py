@@ -50,6 +50,8 @@ class PaprDaemonTestCase(CommandTestCase):
         )
         conf.upload_dir = upload_dir  # not a real conf setting
         conf.share_usage_data = False
+        # The mocked review servers do not publish events
+        conf.server_events = False
         conf.use_upnp = False
         conf.reflect_streams = True
         conf.blockchain_name = "lbrycrd_regtest"
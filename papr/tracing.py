@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import threading
+import contextlib
+import contextvars
+import collections
+
+# Number of finished spans buffered before they are appended to the export file
+EXPORT_BATCH_SIZE = 64
+
+_current_span = contextvars.ContextVar("papr_current_span", default=None)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "end",
+        "attributes",
+        "error",
+    )
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    @property
+    def duration(self):
+        if self.end is None:
+            return None
+        return (self.end - self.start) / 1e9
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start / 1e9,
+            "duration": self.duration,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,  # SPAN_KIND_INTERNAL
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [
+                {"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def otlp_request(spans):
+    """
+    Wraps spans in an OTLP ExportTraceServiceRequest, as used by the OTLP/JSON file format
+    """
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": "papr"}}
+                    ]
+                },
+                "scopeSpans": [
+                    {
+                        "scope": {"name": "papr"},
+                        "spans": [span.to_otlp() for span in spans],
+                    }
+                ],
+            }
+        ]
+    }
+
+
+class Tracer:
+    """
+    Records nested spans in a ring buffer and optionally appends them to an OTLP/JSON lines file.
+    Nesting follows the asyncio task (or thread) context in which spans are opened.
+    """
+
+    def __init__(self, max_spans=4096, export_path=None):
+        self.spans = collections.deque(maxlen=max_spans)
+        self.export_path = export_path
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def configure(self, max_spans=None, export_path=None):
+        self.flush()
+        with self._lock:
+            if max_spans is not None and max_spans != self.spans.maxlen:
+                self.spans = collections.deque(self.spans, maxlen=max_spans)
+            self.export_path = export_path or None
+
+    @contextlib.contextmanager
+    def span(self, name, **attributes):
+        parent = _current_span.get()
+        if parent is None:
+            span = Span(name, os.urandom(16).hex(), None, attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attributes)
+
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.time_ns()
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span):
+        with self._lock:
+            self.spans.append(span)
+            if self.export_path:
+                self._pending.append(span)
+                if len(self._pending) < EXPORT_BATCH_SIZE:
+                    return
+                pending, self._pending = self._pending, []
+            else:
+                return
+        self._export(pending)
+
+    def _export(self, spans):
+        if not spans or not self.export_path:
+            return
+        with open(self.export_path, "a") as f:
+            f.write(json.dumps(otlp_request(spans)) + "\n")
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        self._export(pending)
+
+    def query(self, trace_id=None, name=None, limit=100):
+        """
+        Returns the most recent finished spans, optionally filtered by trace id or name
+        """
+        with self._lock:
+            spans = list(self.spans)
+
+        res = []
+        for span in reversed(spans):
+            if trace_id and span.trace_id != trace_id:
+                continue
+            if name and span.name != name:
+                continue
+            res.append(span)
+            if len(res) >= limit:
+                break
+        return res
+
+
+tracer = Tracer()
@@ -4,52 +4,77 @@ import hashlib
 import logging
 import base64
 
-from cryptography.hazmat.primitives.ciphers import Cipher, modes
-from cryptography.hazmat.primitives.ciphers.algorithms import AES
-from cryptography.hazmat.primitives.padding import PKCS7
-from cryptography.hazmat.primitives import serialization, hashes
-from cryptography.hazmat.primitives.asymmetric import rsa, padding
-from cryptography.hazmat.backends import default_backend
-from coincurve import PrivateKey, PublicKey
-
-from lbry.crypto.crypt import scrypt
-
-from papr.constants import WORDS
-from papr.config import ENCRYPTION_NUM_WORDS, CHUNK_SIZE
+# The cryptography libraries and the constants (with the passphrase word list) are imported by
+# the functions using them: most entry points only need a few helpers of this module.
 
 logger = logging.getLogger(__name__)
 
 
 class DualLogger:
-    def __init__(self, logger):
-        self.logger = logger
-
-    def debug(self, msg):
-        self.logger.debug(msg)
-        return {"debug": msg}
-
-    def info(self, msg):
-        self.logger.info(msg)
-        return {"info": msg}
+    """
+    Logs messages lazily: `msg` is only formatted with `args` by the log handlers, if the level is enabled.
+    Keyword arguments are attached to the record as structured fields.
 
-    def warning(self, msg):
-        self.logger.warning(msg)
-        return {"warning": msg}
+    `error` and `critical` also return the formatted message as an error dict for RPC callers.
+    """
 
-    def error(self, msg):
-        self.logger.error(msg)
-        return {"error": msg}
+    def __init__(self, logger):
+        self.logger = logger
 
-    def critical(self, msg):
-        self.logger.critical(msg)
-        return {"error": msg}
+    def _log(self, level, msg, args, fields, exc_info=False):
+        if self.logger.isEnabledFor(level):
+            # stacklevel points the record at the caller of DualLogger
+            self.logger.log(
+                level,
+                msg,
+                *args,
+                extra={"fields": fields},
+                exc_info=exc_info,
+                stacklevel=3,
+            )
+
+    def debug(self, msg, *args, **fields):
+        self._log(logging.DEBUG, msg, args, fields)
+
+    def info(self, msg, *args, **fields):
+        self._log(logging.INFO, msg, args, fields)
+
+    def warning(self, msg, *args, **fields):
+        self._log(logging.WARNING, msg, args, fields)
+
+    def error(self, msg, *args, **fields):
+        error = rpc_error(msg, *args)
+        self._log(logging.ERROR, "%s", (error["error"],), fields)
+        return error
+
+    def exception(self, msg, *args, **fields):
+        """
+        Logs an error with the traceback of the exception being handled
+        """
+        self._log(logging.ERROR, msg, args, fields, exc_info=True)
+
+    def critical(self, msg, *args, **fields):
+        error = rpc_error(msg, *args)
+        self._log(logging.CRITICAL, "%s", (error["error"],), fields)
+        return error
+
+
+def rpc_error(msg, *args):
+    """
+    Error dict returned to RPC callers, independently of logging
+    """
+    return {"error": msg % args if args else msg}
 
 
 def generate_human_readable_passphrase():
+    from papr.constants import WORDS, ENCRYPTION_NUM_WORDS
+
     return " ".join(random.choices(WORDS, k=ENCRYPTION_NUM_WORDS))
 
 
 def read_all_bytes(path):
+    from papr.constants import CHUNK_SIZE
+
     data = b""
     with open(path, "rb") as f:
         while True:
@@ -61,6 +86,8 @@ def read_all_bytes(path):
 
 
 def file_sha256(path):
+    from papr.constants import CHUNK_SIZE
+
     h = hashlib.sha256()
     with open(path, "rb") as f:
         while True:
@@ -72,6 +99,9 @@ def file_sha256(path):
 
 
 def rsa_encrypt_text(txt, pubkey):
+    from cryptography.hazmat.primitives import serialization, hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
     key = serialization.load_ssh_public_key(pubkey)
     return key.encrypt(
         txt.encode("UTF-8"),
@@ -84,6 +114,9 @@ def rsa_encrypt_text(txt, pubkey):
 
 
 def rsa_decrypt_text(data: bytes, private_key: bytes, password: str):
+    from cryptography.hazmat.primitives import serialization, hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
+
     _password = password.encode("UTF-8")
     key = serialization.load_pem_private_key(private_key, _password)
     return key.decrypt(
@@ -97,6 +130,10 @@ def rsa_decrypt_text(data: bytes, private_key: bytes, password: str):
 
 
 def generate_rsa_keys(password: str):
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    from cryptography.hazmat.backends import default_backend
+
     key = rsa.generate_private_key(
         backend=default_backend(), public_exponent=65537, key_size=2048
     )
@@ -117,6 +154,8 @@ def generate_rsa_keys(password: str):
 
 
 def generate_SECP256k1_keys(password: str):
+    from coincurve import PrivateKey
+
     if password:
         private_key = PrivateKey(secret=password.encode())
     else:
@@ -128,7 +167,7 @@ def generate_SECP256k1_keys(password: str):
     _public_key = base64.b64encode(public_key.format()).decode()
 
     if private_key.to_hex().count("0") >= 8:
-        logger.warning(f"Possibly weak key generated!")
+        logger.warning("Possibly weak key generated!")
 
     return _private_key, _public_key
 
@@ -137,6 +176,8 @@ def SECP_encrypt_text(sender_private_key: str, recipient_public_key: str, msg: s
     """
     Encrypts `msg` using AES256 and a shared secret generated with ECDH and two SECP256k1 keys as base64 strings
     """
+    from coincurve import PrivateKey, PublicKey
+
     priv = PrivateKey.from_pem(base64.b64decode(sender_private_key.encode()))
     pub = PublicKey(base64.b64decode(recipient_public_key.encode()))
     shared_secret = priv.ecdh(pub.format())
@@ -149,6 +190,8 @@ def SECP_encrypt_text(sender_private_key: str, recipient_public_key: str, msg: s
 def SECP_decrypt_text_from_hex(
     recipient_private_key: bytes, sender_public_key: str, encrypted_msg: str
 ):
+    from coincurve import PrivateKey, PublicKey
+
     priv = PrivateKey.from_hex(recipient_private_key)
     pub = PublicKey(base64.b64decode(sender_public_key.encode()))
     return _SECP_decrypt_text(priv, pub, encrypted_msg)
@@ -157,12 +200,14 @@ def SECP_decrypt_text_from_hex(
 def SECP_decrypt_text(
     recipient_private_key: str, sender_public_key: str, encrypted_msg: str
 ):
+    from coincurve import PrivateKey, PublicKey
+
     priv = PrivateKey.from_pem(base64.b64decode(recipient_private_key.encode()))
     pub = PublicKey(base64.b64decode(sender_public_key.encode()))
     return _SECP_decrypt_text(priv, pub, encrypted_msg)
 
 
-def _SECP_decrypt_text(priv: PrivateKey, pub: PublicKey, encrypted_msg: str):
+def _SECP_decrypt_text(priv: "PrivateKey", pub: "PublicKey", encrypted_msg: str):
     shared_secret = priv.ecdh(pub.format())
 
     msg = aes_decrypt_bytes(shared_secret, encrypted_msg.encode()).decode()
@@ -172,6 +217,12 @@ def _SECP_decrypt_text(priv: PrivateKey, pub: PublicKey, encrypted_msg: str):
 
 # Based on github.com/lbryio/lbry-sdk/blob/master/lbry/crypto/crypt.py@6647dd
 def aes_encrypt_bytes(secret: bytes, value: bytes) -> bytes:
+    from cryptography.hazmat.primitives.ciphers import Cipher, modes
+    from cryptography.hazmat.primitives.ciphers.algorithms import AES
+    from cryptography.hazmat.primitives.padding import PKCS7
+    from cryptography.hazmat.backends import default_backend
+    from lbry.crypto.crypt import scrypt
+
     init_vector = os.urandom(16)
     key = scrypt(secret, salt=init_vector)
     encryptor = Cipher(AES(key), modes.CBC(init_vector), default_backend()).encryptor()
@@ -183,6 +234,12 @@ def aes_encrypt_bytes(secret: bytes, value: bytes) -> bytes:
 
 # Based on github.com/lbryio/lbry-sdk/blob/master/lbry/crypto/crypt.py@6647dd
 def aes_decrypt_bytes(secret: bytes, value: bytes) -> bytes:
+    from cryptography.hazmat.primitives.ciphers import Cipher, modes
+    from cryptography.hazmat.primitives.ciphers.algorithms import AES
+    from cryptography.hazmat.primitives.padding import PKCS7
+    from cryptography.hazmat.backends import default_backend
+    from lbry.crypto.crypt import scrypt
+
     try:
         data = base64.b64decode(value)
         _, scryp_n, scrypt_r, scrypt_p, data = data.split(b":", maxsplit=4)
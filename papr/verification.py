@@ -0,0 +1,203 @@
+import time
+import asyncio
+import binascii
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from lbry.crypto.hash import sha256
+from lbry.wallet.bip32 import PublicKey
+from lbry.wallet.transaction import Output
+
+# Number of signatures verified by a worker in one task
+VERIFY_CHUNK_SIZE = 32
+
+
+class LRUCache:
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = collections.OrderedDict()
+
+    def get(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        self._data[key] = (value, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+    def clear(self):
+        self._data.clear()
+
+
+def review_digest(review, claim_hash):
+    """
+    Digest signed by `channel_sign` for the review text, as computed by the lbry SDK
+    """
+    return sha256(
+        str(review["signing_ts"]).encode() + claim_hash + review["review"].encode()
+    )
+
+
+def _verify_signature(pubkey, signature, digest):
+    try:
+        return pubkey.verify(signature, digest)
+    except ValueError:  # Malformed signature
+        return False
+
+
+def _verify_signatures(items):
+    return [_verify_signature(*item) for item in items]
+
+
+class ReviewVerifier:
+    """
+    Verifies that reviews were signed by the expected channels.
+
+    Each distinct channel of a batch is resolved once and its public key is cached by claim id,
+    signatures are verified on a thread pool and successfully verified (digest, signature) pairs are remembered.
+    """
+
+    def __init__(
+        self, resolve, workers=4, max_channels=1024, key_ttl=600, max_verified=65536
+    ):
+        self.resolve = resolve
+        self.channel_ids = LRUCache(max_channels, ttl=key_ttl)  # name -> claim id
+        self.channel_keys = LRUCache(max_channels, ttl=key_ttl)
+        self.verified = LRUCache(max_verified)
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="papr-verify"
+        )
+
+        self.resolved = 0
+        self.verified_hits = 0
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+    async def _load_channels(self, names):
+        """
+        Resolves the channels of `names` whose claim id is not cached, all in one call.
+        Returns the names which could not be resolved with the reason.
+        """
+        missing = [n for n in names if self._channel(n) is None]
+        if not missing:
+            return {}
+
+        hits = await self.resolve(missing)
+        self.resolved += len(missing)
+
+        errors = {}
+        for name in missing:
+            res = hits.get(name)
+            if not isinstance(res, Output) or not res.claim.is_channel:
+                errors[name] = f"Could not resolve channel {name}"
+                continue
+
+            self.channel_ids.set(name, res.claim_id)
+            self.channel_keys.set(
+                res.claim_id,
+                (
+                    PublicKey.from_compressed(res.claim.channel.public_key_bytes),
+                    res.claim_hash,
+                ),
+            )
+        return errors
+
+    def _channel(self, name):
+        claim_id = self.channel_ids.get(name)
+        if claim_id is None:
+            return None
+        key = self.channel_keys.get(claim_id)
+        if key is None:
+            return None
+        return (claim_id, *key)
+
+    async def verify_many(self, reviews):
+        """
+        `reviews` are dicts with the keys `review`, `signature`, `signing_ts` and `channel_name`.
+        Returns a list of {"valid": bool} dicts in the same order, with an `error` key when the review could not be checked.
+        """
+        results = [None] * len(reviews)
+
+        names = {r["channel_name"] for r in reviews if "channel_name" in r}
+        errors = await self._load_channels(names)
+
+        pending = []
+        for i, review in enumerate(reviews):
+            name = review.get("channel_name")
+            if name is None:
+                results[i] = {"valid": False, "error": "No channel name given"}
+                continue
+            channel = self._channel(name)
+            if channel is None:
+                error = errors.get(name, f"Could not load the key of channel {name}")
+                results[i] = {"valid": False, "error": error}
+                continue
+
+            claim_id, pubkey, claim_hash = channel
+            if review.get("channel_id") and review["channel_id"] != claim_id:
+                results[i] = {
+                    "valid": False,
+                    "error": f"Channel {name} does not have the claim id {review['channel_id']}",
+                }
+                continue
+
+            try:
+                signature = binascii.unhexlify(review["signature"].encode())
+                digest = review_digest(review, claim_hash)
+            except (KeyError, ValueError, binascii.Error) as e:
+                results[i] = {"valid": False, "error": f"Malformed review: {e}"}
+                continue
+
+            if self.verified.get((digest, signature)):
+                self.verified_hits += 1
+                results[i] = {"valid": True}
+                continue
+
+            pending.append((i, pubkey, signature, digest))
+
+        loop = asyncio.get_running_loop()
+        chunks = [
+            pending[i : i + VERIFY_CHUNK_SIZE]
+            for i in range(0, len(pending), VERIFY_CHUNK_SIZE)
+        ]
+        verified_chunks = await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self.executor,
+                    _verify_signatures,
+                    [(pubkey, sig, digest) for _, pubkey, sig, digest in chunk],
+                )
+                for chunk in chunks
+            )
+        )
+
+        for chunk, verified in zip(chunks, verified_chunks):
+            for (i, _, signature, digest), valid in zip(chunk, verified):
+                if valid:
+                    self.verified.set((digest, signature), True)
+                results[i] = {"valid": bool(valid)}
+
+        return results
+
+    def stats(self):
+        return {
+            "cached_channels": len(self.channel_keys),
+            "cached_verifications": len(self.verified),
+            "channels_resolved": self.resolved,
+            "verification_cache_hits": self.verified_hits,
+        }
@@ -0,0 +1,12 @@
+from setuptools import setup
+
+setup(
+    name="papr",
+    version="0.1.0",
+    description="Practical decentralized open scientific publishing on the LBRY blockchain",
+    packages=["papr"],
+    python_requires=">=3.7",
+    install_requires=["appdirs", "click", "requests", "sqlalchemy", "aiohttp"],
+    extras_require={"msgpack": ["msgpack"], "numpy": ["numpy"]},
+    entry_points={"console_scripts": ["papr=papr.cli:cli"]},
+)
@@ -0,0 +1,201 @@
+import os
+import json
+import asyncio
+import tempfile
+import threading
+import unittest
+import importlib.util
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from click.testing import CliRunner
+
+from papr import cli, codec
+from papr.client import PaprClient
+
+
+class FakeDaemonHandler(BaseHTTPRequestHandler):
+    """
+    Answers `echo` calls with their params and `fail` calls with an error, in reverse order,
+    without answering `lost` calls
+    """
+
+    def do_POST(self):
+        content_type = self.headers["Content-Type"]
+        calls = codec.decode(
+            self.rfile.read(int(self.headers["Content-Length"])), content_type
+        )
+        self.server.requests.append(calls)
+
+        responses = []
+        for call in calls if isinstance(calls, list) else [calls]:
+            if call["method"] == "echo":
+                responses.append({"id": call["id"], "result": call["params"]})
+            elif call["method"] == "fail":
+                responses.append({"id": call["id"], "error": {"message": "failed"}})
+        if isinstance(calls, list):
+            responses.reverse()
+        else:
+            responses = responses[0]
+
+        body = codec.encode(responses, content_type)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ClientBatchTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeDaemonHandler)
+        self.server.requests = []
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/"
+
+    def batch(self, calls, binary=False, batch_size=100):
+        with PaprClient(self.url, binary=binary) as client:
+            return list(client.batch(calls, batch_size=batch_size))
+
+    def test_mixed_results_in_order(self):
+        calls = [("echo", {"n": 0}), ("fail", {}), ("lost", {}), ("echo", {"n": 3})]
+        responses = self.batch(calls)
+
+        self.assertEqual(responses[0]["result"], {"n": 0})
+        self.assertEqual(responses[1]["error"]["message"], "failed")
+        self.assertEqual(
+            responses[2]["error"]["message"], "No response received for this call"
+        )
+        self.assertEqual(responses[3]["result"], {"n": 3})
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_batch_size(self):
+        responses = self.batch((("echo", {"n": i}) for i in range(25)), batch_size=10)
+        self.assertEqual([r["result"]["n"] for r in responses], list(range(25)))
+        self.assertEqual([len(r) for r in self.server.requests], [10, 10, 5])
+
+    @unittest.skipUnless(codec.available(codec.MSGPACK), "msgpack is not installed")
+    def test_msgpack(self):
+        responses = self.batch([("echo", {"data": b"\0\1"}), ("fail", {})], binary=True)
+        self.assertEqual(responses[0]["result"], {"data": b"\0\1"})
+        self.assertIn("error", responses[1])
+
+    def run_cli(self, lines):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "calls.jsonl")
+            with open(path, "w") as f:
+                f.write("\n".join(lines) + "\n")
+            cli._client.cache_clear()
+            self.addCleanup(cli._client.cache_clear)
+            return CliRunner().invoke(cli.cli, ["--url", self.url, "batch", path])
+
+    def test_cli(self):
+        result = self.run_cli(
+            [
+                json.dumps({"method": "echo", "params": {"n": 0}}),
+                "",
+                json.dumps({"method": "fail"}),
+                json.dumps({"method": "echo", "params": {"n": 2}}),
+            ]
+        )
+        self.assertEqual(result.exit_code, 0, result.output)
+        responses = [json.loads(line) for line in result.stdout.splitlines()]
+        self.assertEqual(
+            [r.get("result") for r in responses], [{"n": 0}, None, {"n": 2}]
+        )
+        self.assertIn("1 call(s) failed", result.stderr)
+
+    def test_cli_invalid_line(self):
+        for line in ("{not json", json.dumps(["echo"]), json.dumps({"params": {}})):
+            result = self.run_cli([json.dumps({"method": "echo"}), line])
+            self.assertNotEqual(result.exit_code, 0)
+            self.assertIn("Line 2 of", result.output)
+        # Nothing is sent when the file is invalid
+        self.assertEqual(self.server.requests, [])
+
+
+@unittest.skipUnless(importlib.util.find_spec("lbry"), "lbry is not installed")
+class DaemonBatchTests(unittest.TestCase):
+    def setUp(self):
+        from papr.daemon import PaprDaemon
+
+        self.daemon = PaprDaemon.__new__(PaprDaemon)
+        self.daemon.conf = SimpleNamespace(allowed_origin="", rpc_batch_concurrency=2)
+        self.daemon.component_manager = mock.Mock(
+            get_components_status=mock.Mock(return_value={})
+        )
+
+        self.running = 0
+        self.max_running = 0
+
+        async def process_rpc_call(data):
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            await asyncio.sleep(0.01 if data["method"] == "slow" else 0)
+            self.running -= 1
+            if data["method"] == "fail":
+                from lbry.extras.daemon.daemon import JSONRPCError
+
+                return JSONRPCError("failed", JSONRPCError.CODE_INVALID_PARAMS)
+            return data["params"]
+
+        self.daemon._process_rpc_call = process_rpc_call
+
+    def request(self, calls, content_type=codec.JSON, accept=None, origin=None):
+        body = codec.encode(calls, content_type)
+        headers = {"Content-Type": content_type}
+        if accept is not None:
+            headers["Accept"] = accept
+        if origin is not None:
+            headers["Origin"] = origin
+
+        async def read():
+            return body
+
+        request = SimpleNamespace(headers=headers, content_type=content_type, read=read)
+        response = asyncio.run(self.daemon.handle_old_jsonrpc(request))
+        return codec.decode(response.body, response.content_type)
+
+    def test_mixed_results_in_order(self):
+        calls = [
+            {"jsonrpc": "2.0", "id": 1, "method": "slow", "params": {"n": 1}},
+            {"jsonrpc": "2.0", "id": 2, "method": "fail", "params": {}},
+            {"jsonrpc": "2.0", "method": "notification", "params": {}},
+            "not a call",
+            {"jsonrpc": "2.0", "id": 3, "method": "echo", "params": {"n": 3}},
+        ]
+        responses = self.request(calls)
+        self.assertEqual([r["id"] for r in responses], [1, 2, None, 3])
+        self.assertEqual(responses[0]["result"], {"n": 1})
+        self.assertEqual(responses[1]["error"]["message"], "failed")
+        self.assertIn("error", responses[2])
+        self.assertEqual(responses[3]["result"], {"n": 3})
+
+    def test_concurrency_limit(self):
+        calls = [
+            {"jsonrpc": "2.0", "id": i, "method": "slow", "params": {}}
+            for i in range(6)
+        ]
+        self.assertEqual(len(self.request(calls)), 6)
+        self.assertEqual(self.max_running, 2)
+
+    @unittest.skipUnless(codec.available(codec.MSGPACK), "msgpack is not installed")
+    def test_msgpack(self):
+        calls = [{"jsonrpc": "2.0", "id": 1, "method": "echo", "params": {"b": b"\0"}}]
+        responses = self.request(calls, codec.MSGPACK, accept=codec.MSGPACK)
+        self.assertEqual(responses[0]["result"], {"b": b"\0"})
+
+    def test_disallowed_origin(self):
+        from aiohttp import web
+
+        calls = [{"jsonrpc": "2.0", "id": 1, "method": "echo", "params": {}}]
+        with self.assertRaises(web.HTTPForbidden):
+            self.request(calls, origin="http://attacker.example")
+        self.assertEqual(self.max_running, 0)
@@ -0,0 +1,297 @@
+import os
+import json
+import asyncio
+import zipfile
+import hashlib
+import tempfile
+import importlib.util
+import unittest
+from unittest import mock
+
+from papr.bundle import (
+    MANIFEST_NAME,
+    IntegrityError,
+    process_files,
+    make_manifest,
+    write_bundle,
+    read_manifest,
+    unseal_manifest,
+    read_bundle_file,
+    iter_bundle_range,
+    _iter_entry,
+)
+from papr.encryption import (
+    new_content_key,
+    passphrase_encryption_key,
+    decrypt_chunks,
+    DecryptionError,
+    wrap_key,
+    unwrap_key,
+)
+from papr.utilities import generate_SECP256k1_keys
+
+
+class BundleTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+
+        self.contents = {
+            "Manuscript.pdf": os.urandom(100_000),
+            "supplementary/data.csv": b"x,y\n" + b"1,2\n" * 50_000,
+            "supplementary/empty.txt": b"",
+        }
+        self.files = {}
+        for i, (name, data) in enumerate(self.contents.items()):
+            path = os.path.join(self.dir, f"file{i}")
+            with open(path, "wb") as f:
+                f.write(data)
+            self.files[name] = path
+
+    def bundle(self, key=None, scrypt=None, encryption=None):
+        work_dir = os.path.join(self.dir, "work")
+        os.makedirs(work_dir, exist_ok=True)
+        manifest, sources = asyncio.run(
+            process_files(self.files, work_dir, key=key, scrypt=scrypt)
+        )
+
+        zip_path = os.path.join(self.dir, "bundle.zip")
+        write_bundle(
+            zip_path,
+            {MANIFEST_NAME: make_manifest(manifest, encryption, key, scrypt)},
+            {name: (path, key is None) for name, path in sources.items()},
+        )
+        return zip_path
+
+    def test_plain_bundle(self):
+        with zipfile.ZipFile(self.bundle()) as z:
+            manifest = read_manifest(z)
+            self.assertEqual(
+                [e["name"] for e in manifest["files"]], list(self.contents)
+            )
+            for entry in manifest["files"]:
+                data = self.contents[entry["name"]]
+                self.assertEqual(entry["sha256"], hashlib.sha256(data).hexdigest())
+                self.assertEqual(z.read(entry["name"]), data)
+                self.assertEqual(read_bundle_file(z, entry["name"]), data)
+
+    def test_encrypted_bundle(self):
+        key = new_content_key()
+        with zipfile.ZipFile(self.bundle(key=key, encryption="envelope")) as z:
+            manifest = read_manifest(z)
+            self.assertEqual(manifest["encryption"], "envelope")
+            # Only the digests of the stored files are published
+            for entry in manifest["files"]:
+                self.assertNotIn("sha256", entry)
+                self.assertNotIn("size", entry)
+            with self.assertRaises(DecryptionError):
+                unseal_manifest(manifest, key=new_content_key())
+            manifest = unseal_manifest(manifest, key=key)
+
+            compression = {e["name"]: e["compression"] for e in manifest["files"]}
+            self.assertEqual(compression["Manuscript.pdf"], "none")
+            self.assertEqual(compression["supplementary/data.csv"], "deflate")
+
+            for entry in manifest["files"]:
+                data = self.contents[entry["name"]]
+                self.assertEqual(entry["sha256"], hashlib.sha256(data).hexdigest())
+                self.assertEqual(entry["size"], len(data))
+                stored = z.read(entry["name"])
+                self.assertEqual(
+                    entry["stored_sha256"], hashlib.sha256(stored).hexdigest()
+                )
+                self.assertEqual(
+                    read_bundle_file(z, entry["name"], key=key),
+                    self.contents[entry["name"]],
+                )
+
+    def test_passphrase_bundle(self):
+        key, scrypt = passphrase_encryption_key("passphrase")
+        zip_path = self.bundle(key=bytes(key), scrypt=scrypt, encryption="passphrase")
+        with zipfile.ZipFile(zip_path) as z:
+            self.assertEqual(
+                read_bundle_file(z, "supplementary/data.csv", passphrase="passphrase"),
+                self.contents["supplementary/data.csv"],
+            )
+
+    @unittest.skipUnless(importlib.util.find_spec("lbry"), "lbry is not installed")
+    def test_shared_bundle(self):
+        # The author shares the key of a bundle published for the review server with a reviewer
+        author_private, author_public = generate_SECP256k1_keys("")
+        _, server_public = generate_SECP256k1_keys("")
+        reviewer_private, reviewer_public = generate_SECP256k1_keys("")
+
+        key = new_content_key()
+        published = {"@server": wrap_key(author_private, server_public, key)}
+        shared = wrap_key(author_private, reviewer_public, key)
+
+        from papr.daemon import PaprDaemon
+
+        async def channel_keys():
+            return reviewer_private, reviewer_public
+
+        reviewer = mock.Mock(channel_name="@reviewer", _channel_keys=channel_keys)
+        keys = {"sender_public_key": author_public, "recipients": published}
+        unwrap = PaprDaemon._unwrap_bundle_key
+
+        res = asyncio.run(unwrap(reviewer, "article-v1", keys))
+        self.assertIn("was not shared with channel @reviewer", res["error"])
+        reviewer_key = asyncio.run(unwrap(reviewer, "article-v1", keys, shared))
+        self.assertEqual(
+            reviewer_key, unwrap_key(reviewer_private, author_public, shared)
+        )
+
+        with zipfile.ZipFile(self.bundle(key=key, encryption="envelope")) as z:
+            self.assertEqual(
+                read_bundle_file(z, "Manuscript.pdf", key=reviewer_key),
+                self.contents["Manuscript.pdf"],
+            )
+
+    def test_ranges(self):
+        key = new_content_key()
+        for k in (None, key):
+            with zipfile.ZipFile(self.bundle(key=k)) as z:
+                for name, data in self.contents.items():
+                    for start, end in (
+                        (0, None),
+                        (10, 20),
+                        (65_530, 70_000),
+                        (5, 10**9),
+                    ):
+                        self.assertEqual(
+                            b"".join(iter_bundle_range(z, name, start, end, key=k)),
+                            data[start:end],
+                        )
+
+    def test_deflated_range(self):
+        # Several sync points, the range being read from the last one
+        data = b"".join(b"%08d\n" % i for i in range(400_000))
+        self.files = {"data.txt": os.path.join(self.dir, "data.txt")}
+        with open(self.files["data.txt"], "wb") as f:
+            f.write(data)
+
+        key = new_content_key()
+        with zipfile.ZipFile(self.bundle(key=key)) as z:
+            entry = unseal_manifest(read_manifest(z), key=key)["files"][0]
+            self.assertEqual(entry["compression"], "deflate")
+            self.assertEqual(len(entry["sync_points"]), 4)
+
+            start = len(data) - 100_000
+            with mock.patch("papr.bundle.decrypt_chunks", wraps=decrypt_chunks) as spy:
+                part = b"".join(iter_bundle_range(z, "data.txt", start, key=key))
+            self.assertEqual(part, data[start:])
+            self.assertGreater(spy.call_args.kwargs["start_chunk"], 0)
+
+    def test_digest_mismatch(self):
+        zip_path = self.bundle()
+        with zipfile.ZipFile(zip_path) as z:
+            manifest = read_manifest(z)
+        manifest["files"][0]["sha256"] = "0" * 64
+
+        with zipfile.ZipFile(zip_path) as z:
+            with self.assertRaises(IntegrityError):
+                read_bundle_file(z, "Manuscript.pdf", manifest=manifest)
+
+
+class ChunkedBundleTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        self.bundles = {}
+
+    def publish(self, claim_name, data, known, key=None):
+        path = os.path.join(self.dir, f"{claim_name}.bin")
+        with open(path, "wb") as f:
+            f.write(data)
+        work_dir = os.path.join(self.dir, f"{claim_name}_work")
+        os.makedirs(work_dir)
+
+        manifest, sources = asyncio.run(
+            process_files({"data.bin": path}, work_dir, key=key, known_chunks=known)
+        )
+        zip_path = os.path.join(self.dir, f"{claim_name}.zip")
+        write_bundle(
+            zip_path,
+            {MANIFEST_NAME: make_manifest(manifest, key=key)},
+            {name: (p, key is None) for name, p in sources.items()},
+        )
+        self.bundles[claim_name] = zipfile.ZipFile(zip_path)
+        self.addCleanup(self.bundles[claim_name].close)
+
+        for digest, chunk_id in manifest[0]["chunk_digests"].items():
+            known.setdefault(digest, (chunk_id, claim_name))
+        return self.bundles[claim_name]
+
+    def check_revisions(self, key=None):
+        known = {}
+        data = os.urandom(3 * 1024 * 1024)
+        revised = data[:1_000_000] + b"revised" + data[1_000_000:]
+
+        first = self.publish("r0", data, known, key)
+        second = self.publish("r1", revised, known, key)
+
+        stored = [n for n in second.namelist() if n.startswith("chunks/")]
+        chunks = read_manifest(second)["files"][0]["chunks"]
+        self.assertLess(len(stored), len(chunks))
+        self.assertEqual(set(read_manifest(second)["chunks"].values()), {"r0"})
+        # The plain digests are not published, nor the offsets of encrypted chunks
+        self.assertNotIn("chunk_digests", read_manifest(second)["files"][0])
+        if key is not None:
+            self.assertNotIn("chunk_offsets", read_manifest(second)["files"][0])
+
+        self.assertEqual(read_bundle_file(first, "data.bin", key=key), data)
+        self.assertEqual(
+            read_bundle_file(
+                second, "data.bin", key=key, open_bundle=self.bundles.__getitem__
+            ),
+            revised,
+        )
+        with self.assertRaises(IntegrityError):
+            read_bundle_file(second, "data.bin", key=key)
+
+        part = iter_bundle_range(
+            second,
+            "data.bin",
+            2_000_000,
+            2_500_000,
+            key=key,
+            open_bundle=self.bundles.__getitem__,
+        )
+        with mock.patch("papr.bundle._iter_entry", wraps=_iter_entry) as spy:
+            self.assertEqual(b"".join(part), revised[2_000_000:2_500_000])
+        # Only the chunks of the range are read
+        manifest = unseal_manifest(read_manifest(second), key=key)
+        offsets = manifest["files"][0]["chunk_offsets"] + [len(revised)]
+        in_range = [
+            i
+            for i in range(len(chunks))
+            if offsets[i] < 2_500_000 and offsets[i + 1] > 2_000_000
+        ]
+        self.assertEqual(spy.call_count, len(in_range))
+
+    def test_tampered_chunk(self):
+        known = {}
+        data = os.urandom(3 * 1024 * 1024)
+        first = self.publish("r0", data, known)
+        second = self.publish("r1", data + b"revised", known)
+
+        # Bundle claimed under the name of the first revision, with other content for its chunks
+        tampered = os.path.join(self.dir, "tampered.zip")
+        with zipfile.ZipFile(tampered, "w") as z:
+            for name in first.namelist():
+                z.writestr(
+                    name, b"\0" + os.urandom(100) if name != MANIFEST_NAME else b""
+                )
+        self.bundles["r0"] = zipfile.ZipFile(tampered)
+        self.addCleanup(self.bundles["r0"].close)
+
+        with self.assertRaises(IntegrityError):
+            read_bundle_file(second, "data.bin", open_bundle=self.bundles.__getitem__)
+
+    def test_plain_revisions(self):
+        self.check_revisions()
+
+    def test_encrypted_revisions(self):
+        self.check_revisions(new_content_key())
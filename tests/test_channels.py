@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+import importlib.util
+from unittest import mock
+
+from papr.channels import ChannelContext, current_channel
+
+
+@unittest.skipUnless(importlib.util.find_spec("lbry"), "lbry is not installed")
+class ChannelCallTests(unittest.TestCase):
+    """
+    Calls made as different channels through the JSON-RPC dispatch of the daemon
+    """
+
+    def setUp(self):
+        from lbry.extras.daemon.daemon import Daemon
+        from papr.daemon import PaprDaemon
+        from papr.exceptions import PaprException
+
+        daemon = self.daemon = PaprDaemon.__new__(PaprDaemon)
+        daemon.channels = {
+            name: ChannelContext(name, claim_id)
+            for name, claim_id in [
+                ("@Steve", "1" * 40),
+                ("@Bob", "2" * 40),
+            ]
+        }
+        daemon.default_channel = daemon.channels["@Steve"]
+        self.requested = []
+
+        async def get_api_token(base_url):
+            self.requested.append((daemon.channel_name, base_url))
+            await asyncio.sleep(0.01)
+            daemon._channel_context().tokens[base_url] = {
+                "HTTP_AUTHORIZATION": f"Bearer {daemon.channel_name}"
+            }
+
+        async def find_channel(name):
+            raise PaprException(f"Could not find channel {name}")
+
+        daemon._get_api_token = get_api_token
+        daemon._find_channel = find_channel
+
+        # The base dispatch calls the method with the params left by PaprDaemon
+        async def process_rpc_call(self, data):
+            headers = await self._server_headers(**data["params"])
+            await asyncio.sleep(0)
+            return {"channel": self.channel_name, "headers": headers}
+
+        patch = mock.patch.object(Daemon, "_process_rpc_call", process_rpc_call)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def call(self, base_url, as_channel=None):
+        params = {"base_url": base_url}
+        if as_channel is not None:
+            params["as_channel"] = as_channel
+        return self.daemon._process_rpc_call(
+            {"method": "server_headers", "params": params}
+        )
+
+    def test_concurrent_calls_as_channels(self):
+        async def run():
+            results = await asyncio.gather(
+                self.call("http://server", "@Bob"),
+                self.call("http://server"),
+                self.call("http://server", "@Bob"),
+                self.call("http://server", "@Steve"),
+            )
+            return results, current_channel.get()
+
+        results, outer = asyncio.run(run())
+        self.assertEqual(
+            [r["channel"] for r in results], ["@Bob", "@Steve", "@Bob", "@Steve"]
+        )
+        for res in results:
+            self.assertEqual(
+                res["headers"], {"HTTP_AUTHORIZATION": f"Bearer {res['channel']}"}
+            )
+        # Each channel requested its token once, concurrent calls waiting for it
+        self.assertEqual(
+            sorted(self.requested),
+            [("@Bob", "http://server"), ("@Steve", "http://server")],
+        )
+        self.assertEqual(
+            self.daemon.channels["@Bob"].status()["authenticated_servers"],
+            ["http://server"],
+        )
+        self.assertIsNone(outer)
+
+    def test_unknown_channel(self):
+        res = asyncio.run(self.call("http://server", "@Unknown"))
+        self.assertIn("Could not find channel @Unknown", res.message)
+        self.assertEqual(self.requested, [])
@@ -0,0 +1,29 @@
+import io
+import os
+import unittest
+
+from papr.chunking import _numpy, find_boundary, iter_chunks
+
+
+class ChunkingTests(unittest.TestCase):
+    def test_chunks(self):
+        data = os.urandom(200_000)
+        chunks = list(iter_chunks(io.BytesIO(data), 1000, 4096, 16384))
+        self.assertEqual(b"".join(chunks), data)
+        self.assertTrue(all(1000 <= len(c) <= 16384 for c in chunks[:-1]))
+
+        # An insertion only changes the chunks around it
+        revised = data[:100_000] + b"revised" + data[100_000:]
+        revised_chunks = list(iter_chunks(io.BytesIO(revised), 1000, 4096, 16384))
+        self.assertGreater(len(set(chunks) & set(revised_chunks)), len(chunks) - 4)
+
+    @unittest.skipIf(_numpy() is None, "numpy is not installed")
+    def test_vectorized(self):
+        data = os.urandom(300_000)
+        for sizes in ((1000, 4096, 16384), (10, 64, 300), (1, 2, 8)):
+            position = 0
+            while position < min(len(data), 100 * sizes[2]):
+                window = data[position : position + sizes[2]]
+                size = find_boundary(window, *sizes)
+                self.assertEqual(size, find_boundary(window, *sizes, vectorized=False))
+                position += size
@@ -0,0 +1,178 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+import subprocess
+from unittest import mock
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules which the cold start of the command line application must not import
+HEAVY_MODULES = [
+    "lbry",
+    "coincurve",
+    "cryptography",
+    "sqlalchemy",
+    "aiohttp",
+    "msgpack",
+    "papr.daemon",
+    "papr.utilities",
+]
+
+PROBE = """
+import sys
+from papr.cli import cli
+try:
+    cli.main(sys.argv[1:], prog_name="papr", standalone_mode=False)
+finally:
+    heavy = [m for m in {heavy!r} if m in sys.modules]
+    print("HEAVY:" + ",".join(heavy))
+"""
+
+
+class ColdStartTests(unittest.TestCase):
+    def run_probe(self, code, *args):
+        env = dict(os.environ, PYTHONPATH=ROOT_DIR, PYTHONDONTWRITEBYTECODE="1")
+        proc = subprocess.run(
+            [sys.executable, "-c", code, *args],
+            env=env,
+            cwd=ROOT_DIR,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        imported = proc.stdout.strip().splitlines()[-1][len("HEAVY:") :]
+        return [m for m in imported.split(",") if m]
+
+    def run_cli(self, *args, heavy=HEAVY_MODULES):
+        return self.run_probe(PROBE.format(heavy=heavy), *args)
+
+    def test_help(self):
+        imported = self.run_cli("--help", heavy=HEAVY_MODULES + ["requests"])
+        self.assertEqual(imported, [])
+
+    def test_status(self):
+        # Nothing listens on this port: the command fails fast after importing its dependencies
+        imported = self.run_cli("--url", "http://127.0.0.1:9/", "status")
+        self.assertEqual(imported, [])
+
+    def test_utilities(self):
+        # Modules logging with DualLogger do not load the passphrase word list nor the cryptography libraries
+        heavy = ["papr.constants", "coincurve", "cryptography"]
+        imported = self.run_probe(
+            "import sys, papr.utilities\n"
+            f"print('HEAVY:' + ','.join(m for m in {heavy!r} if m in sys.modules))"
+        )
+        self.assertEqual(imported, [])
+
+    def test_publish_msgpack(self):
+        from click.testing import CliRunner
+        from papr import cli
+
+        calls = []
+
+        def publish_one(entry, progress_id, url, binary=False):
+            calls.append((url, binary))
+            return {"result": {}}
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "article.pdf")
+            open(path, "wb").close()
+            with mock.patch.object(cli, "publish_one", publish_one), mock.patch.object(
+                cli, "call", return_value={"result": {}}
+            ):
+                result = CliRunner().invoke(
+                    cli.cli, ["--url", "http://daemon", "--msgpack", "publish", path]
+                )
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(calls, [("http://daemon", True)])
+
+
+class PublishTests(unittest.TestCase):
+    STAGES = ["verifying", "processing", "publishing"]
+
+    def setUp(self):
+        from papr import cli
+
+        self.cli = cli
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.paths = []
+        for name in ("a", "b", "c", "d"):
+            self.paths.append(os.path.join(tmpdir.name, f"{name}.pdf"))
+            open(self.paths[-1], "wb").close()
+
+        self.lock = threading.Lock()
+        self.stages = {}  # progress id -> index of the stage reached
+        self.finished = {}  # progress id -> Event set once the last stage was polled
+        self.running = 0
+        self.max_running = 0
+        self.poll_errors = 1
+        # Passed only when two publications run at the same time
+        self.barrier = threading.Barrier(2, timeout=5)
+
+    def publish_one(self, entry, progress_id, url, binary=False):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            self.stages[progress_id] = 0
+            self.finished[progress_id] = threading.Event()
+        self.barrier.wait()
+        self.finished[progress_id].wait(5)
+        with self.lock:
+            self.running -= 1
+        if entry["base_claim_name"] == "c":
+            return {"result": {"error": "Claim name taken"}}
+        return {"result": {"claim_name": entry["base_claim_name"]}}
+
+    def call(self, method, progress_ids):
+        from requests.exceptions import ConnectionError
+
+        if self.poll_errors:
+            self.poll_errors -= 1
+            raise ConnectionError("Connection refused")
+
+        progress = {}
+        with self.lock:
+            for progress_id in progress_ids:
+                index = self.stages.get(progress_id)
+                if index is None:
+                    progress[progress_id] = None
+                    continue
+                progress[progress_id] = {"stage": self.STAGES[index]}
+                if index == len(self.STAGES) - 1:
+                    self.finished[progress_id].set()
+                else:
+                    self.stages[progress_id] += 1
+        return {"result": progress}
+
+    def publish(self, *args):
+        from click.testing import CliRunner
+
+        with mock.patch.object(
+            self.cli, "publish_one", self.publish_one
+        ), mock.patch.object(self.cli, "call", self.call), mock.patch.object(
+            self.cli, "PROGRESS_POLL_INTERVAL", 0.01
+        ):
+            return CliRunner().invoke(self.cli.cli, ["publish", *args])
+
+    def test_concurrent_publications(self):
+        result = self.publish("--jobs", "2", *self.paths)
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(self.max_running, 2)
+
+        lines = result.output.splitlines()
+        for name in ("a", "b", "d"):
+            self.assertEqual(
+                [line for line in lines if line.startswith(f"{name}:")],
+                [f"{name}: {stage}" for stage in self.STAGES] + [f"{name}: published"],
+            )
+        self.assertIn("c: failed (Claim name taken)", lines)
+        self.assertIn("1 of 4 manuscript(s) could not be published", lines)
+
+    def test_jobs_range(self):
+        result = self.publish("--jobs", "0", *self.paths)
+        self.assertEqual(result.exit_code, 2)
+        self.assertIn("--jobs", result.output)
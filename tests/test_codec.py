@@ -0,0 +1,44 @@
+import decimal
+import unittest
+
+from papr import codec
+
+
+def default(o):
+    if isinstance(o, decimal.Decimal):
+        return str(o)
+    raise TypeError(o)
+
+
+PAYLOAD = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "result": {"items": [{"name": "a", "amount": decimal.Decimal("0.1")}]},
+}
+DECODED = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "result": {"items": [{"name": "a", "amount": "0.1"}]},
+}
+
+
+class CodecTests(unittest.TestCase):
+    def test_json(self):
+        data = codec.encode(PAYLOAD, default=default)
+        self.assertEqual(codec.decode(data), DECODED)
+        with self.assertRaises(codec.CodecError):
+            codec.decode(b"{")
+
+    def test_negotiate(self):
+        self.assertEqual(codec.negotiate(None), codec.JSON)
+        self.assertEqual(
+            codec.negotiate(codec.MSGPACK),
+            codec.MSGPACK if codec.available(codec.MSGPACK) else codec.JSON,
+        )
+
+    @unittest.skipUnless(codec.available(codec.MSGPACK), "msgpack is not installed")
+    def test_msgpack(self):
+        data = codec.encode(PAYLOAD, codec.MSGPACK, default=default)
+        self.assertEqual(codec.decode(data, codec.MSGPACK), DECODED)
+        with self.assertRaises(codec.CodecError):
+            codec.decode(b"\xc1", codec.MSGPACK)
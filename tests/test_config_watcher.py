@@ -0,0 +1,77 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+
+from papr.localdata import load_config
+from papr.config_watcher import ConfigWatcher
+
+
+class ConfigWatcherTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.path = os.path.join(tmpdir.name, "papr.json")
+        self.write({"http_cache_size": 10})
+
+    def write(self, data):
+        with open(self.path, "w") as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+
+    def test_load_config(self):
+        self.assertEqual(load_config(self.path).http_cache_size, 10)
+        self.write("{")
+        self.assertIsNone(load_config(self.path))
+        self.write({"http_cache_size": "many"})
+        self.assertIsNone(load_config(self.path))
+
+    def test_reload_on_change(self):
+        reloaded = []
+
+        async def reload(config):
+            reloaded.append(config.http_cache_size)
+            return {"reloaded": ["http_cache_size"], "restart_required": []}
+
+        async def run():
+            watcher = ConfigWatcher(self.path, reload, interval=0.01)
+            watcher.start()
+            await asyncio.sleep(0.05)
+            self.assertEqual(reloaded, [])
+
+            self.write({"http_cache_size": 20})
+            os.utime(self.path, ns=(0, 0))
+            await asyncio.sleep(0.05)
+            await watcher.stop()
+            return watcher.status()
+
+        status = asyncio.run(run())
+        self.assertEqual(reloaded, [20])
+        self.assertEqual(status["last_reload"]["reloaded"], ["http_cache_size"])
+
+    def test_keeps_watching_after_error(self):
+        reloaded = []
+
+        async def reload(config):
+            if not reloaded:
+                reloaded.append(None)
+                raise ValueError("cannot apply")
+            reloaded.append(config.http_cache_size)
+            return {"reloaded": ["http_cache_size"], "restart_required": []}
+
+        async def run():
+            watcher = ConfigWatcher(self.path, reload, interval=0.01)
+            watcher.start()
+            for size in (20, 30):
+                self.write({"http_cache_size": size})
+                os.utime(self.path, ns=(size, size))
+                await asyncio.sleep(0.05)
+                if size == 20:
+                    self.assertIn("cannot apply", watcher.status()["error"])
+            await watcher.stop()
+            return watcher.status()
+
+        with self.assertLogs("papr.config_watcher", "ERROR"):
+            status = asyncio.run(run())
+        self.assertEqual(reloaded, [None, 30])
+        self.assertIsNone(status["error"])
@@ -0,0 +1,127 @@
+import io
+import time
+import unittest
+
+from papr.encryption import (
+    Header,
+    DecryptionError,
+    HEADER_SIZE,
+    TAG_SIZE,
+    new_content_key,
+    encrypt_bytes,
+    decrypt_bytes,
+    decrypt_chunks,
+    DerivedKeyCache,
+    encrypt_with_passphrase,
+    decrypt_with_passphrase,
+)
+
+
+class EncryptionTests(unittest.TestCase):
+    def test_round_trip(self):
+        key = new_content_key()
+        for size in (0, 1, 99, 100, 101, 1000):
+            data = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+            encrypted = encrypt_bytes(key, data, chunk_size=100)
+            self.assertEqual(decrypt_bytes(key, encrypted), data)
+
+            header = Header.read(io.BytesIO(encrypted))
+            self.assertEqual(header.plaintext_size(len(encrypted)), size)
+
+    def test_random_access(self):
+        key = new_content_key()
+        data = b"".join(bytes([i]) * 100 for i in range(10))
+        encrypted = encrypt_bytes(key, data, chunk_size=100)
+
+        src = io.BytesIO(encrypted)
+        header = Header.read(src)
+        src.seek(HEADER_SIZE + 7 * (100 + TAG_SIZE))
+        chunks = list(decrypt_chunks(key, src, header=header, start_chunk=7))
+        self.assertEqual(b"".join(chunks), data[700:])
+
+    def test_tampering_is_detected(self):
+        key = new_content_key()
+        encrypted = encrypt_bytes(key, b"a" * 1000, chunk_size=100)
+
+        with self.assertRaises(DecryptionError):
+            # Truncated at a chunk boundary
+            decrypt_bytes(key, encrypted[: HEADER_SIZE + 5 * (100 + TAG_SIZE)])
+
+        flipped = bytearray(encrypted)
+        flipped[HEADER_SIZE + 3] ^= 1
+        with self.assertRaises(DecryptionError):
+            decrypt_bytes(key, bytes(flipped))
+
+        with self.assertRaises(DecryptionError):
+            decrypt_bytes(new_content_key(), encrypted)
+
+
+class DerivedKeyCacheTests(unittest.TestCase):
+    def test_keys_are_reused_per_scope(self):
+        cache = DerivedKeyCache(max_size=4, ttl=None)
+        first = encrypt_with_passphrase("passphrase", b"r0", cache=cache, scope="a")
+        second = encrypt_with_passphrase("passphrase", b"r1", cache=cache, scope="a")
+        self.assertEqual(cache.stats()["misses"], 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+        # Same salt and key, different nonces
+        self.assertEqual(
+            Header.read(io.BytesIO(first)).scrypt,
+            Header.read(io.BytesIO(second)).scrypt,
+        )
+        self.assertNotEqual(first[:HEADER_SIZE], second[:HEADER_SIZE])
+
+        self.assertEqual(
+            decrypt_with_passphrase("passphrase", first, cache=cache, scope="a"), b"r0"
+        )
+        self.assertEqual(cache.stats()["hits"], 2)
+
+        # Decryption without the cache derives the key from the header
+        self.assertEqual(decrypt_with_passphrase("passphrase", second), b"r1")
+        with self.assertRaises(DecryptionError):
+            decrypt_with_passphrase("wrong", second, cache=cache, scope="a")
+
+    @staticmethod
+    def cached_key(cache, scope):
+        return next(key for entry, (key, _) in cache._keys.items() if entry[0] == scope)
+
+    def test_eviction_zeroes_keys(self):
+        cache = DerivedKeyCache(max_size=2, ttl=None)
+        cache.encryption_key("a", "passphrase")
+        key_a = self.cached_key(cache, "a")
+        cache.encryption_key("b", "passphrase")
+        key_b = self.cached_key(cache, "b")
+        cache.encryption_key("c", "passphrase")
+        key_c = self.cached_key(cache, "c")
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(key_a, bytearray(len(key_a)))
+        self.assertNotEqual(key_b, bytearray(len(key_b)))
+
+        cache.evict("b")
+        self.assertEqual(key_b, bytearray(len(key_b)))
+        self.assertEqual(len(cache), 1)
+
+        cache.clear()
+        self.assertEqual(key_c, bytearray(len(key_c)))
+        self.assertEqual(cache.stats()["evictions"], 3)
+
+    def test_keys_are_copies(self):
+        cache = DerivedKeyCache(max_size=2, ttl=None)
+        salt, key = cache.encryption_key("a", "passphrase")
+        self.assertIsInstance(key, bytes)
+        self.assertEqual(cache.get("a", "passphrase", salt), key)
+
+        cache.clear()
+        # Zeroing the cache leaves the keys given to callers untouched
+        self.assertNotEqual(key, bytes(len(key)))
+        self.assertEqual(cache.get("a", "passphrase", salt), key)
+
+    def test_expiry(self):
+        cache = DerivedKeyCache(max_size=4, ttl=0.01)
+        cache.encryption_key("a", "passphrase")
+        key = self.cached_key(cache, "a")
+        salt = next(iter(cache._keys))[2]
+        time.sleep(0.02)
+        self.assertNotEqual(cache.encryption_key("a", "passphrase")[0], salt)
+        self.assertEqual(key, bytearray(len(key)))
@@ -0,0 +1,190 @@
+import asyncio
+import unittest
+
+from aiohttp import web
+
+from papr import events
+from papr.events import Subscription, iter_events, CONNECTED, UNSUPPORTED
+
+
+async def lines(*items):
+    for item in items:
+        yield item
+
+
+class EventsTests(unittest.TestCase):
+    def test_parse(self):
+        async def run():
+            stream = lines(
+                b": keep-alive\n",
+                b"id: 1\n",
+                b"event: decision\n",
+                b'data: {"base_claim_name": "a",\n',
+                b'data: "accepted": true}\n',
+                b"\n",
+                b"data: no id\n",
+                b"\n",
+            )
+            return [event async for event in iter_events(stream)]
+
+        first, second = asyncio.run(run())
+        self.assertEqual(first.id, "1")
+        self.assertEqual(first.type, "decision")
+        self.assertEqual(first.json(), {"base_claim_name": "a", "accepted": True})
+        # The last event id is kept
+        self.assertEqual(second.id, "1")
+        self.assertEqual(second.type, "message")
+        self.assertIsNone(second.json())
+
+    def test_resume_after_drop(self):
+        cursors = []
+
+        async def handler(request):
+            cursors.append(request.headers.get("Last-Event-ID"))
+            resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await resp.prepare(request)
+            start = len(cursors) * 10
+            for i in range(start, start + 2):
+                await resp.write(f"id: {i}\ndata: {{}}\n\n".encode())
+            return resp
+
+        async def run():
+            app = web.Application()
+            app.router.add_get(events.EVENTS_PATH, handler)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+
+            received = []
+            states = []
+            done = asyncio.Event()
+
+            async def authenticate(url):
+                return {}
+
+            async def on_event(server_id, event):
+                received.append(event.id)
+                if len(received) == 4:
+                    done.set()
+
+            subscription = Subscription(
+                1,
+                f"http://127.0.0.1:{port}",
+                authenticate,
+                on_event,
+                lambda server_id, state: states.append(state),
+            )
+            subscription.start()
+            await asyncio.wait_for(done.wait(), 10)
+            await subscription.stop()
+            await runner.cleanup()
+            return received, states, subscription
+
+        old_delay = events.RECONNECT_DELAY
+        events.RECONNECT_DELAY = 0
+        try:
+            received, states, subscription = asyncio.run(run())
+        finally:
+            events.RECONNECT_DELAY = old_delay
+
+        self.assertEqual(received, ["10", "11", "20", "21"])
+        self.assertEqual(cursors[:2], [None, "11"])
+        self.assertIn(CONNECTED, states)
+        self.assertEqual(subscription.cursor, "21")
+
+    def test_failing_handler(self):
+        connections = []
+
+        async def handler(request):
+            cursor = request.headers.get("Last-Event-ID")
+            connections.append(cursor)
+            resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await resp.prepare(request)
+            for i in range(int(cursor or 0) + 1, 3):
+                await resp.write(f"id: {i}\ndata: {{}}\n\n".encode())
+            await asyncio.sleep(1)
+            return resp
+
+        async def run():
+            app = web.Application()
+            app.router.add_get(events.EVENTS_PATH, handler)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+
+            applied = []
+            failures = []
+            done = asyncio.Event()
+
+            async def authenticate(url):
+                return {}
+
+            async def on_event(server_id, event):
+                if event.id == "1" and not failures:
+                    failures.append(event.id)
+                    raise ValueError("cannot apply")
+                applied.append(event.id)
+                if event.id == "2":
+                    done.set()
+
+            subscription = Subscription(
+                1,
+                f"http://127.0.0.1:{port}",
+                authenticate,
+                on_event,
+                lambda server_id, state: None,
+            )
+            subscription.start()
+            with self.assertLogs("papr.events", "ERROR"):
+                await asyncio.wait_for(done.wait(), 10)
+            state = subscription.state
+            await subscription.stop()
+            await runner.cleanup()
+            return applied, state, subscription
+
+        old_delay = events.RECONNECT_DELAY
+        events.RECONNECT_DELAY = 0
+        try:
+            applied, state, subscription = asyncio.run(run())
+        finally:
+            events.RECONNECT_DELAY = old_delay
+        # The cursor is not advanced past the failing event, which is received again after reconnecting
+        self.assertEqual(applied, ["1", "2"])
+        self.assertEqual(state, CONNECTED)
+        self.assertEqual(subscription.cursor, "2")
+        self.assertEqual(subscription.events, 2)
+        self.assertEqual(connections, [None, None])
+
+    def test_unsupported_server(self):
+        async def run():
+            app = web.Application()
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+
+            async def authenticate(url):
+                return {}
+
+            async def on_event(server_id, event):
+                pass
+
+            states = []
+            subscription = Subscription(
+                1,
+                f"http://127.0.0.1:{port}",
+                authenticate,
+                on_event,
+                lambda server_id, state: states.append(state),
+            )
+            subscription.start()
+            await asyncio.wait_for(subscription._task, 10)
+            await runner.cleanup()
+            return states
+
+        self.assertEqual(asyncio.run(run())[-1], UNSUPPORTED)
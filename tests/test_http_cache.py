@@ -0,0 +1,33 @@
+import unittest
+
+from papr.http_cache import HTTPCache
+
+AUTH = {"Authorization": "Token abc"}
+
+
+class HTTPCacheTests(unittest.TestCase):
+    def test_conditional_requests(self):
+        cache = HTTPCache()
+        self.assertEqual(cache.validators("/a", AUTH), {})
+
+        cache.store("/a", AUTH, {"ETag": '"v1"'}, {"x": 1}, '{"x": 1}')
+        self.assertEqual(cache.validators("/a", AUTH), {"If-None-Match": '"v1"'})
+        # Cached per authorization
+        self.assertEqual(cache.validators("/a", {}), {})
+
+        self.assertEqual(cache.get("/a", AUTH), ({"x": 1}, '{"x": 1}'))
+        self.assertEqual(cache.stats()["hit_rate"], 0.5)
+
+        # Responses without validators replace the cached one
+        cache.store("/a", AUTH, {}, {"x": 2}, '{"x": 2}')
+        self.assertIsNone(cache.get("/a", AUTH))
+
+    def test_lru_eviction(self):
+        cache = HTTPCache(max_entries=2)
+        for url in ("/a", "/b"):
+            cache.store(url, {}, {"Last-Modified": "Mon"}, None, "")
+        cache.get("/a", {})
+        cache.store("/c", {}, {"Last-Modified": "Mon"}, None, "")
+        self.assertIsNotNone(cache.get("/a", {}))
+        self.assertIsNone(cache.get("/b", {}))
+        self.assertEqual(cache.validators("/c", {}), {"If-Modified-Since": "Mon"})
@@ -0,0 +1,156 @@
+import os
+import asyncio
+import datetime
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import Session
+
+from papr.models import Base, Job
+from papr.jobs import JobStore, JobWorker, LeaderElection, DONE, FAILED, RUNNING
+
+
+class JobStoreTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        # Workers share a database file, each with its own engine
+        url = f"sqlite+pysqlite:///{os.path.join(tmpdir.name, 'jobs.sqlite')}"
+        engines = [create_engine(url, future=True) for _ in range(2)]
+        for engine in engines:
+            self.addCleanup(engine.dispose)
+        Base.metadata.create_all(engines[0])
+        self.a = JobStore(engines[0], "a", lease_duration=60)
+        self.b = JobStore(engines[1], "b", lease_duration=60)
+
+    def expire_leases(self):
+        with Session(self.a.engine) as session:
+            session.execute(
+                update(Job).values(
+                    lease_expires=datetime.datetime.utcnow()
+                    - datetime.timedelta(seconds=1)
+                )
+            )
+            session.commit()
+
+    def test_claim_once(self):
+        job_id = self.a.submit("papr_article_create", {"base_claim_name": "x"})
+        job = self.a.claim()
+        self.assertEqual(job["id"], job_id)
+        self.assertEqual(job["params"], {"base_claim_name": "x"})
+        self.assertIsNone(self.b.claim())
+
+        self.assertFalse(self.b.finish(job_id, result={"tx": "b"}))
+        self.assertTrue(self.a.finish(job_id, result={"tx": "a"}))
+        self.assertEqual(self.b.get(job_id)["state"], DONE)
+        self.assertEqual(self.b.get(job_id)["result"], {"tx": "a"})
+
+    def test_same_key_not_concurrent(self):
+        first = self.a.submit("papr_article_revise", {}, key="x")
+        second = self.a.submit("papr_article_revise", {}, key="x")
+        other = self.a.submit("papr_article_revise", {}, key="y")
+
+        self.assertEqual(self.a.claim()["id"], first)
+        self.assertEqual(self.b.claim()["id"], other)
+        self.assertIsNone(self.b.claim())
+
+        self.a.finish(first)
+        self.assertEqual(self.b.claim()["id"], second)
+
+    def test_expired_lease(self):
+        job_id = self.a.submit("papr_article_create", {})
+        self.a.claim()
+        self.expire_leases()
+
+        job = self.b.claim()
+        self.assertEqual((job["id"], job["owner"], job["attempts"]), (job_id, "b", 2))
+        # The previous owner lost the job
+        self.assertFalse(self.a.renew(job_id))
+
+        self.expire_leases()
+        self.a.claim()
+        self.expire_leases()
+        self.assertIsNone(self.b.claim())
+        self.assertEqual(self.a.get(job_id)["state"], FAILED)
+
+    def test_leader_election(self):
+        changes = []
+        self.assertTrue(self.a.acquire("background"))
+        self.assertFalse(self.b.acquire("background"))
+        self.assertTrue(self.a.acquire("background"))
+
+        async def run():
+            election = LeaderElection(self.b, "background", changes.append)
+            election.start()
+            self.assertFalse(election.is_leader)
+            self.a.release_lease("background")
+            election._check()
+            await election.stop()
+
+        asyncio.run(run())
+        self.assertEqual(changes, [True, False])
+
+    def test_worker(self):
+        async def run_job(method, params):
+            if params.get("fail"):
+                return {"error": "failed"}
+            return {"method": method}
+
+        ok = self.a.submit("papr_article_create", {})
+        failing = self.a.submit("papr_article_create", {"fail": True})
+
+        async def run():
+            worker = JobWorker(self.a, run_job, poll_interval=0.01)
+            worker.start()
+            while self.a.get(failing)["state"] in ("queued", RUNNING):
+                await asyncio.sleep(0.01)
+            await worker.stop()
+
+        asyncio.run(run())
+        self.assertEqual(self.a.get(ok)["result"], {"method": "papr_article_create"})
+        self.assertEqual(self.a.get(failing)["error"], "failed")
+
+    def test_worker_survives_errors(self):
+        async def run_job(method, params):
+            return {}
+
+        job_id = self.a.submit("papr_article_create", {})
+        claim = self.a.claim
+        failures = []
+
+        def failing_claim():
+            if not failures:
+                failures.append(True)
+                raise RuntimeError("database is locked")
+            return claim()
+
+        self.a.claim = failing_claim
+
+        async def run():
+            worker = JobWorker(self.a, run_job, poll_interval=0.01)
+            worker.start()
+            while self.a.get(job_id)["state"] != DONE:
+                await asyncio.sleep(0.01)
+            await worker.stop()
+
+        with self.assertLogs("papr.jobs", "ERROR"):
+            asyncio.run(run())
+
+    def test_leader_election_ends(self):
+        changes = []
+
+        async def run():
+            election = LeaderElection(self.a, "background", changes.append)
+            election.start()
+            self.assertTrue(election.is_leader)
+            await asyncio.sleep(0)
+            # The task ending stops the renewals, so this worker is no longer the leader
+            election._task.cancel()
+            await asyncio.gather(election._task, return_exceptions=True)
+            self.assertFalse(election.is_leader)
+            await election.stop()
+
+        asyncio.run(run())
+        self.assertEqual(changes, [True, False])
+        self.assertTrue(self.b.acquire("background"))
@@ -0,0 +1,110 @@
+import io
+import os
+import json
+import logging
+import tempfile
+import threading
+import unittest
+
+from papr.logs import StructuredFormatter, setup_logging
+from papr.utilities import DualLogger, rpc_error
+
+
+class Formatted:
+    """
+    Argument recording the threads which formatted it
+    """
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return "formatted"
+
+
+class LogsTests(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        handlers, level = list(root.handlers), root.level
+
+        def restore():
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in handlers:
+                root.addHandler(handler)
+            root.setLevel(level)
+
+        self.addCleanup(restore)
+        self.logger = DualLogger(logging.getLogger("papr.tests"))
+
+    def setup(self, **kwargs):
+        stream = io.StringIO()
+        listener = setup_logging(stream=stream, **kwargs)
+        return stream, listener
+
+    def test_text_logs(self):
+        stream, listener = self.setup()
+        self.logger.info("Published %s", "article", size=10)
+        listener.stop()
+
+        line = stream.getvalue().strip()
+        self.assertTrue(line.endswith("INFO     papr.tests: Published article"), line)
+
+    def test_structured_logs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "papr.log")
+            stream, listener = self.setup(structured=True, path=path)
+            self.logger.warning("Published %s", "article", message="other", size=10)
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+            with open(path) as f:
+                self.assertEqual(f.read(), stream.getvalue())
+
+        data = json.loads(stream.getvalue())
+        self.assertEqual(data["level"], "WARNING")
+        self.assertEqual(data["logger"], "papr.tests")
+        # Fields cannot overwrite those of the record
+        self.assertEqual(data["message"], "Published article")
+        self.assertEqual(data["fields"], {"message": "other", "size": 10})
+
+    def test_exception(self):
+        stream, listener = self.setup(structured=True)
+        try:
+            raise ValueError("bad value")
+        except ValueError:
+            self.logger.exception("Could not %s", "publish")
+        listener.stop()
+
+        data = json.loads(stream.getvalue())
+        self.assertEqual(data["message"], "Could not publish")
+        self.assertIn("ValueError: bad value", data["exc_info"])
+
+    def test_lazy_formatting(self):
+        stream, listener = self.setup(level="INFO")
+        arg = Formatted()
+        self.logger.debug("Skipped %s", arg)
+        self.assertEqual(arg.threads, [])
+
+        # Formatted by the writer thread
+        self.logger.info("Written %s", arg)
+        listener.stop()
+        self.assertEqual(len(arg.threads), 1)
+        self.assertIsNot(arg.threads[0], threading.current_thread())
+        self.assertIn("Written formatted", stream.getvalue())
+
+    def test_rpc_error(self):
+        self.assertEqual(rpc_error("No job %s", 3), {"error": "No job 3"})
+        self.assertEqual(rpc_error("100%"), {"error": "100%"})
+
+        stream, listener = self.setup(level="CRITICAL")
+        # Returned to the caller even when the level is disabled
+        self.assertEqual(self.logger.error("No job %s", 3), {"error": "No job 3"})
+        listener.stop()
+        self.assertEqual(stream.getvalue(), "")
+
+    def test_formatter_without_fields(self):
+        record = logging.LogRecord("papr", logging.INFO, __file__, 1, "msg", (), None)
+        self.assertNotIn("fields", json.loads(StructuredFormatter().format(record)))
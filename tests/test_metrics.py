@@ -0,0 +1,60 @@
+import asyncio
+import unittest
+
+from papr.metrics import MetricsRegistry, instrument
+
+
+class MetricsTests(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetricsRegistry(buckets=(0.01, 1.0))
+
+    def test_sync_method(self):
+        fn = instrument("ok", lambda x: x * 2, self.registry)
+        self.assertEqual(fn(2), 4)
+        self.assertEqual(fn(3), 6)
+
+        metrics = self.registry.to_dict()["ok"]
+        self.assertEqual(metrics["calls"], 2)
+        self.assertEqual(metrics["errors"], 0)
+        self.assertEqual(metrics["buckets"]["0.01"], 2)
+        self.assertEqual(metrics["buckets"]["+Inf"], 2)
+
+    def test_async_method_errors(self):
+        async def papr_fail(fail):
+            await asyncio.sleep(0)
+            if fail:
+                raise ValueError("failure")
+            return {"error": "Returned error"}
+
+        fn = instrument("papr_fail", papr_fail, self.registry)
+
+        asyncio.run(fn(False))
+        with self.assertRaises(ValueError):
+            asyncio.run(fn(True))
+
+        metrics = self.registry.to_dict()["papr_fail"]
+        self.assertEqual(metrics["calls"], 2)
+        self.assertEqual(metrics["errors"], 2)
+
+    def test_uncalled_methods_are_not_reported(self):
+        instrument("never", lambda: None, self.registry)
+        self.assertEqual(self.registry.to_dict(), {})
+
+    def test_prometheus(self):
+        fn = instrument("papr_status", lambda: {}, self.registry)
+        fn()
+        text = self.registry.to_prometheus()
+
+        self.assertIn('papr_rpc_calls_total{method="papr_status"} 1', text)
+        self.assertIn('papr_rpc_errors_total{method="papr_status"} 0', text)
+        self.assertIn(
+            'papr_rpc_latency_seconds_bucket{method="papr_status",le="+Inf"} 1', text
+        )
+        self.assertIn('papr_rpc_latency_seconds_count{method="papr_status"} 1', text)
+
+    def test_reset(self):
+        fn = instrument("reset", lambda: None, self.registry)
+        fn()
+        self.registry.reset()
+        fn()
+        self.assertEqual(self.registry.to_dict()["reset"]["calls"], 1)
@@ -0,0 +1,103 @@
+import unittest
+
+from sqlalchemy import create_engine, inspect, select, text
+from sqlalchemy.orm import Session
+
+from papr.models import Article, Review, Server, upgrade_schema
+
+# Tables whose columns were extended, as created by the first version of the schema
+BASELINE_SCHEMA = [
+    """CREATE TABLE servers (
+        id INTEGER NOT NULL,
+        name VARCHAR(512),
+        channel_name VARCHAR(512),
+        url VARCHAR(512),
+        public_key VARCHAR(512),
+        PRIMARY KEY (id)
+    )""",
+    """CREATE TABLE articles (
+        id INTEGER NOT NULL,
+        base_claim_name VARCHAR(256),
+        channel_name VARCHAR(256),
+        encryption_passphrase VARCHAR(1024),
+        review_passphrase VARCHAR(1024),
+        reviewed BOOLEAN,
+        revision INTEGER,
+        review_server_id INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(review_server_id) REFERENCES servers (id)
+    )""",
+    """CREATE TABLE reviews (
+        id INTEGER NOT NULL,
+        submission_title VARCHAR(512),
+        submission_claim_name VARCHAR(256),
+        submission_channel_name VARCHAR(256),
+        submission_authors TEXT,
+        submission_date DATETIME,
+        review_date DATETIME,
+        review_text TEXT,
+        review_rating INTEGER,
+        review_signature TEXT,
+        review_signature_timestamp TEXT,
+        server_id INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(server_id) REFERENCES servers (id)
+    )""",
+    """CREATE TABLE manuscripts (
+        id INTEGER NOT NULL,
+        claim_name VARCHAR(256),
+        bid FLOAT,
+        file_path VARCHAR(512),
+        submission_date DATETIME,
+        txid VARCHAR(40),
+        txhash VARCHAR(96),
+        title VARCHAR(512),
+        abstract TEXT,
+        authors TEXT,
+        tags VARCHAR(1024),
+        article_id INTEGER,
+        PRIMARY KEY (id),
+        FOREIGN KEY(article_id) REFERENCES articles (id)
+    )""",
+    "INSERT INTO servers (id, name) VALUES (1, 'server')",
+    "INSERT INTO articles (id, base_claim_name, review_server_id) VALUES (1, 'article', 1)",
+]
+
+
+class UpgradeSchemaTests(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+        self.addCleanup(self.engine.dispose)
+
+    def test_baseline_database(self):
+        with self.engine.connect() as conn:
+            for statement in BASELINE_SCHEMA:
+                conn.execute(text(statement))
+            conn.commit()
+
+            upgrade_schema(conn)
+            conn.commit()
+            inspector = inspect(conn)
+            columns = {c["name"] for c in inspector.get_columns("articles")}
+            self.assertTrue({"envelope_encryption", "chunked"} <= columns)
+            self.assertIn(
+                "content_key", [c["name"] for c in inspector.get_columns("manuscripts")]
+            )
+            self.assertIn(
+                "deadline", [c["name"] for c in inspector.get_columns("reviews")]
+            )
+            self.assertIn("chunks", inspector.get_table_names())
+
+            # Upgrading again changes nothing
+            upgrade_schema(conn)
+
+        with Session(self.engine) as session:
+            article = session.execute(select(Article)).scalar_one()
+            self.assertEqual(article.base_claim_name, "article")
+            self.assertIsNone(article.chunked)
+
+            server = session.get(Server, 1)
+            server.event_cursor = "42"
+            session.add(Review(submission_claim_name="a", server=server))
+            session.commit()
+            self.assertEqual(session.get(Server, 1).event_cursor, "42")
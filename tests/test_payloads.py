@@ -0,0 +1,49 @@
+import unittest
+
+from papr.payloads import (
+    PayloadError,
+    ArticleAcceptance,
+    ReviewSubmission,
+    ReviewerRecommendation,
+)
+
+
+class PayloadTests(unittest.TestCase):
+    def test_round_trip(self):
+        review = ReviewSubmission("article_r0", 4, "Review", "abcd", 1650000000)
+        data = review.to_dict()
+        self.assertEqual(
+            data,
+            {
+                "manuscript": "article_r0",
+                "rating": 4,
+                "review": "Review",
+                "signature": "abcd",
+                "signing_ts": 1650000000,
+            },
+        )
+        self.assertEqual(ReviewSubmission.from_dict(data), review)
+        self.assertFalse(hasattr(review, "__dict__"))
+
+    def test_optional_fields(self):
+        recommendation = ReviewerRecommendation("article", "Bob", reviewer="@Bob")
+        self.assertEqual(
+            recommendation.to_dict(),
+            {"article": "article", "reviewer_name": "Bob", "reviewer": "@Bob"},
+        )
+
+        acceptance = ArticleAcceptance(
+            "article", "@Author", None, 1, "Title", None, None, None
+        )
+        self.assertNotIn("encryption_passphrase", acceptance.to_dict())
+        self.assertIsNone(acceptance.to_dict()["abstract"])
+
+    def test_validation(self):
+        with self.assertRaises(PayloadError):
+            ReviewSubmission("article_r0", "4", "Review", "abcd", 1650000000)
+        with self.assertRaises(PayloadError):
+            ReviewSubmission("article_r0", True, "Review", "abcd", 1650000000)
+        with self.assertRaises(PayloadError):
+            ReviewerRecommendation.from_dict({"article": "article"})
+        with self.assertRaises(PayloadError):
+            ReviewerRecommendation.from_dict(["article"])
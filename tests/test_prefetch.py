@@ -0,0 +1,139 @@
+import os
+import time
+import asyncio
+import datetime
+import tempfile
+import unittest
+
+from papr.prefetch import Prefetcher, READY, FAILED
+
+
+class PrefetcherTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+        self.fetched = []
+
+    async def fetch(self, claim_name, throttle):
+        self.fetched.append(claim_name)
+        await asyncio.sleep(0)
+        if claim_name == "missing":
+            return {"error": "not found"}
+        path = os.path.join(self.dir, claim_name)
+        with open(path, "wb") as f:
+            for _ in range(10):
+                f.write(b"\0" * 100)
+                await throttle(100)
+        return {"download_path": path}
+
+    def test_deadline_order(self):
+        now = datetime.datetime.utcnow()
+
+        async def run():
+            prefetcher = Prefetcher(self.fetch, concurrency=1)
+            prefetcher.schedule("later", now + datetime.timedelta(days=2))
+            prefetcher.schedule("no_deadline")
+            prefetcher.schedule("missing", now + datetime.timedelta(days=3))
+            prefetcher.schedule("sooner", now + datetime.timedelta(days=1))
+            # Moved up
+            prefetcher.schedule("later", now + datetime.timedelta(hours=1))
+
+            prefetcher.start()
+            for name in ("later", "no_deadline", "missing", "sooner"):
+                await prefetcher.entries[name].done.wait()
+            await prefetcher.stop()
+            return prefetcher.status()
+
+        status = asyncio.run(run())
+        self.assertEqual(self.fetched, ["later", "sooner", "missing", "no_deadline"])
+        self.assertEqual(status["sooner"]["state"], READY)
+        self.assertEqual(status["sooner"]["size"], 1000)
+        self.assertEqual(status["missing"]["state"], FAILED)
+        self.assertEqual(status["missing"]["error"], "not found")
+
+    def test_rate_limit(self):
+        async def run():
+            prefetcher = Prefetcher(self.fetch, concurrency=2, max_rate=20_000)
+            prefetcher.start()
+            prefetcher.schedule("a")
+            prefetcher.schedule("b")
+            start = time.monotonic()
+            await asyncio.sleep(0.05)
+            # Both downloads are slowed down while they read their chunks
+            self.assertEqual(self.fetched, ["a", "b"])
+            self.assertNotEqual(prefetcher.entries["a"].state, READY)
+            await asyncio.gather(
+                prefetcher.entries["a"].done.wait(), prefetcher.entries["b"].done.wait()
+            )
+            # 2000 bytes at 20kB/s for both workers together
+            self.assertGreaterEqual(time.monotonic() - start, 0.1)
+            await prefetcher.stop()
+
+        asyncio.run(run())
+
+    def test_discard(self):
+        async def run():
+            prefetcher = Prefetcher(self.fetch, concurrency=1)
+            prefetcher.start()
+            await prefetcher.schedule("a").done.wait()
+            self.assertEqual(prefetcher.schedule("a").state, READY)
+
+            # Evicted from the submission cache: downloaded again
+            prefetcher.discard("a")
+            await prefetcher.schedule("a").done.wait()
+            await prefetcher.stop()
+
+        asyncio.run(run())
+        self.assertEqual(self.fetched, ["a", "a"])
+
+    def test_resize(self):
+        async def run():
+            prefetcher = Prefetcher(self.fetch, concurrency=1)
+            prefetcher.start()
+            prefetcher.resize(3)
+            self.assertEqual(len(prefetcher._workers), 3)
+            for name in ("a", "b", "c"):
+                prefetcher.schedule(name)
+            await asyncio.gather(
+                *(prefetcher.entries[name].done.wait() for name in ("a", "b", "c"))
+            )
+            prefetcher.resize(1)
+            self.assertEqual(len(prefetcher._workers), 1)
+            prefetcher.schedule("d")
+            await prefetcher.entries["d"].done.wait()
+            await prefetcher.stop()
+
+        asyncio.run(run())
+        self.assertEqual(sorted(self.fetched), ["a", "b", "c", "d"])
+
+    def test_wait_for_queued(self):
+        async def run():
+            prefetcher = Prefetcher(self.fetch, concurrency=1)
+            prefetcher.schedule("a")
+            # Downloaded by the caller and skipped by the workers, even when several callers wait for it
+            await asyncio.gather(prefetcher.wait("a"), prefetcher.wait("a"))
+            self.assertEqual(prefetcher.entries["a"].state, READY)
+            prefetcher.start()
+            await prefetcher.schedule("b").done.wait()
+            await prefetcher.stop()
+
+        asyncio.run(run())
+        self.assertEqual(self.fetched, ["a", "b"])
+
+    def test_max_entries(self):
+        async def run():
+            prefetcher = Prefetcher(self.fetch, concurrency=1, max_entries=2)
+            prefetcher.schedule("a")
+            prefetcher.schedule("b")
+            prefetcher.schedule("c")
+            # Queued entries are kept
+            self.assertEqual(list(prefetcher.entries), ["a", "b", "c"])
+
+            prefetcher.start()
+            await prefetcher.entries["c"].done.wait()
+            await prefetcher.stop()
+            return prefetcher.status()
+
+        status = asyncio.run(run())
+        self.assertEqual(list(status), ["b", "c"])
@@ -0,0 +1,81 @@
+import asyncio
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from papr.models import Base, Article, Server
+from papr.status_tracker import StatusTracker
+
+
+class StatusTrackerTests(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+        Base.metadata.create_all(self.engine)
+        with Session(self.engine) as session:
+            server = Server(name="Server", url="http://localhost")
+            session.add_all(
+                [
+                    Article(base_claim_name="a", review_server=server),
+                    Article(base_claim_name="b", review_server=server),
+                    Article(base_claim_name="serverless"),
+                ]
+            )
+            session.commit()
+
+        self.fetched = []
+        self.failing = set()
+
+    async def fetch(self, names):
+        statuses = {}
+        for name in names:
+            self.fetched.append(name)
+            if name in self.failing:
+                statuses[name] = {"error": "server down"}
+            else:
+                statuses[name] = {"reviewed": False, "revision": len(self.fetched)}
+        return statuses
+
+    def test_refresh_and_persistence(self):
+        tracker = StatusTracker(self.engine, self.fetch, interval=60)
+        asyncio.run(tracker.refresh())
+        self.assertEqual(sorted(self.fetched), ["a", "b"])
+
+        status = tracker.get("a")
+        self.assertFalse(status["stale"])
+        self.assertLess(status["age"], 60)
+        self.assertIsNone(tracker.get("serverless"))
+
+        # A failed refresh keeps the previous status
+        self.failing.add("a")
+        asyncio.run(tracker.refresh(["a"]))
+        self.assertEqual(tracker.get("a")["revision"], status["revision"])
+        self.assertEqual(tracker.get("a")["refresh_error"], "server down")
+
+        # New blocks make the statuses stale until they are refreshed
+        tracker.on_block(100)
+        self.assertTrue(tracker.get("b")["stale"])
+
+        reloaded = StatusTracker(self.engine, self.fetch)
+        reloaded.load()
+        self.assertEqual(reloaded.get("b")["revision"], tracker.get("b")["revision"])
+
+    def test_concurrent_refreshes_are_merged(self):
+        tracker = StatusTracker(self.engine, self.fetch)
+
+        async def run():
+            await asyncio.gather(tracker.refresh(), tracker.refresh())
+
+        asyncio.run(run())
+        self.assertEqual(len(self.fetched), 2)
+        self.assertEqual(tracker.refreshes, 1)
+
+    def test_unknown_articles_are_not_stored(self):
+        tracker = StatusTracker(self.engine, self.fetch)
+        tracker.apply("unknown", {"reviewed": True})
+        self.assertEqual(asyncio.run(tracker.refresh(["a", "other"]))["other"], None)
+        self.assertIsNone(tracker.get("unknown"))
+
+        reloaded = StatusTracker(self.engine, self.fetch)
+        reloaded.load()
+        self.assertEqual(list(reloaded.statuses), ["a"])
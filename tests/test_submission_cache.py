@@ -0,0 +1,86 @@
+import os
+import asyncio
+import datetime
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from papr.models import Base, Review
+from papr.submission_cache import SubmissionCache
+
+
+class SubmissionCacheTests(unittest.TestCase):
+    def setUp(self):
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        self.dir = tmpdir.name
+
+        self.engine = create_engine("sqlite+pysqlite:///:memory:", future=True)
+        Base.metadata.create_all(self.engine)
+
+        self.deleted = []
+        self.cache = SubmissionCache(self.engine, 250, self.delete)
+
+    async def delete(self, claim_name, path):
+        self.deleted.append(claim_name)
+        os.remove(path)
+
+    def download(self, claim_name, size=100):
+        path = os.path.join(self.dir, f"{claim_name}.zip")
+        with open(path, "wb") as f:
+            f.write(b"\0" * size)
+        self.cache.add(claim_name, path)
+        return asyncio.run(self.cache.evict(keep=claim_name))
+
+    def test_lru_eviction(self):
+        self.download("a")
+        self.download("b")
+        self.assertIsNotNone(self.cache.lookup("a"))  # b is now the least recently used
+
+        self.assertEqual(self.download("c"), ["b"])
+        self.assertEqual(self.deleted, ["b"])
+        self.assertIsNone(self.cache.lookup("b"))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["submissions"], 2)
+        self.assertEqual(stats["size"], 200)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_pinned_submissions(self):
+        with Session(self.engine) as session:
+            session.add(Review(submission_claim_name="a"))
+            session.commit()
+
+        self.download("a")
+        self.download("b")
+        self.assertEqual(self.download("c"), ["b"])
+        self.assertEqual(asyncio.run(self.cache.evict(quota=0)), ["c"])
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["pinned_submissions"], 1)
+        self.assertEqual(stats["size"], 100)
+
+    def test_sent_review_unpins(self):
+        with Session(self.engine) as session:
+            review = Review(submission_claim_name="a")
+            session.add(review)
+            session.commit()
+
+            self.download("a")
+            self.assertEqual(asyncio.run(self.cache.evict(quota=0)), [])
+
+            # As papr_review_send does once the review server accepted the review
+            review.review_date = datetime.datetime.now()
+            session.commit()
+
+        self.assertEqual(self.cache.stats()["pinned_submissions"], 0)
+        self.assertEqual(asyncio.run(self.cache.evict(quota=0)), ["a"])
+
+    def test_removed_files(self):
+        self.download("a")
+        os.remove(os.path.join(self.dir, "a.zip"))
+        self.assertIsNone(self.cache.lookup("a"))
+        self.assertEqual(self.cache.stats()["submissions"], 0)
@@ -8,9 +8,9 @@ from aioresponses import CallbackResult, aioresponses
 
 from lbry.testcase import IntegrationTestCase, CommandTestCase
 from lbry.crypto.hash import sha256
-from lbry.crypto.crypt import better_aes_decrypt
 
 from papr.utilities import file_sha256
+from papr.bundle import read_bundle_file
 from papr.config import Config
 from papr.testcase import PaprDaemonTestCase
 
@@ -23,7 +23,7 @@ class ManuscriptTests(PaprDaemonTestCase):
 
     def run(self, result=None):
         with tempfile.TemporaryDirectory() as tmpdir:
-            self.config = Config(submission_dir=tmpdir)
+            self.config = Config(submission_dir=tmpdir, server_events=False)
             super().run(result)
 
     async def asyncSetUp(self):
@@ -86,7 +86,7 @@ class ManuscriptTests(PaprDaemonTestCase):
         with ZipFile(os.path.join(self.daemon.conf.data_dir, "test_preprint.zip")) as z:
             zipped_files = z.namelist()
 
-            assert len(zipped_files) == 2
+            assert len(zipped_files) == 3
             assert "Manuscript_test_preprint.pdf" in zipped_files
             assert "server.json" in zipped_files
 
@@ -143,15 +143,18 @@ class ManuscriptTests(PaprDaemonTestCase):
         with ZipFile(os.path.join(self.daemon.conf.data_dir, "test_preprint.zip")) as z:
             zipped_files = z.namelist()
 
-            assert len(zipped_files) == 2
+            assert len(zipped_files) == 3
             assert "Manuscript_test_preprint.pdf" in zipped_files
             assert "server.json" in zipped_files
+            assert "manifest.json" in zipped_files
 
             data_enc = z.read("Manuscript_test_preprint.pdf")
             hash_enc = sha256(data_enc)
             assert hash_enc != hash_i
 
-            data_dec = better_aes_decrypt(passphrase, data_enc)
+            data_dec = read_bundle_file(
+                z, "Manuscript_test_preprint.pdf", passphrase=passphrase
+            )
             hash_dec = sha256(data_dec)
             assert hash_dec == hash_i
 
@@ -258,7 +261,7 @@ class ManuscriptTests(PaprDaemonTestCase):
         with ZipFile(os.path.join(self.daemon.conf.data_dir, "test_r1.zip")) as z:
             zipped_files = z.namelist()
 
-            assert len(zipped_files) == 2
+            assert len(zipped_files) == 3
             assert "Manuscript_test_r1.pdf" in zipped_files
             assert "server.json" in zipped_files
 
@@ -0,0 +1,78 @@
+import os
+import json
+import asyncio
+import tempfile
+import unittest
+
+from papr.tracing import Tracer
+
+
+class TracingTests(unittest.TestCase):
+    def test_nested_spans(self):
+        tracer = Tracer()
+
+        async def work():
+            with tracer.span("outer", claim_name="test") as outer:
+                with tracer.span("inner", bytes=12):
+                    await asyncio.sleep(0)
+            return outer
+
+        outer = asyncio.run(work())
+        inner = tracer.query(name="inner")[0]
+
+        self.assertEqual(inner.trace_id, outer.trace_id)
+        self.assertEqual(inner.parent_id, outer.span_id)
+        self.assertIsNone(outer.parent_id)
+        self.assertEqual(inner.attributes["bytes"], 12)
+        self.assertEqual(len(tracer.query(trace_id=outer.trace_id)), 2)
+
+    def test_concurrent_tasks_are_separate_traces(self):
+        tracer = Tracer()
+
+        async def task(name):
+            with tracer.span(name):
+                await asyncio.sleep(0)
+                with tracer.span(f"{name}.child"):
+                    await asyncio.sleep(0)
+
+        async def main():
+            await asyncio.gather(task("a"), task("b"))
+
+        asyncio.run(main())
+        a, b = tracer.query(name="a")[0], tracer.query(name="b")[0]
+        self.assertNotEqual(a.trace_id, b.trace_id)
+        self.assertEqual(tracer.query(name="b.child")[0].parent_id, b.span_id)
+
+    def test_error(self):
+        tracer = Tracer()
+        with self.assertRaises(ValueError):
+            with tracer.span("failing"):
+                raise ValueError("oops")
+        self.assertEqual(tracer.query()[0].error, "ValueError: oops")
+
+    def test_ring_buffer(self):
+        tracer = Tracer(max_spans=3)
+        for i in range(5):
+            with tracer.span(f"span{i}"):
+                pass
+        self.assertEqual([s.name for s in tracer.query()], ["span4", "span3", "span2"])
+
+    def test_otlp_export(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "traces.jsonl")
+            tracer = Tracer(export_path=path)
+            with tracer.span("parent", revision=1):
+                with tracer.span("child"):
+                    pass
+            tracer.flush()
+
+            with open(path) as f:
+                lines = f.readlines()
+
+        self.assertEqual(len(lines), 1)
+        spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        self.assertEqual([s["name"] for s in spans], ["child", "parent"])
+        self.assertEqual(spans[0]["parentSpanId"], spans[1]["spanId"])
+        self.assertEqual(
+            spans[1]["attributes"], [{"key": "revision", "value": {"intValue": "1"}}]
+        )
@@ -0,0 +1,133 @@
+import hmac
+import asyncio
+import hashlib
+import binascii
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from papr import verification
+from papr.verification import ReviewVerifier, review_digest
+
+
+class FakeKey:
+    """
+    Public key of a fake channel, whose signatures are HMACs of the digest
+    """
+
+    verifications = 0
+
+    def __init__(self, secret):
+        self.secret = secret
+
+    def sign(self, digest):
+        return hmac.new(self.secret, digest, hashlib.sha256).digest()
+
+    def verify(self, signature, digest):
+        FakeKey.verifications += 1
+        if len(signature) != 32:
+            raise ValueError("Invalid signature")
+        return hmac.compare_digest(signature, self.sign(digest))
+
+
+class FakeOutput:
+    def __init__(self, name):
+        self.claim_id = f"{name}-id"
+        self.claim_hash = name.encode()
+        self.claim = SimpleNamespace(
+            is_channel=True,
+            channel=SimpleNamespace(public_key_bytes=name.encode()),
+        )
+
+
+class ReviewVerifierTests(unittest.TestCase):
+    def setUp(self):
+        patches = [
+            mock.patch.object(verification, "Output", FakeOutput),
+            mock.patch.object(verification.PublicKey, "from_compressed", FakeKey),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        FakeKey.verifications = 0
+
+        self.resolved = []
+
+        async def resolve(names):
+            self.resolved.append(sorted(names))
+            return {n: FakeOutput(n) for n in names if n.startswith("@")}
+
+        self.verifier = ReviewVerifier(resolve)
+        self.addCleanup(self.verifier.close)
+
+    def review(self, channel_name, text="Accept", **fields):
+        review = {
+            "review": text,
+            "signing_ts": 1700000000,
+            "channel_name": channel_name,
+        }
+        digest = review_digest(review, channel_name.encode())
+        signature = FakeKey(channel_name.encode()).sign(digest)
+        return {**review, "signature": binascii.hexlify(signature).decode(), **fields}
+
+    def verify(self, reviews):
+        return asyncio.run(self.verifier.verify_many(reviews))
+
+    def test_results_in_order(self):
+        forged = {**self.review("@alice"), "review": "Reject"}
+        res = self.verify([self.review("@alice"), forged, self.review("@bob")])
+        self.assertEqual(res, [{"valid": True}, {"valid": False}, {"valid": True}])
+
+    def test_resolve_once_per_channel(self):
+        reviews = [self.review("@alice", str(i)) for i in range(5)]
+        reviews += [self.review("@bob", str(i)) for i in range(5)]
+        self.verify(reviews)
+        self.assertEqual(self.resolved, [["@alice", "@bob"]])
+        self.assertEqual(self.verifier.stats()["channels_resolved"], 2)
+
+    def test_caches_hit_on_repeat(self):
+        reviews = [self.review("@alice", str(i)) for i in range(3)]
+        self.assertTrue(all(r["valid"] for r in self.verify(reviews)))
+        self.assertEqual(FakeKey.verifications, 3)
+
+        # The key of the channel and the verified signatures are cached
+        self.assertTrue(all(r["valid"] for r in self.verify(reviews)))
+        self.assertEqual(len(self.resolved), 1)
+        self.assertEqual(FakeKey.verifications, 3)
+        self.assertEqual(self.verifier.stats()["verification_cache_hits"], 3)
+
+        # A new review of the same channel only needs its signature to be verified
+        self.assertTrue(self.verify([self.review("@alice", "new")])[0]["valid"])
+        self.assertEqual(len(self.resolved), 1)
+        self.assertEqual(FakeKey.verifications, 4)
+
+    def test_channel_id_mismatch(self):
+        res = self.verify(
+            [
+                self.review("@alice", channel_id="@alice-id"),
+                self.review("@alice", channel_id="@mallory-id"),
+            ]
+        )
+        self.assertEqual(res[0], {"valid": True})
+        self.assertFalse(res[1]["valid"])
+        self.assertIn("does not have the claim id", res[1]["error"])
+
+    def test_malformed_signature(self):
+        not_hex = {**self.review("@alice"), "signature": "not hex"}
+        truncated = self.review("@alice")
+        truncated["signature"] = truncated["signature"][:16]
+        res = self.verify([not_hex, truncated])
+
+        self.assertFalse(res[0]["valid"])
+        self.assertIn("Malformed review", res[0]["error"])
+        self.assertEqual(res[1], {"valid": False})
+
+    def test_unknown_channel(self):
+        res = self.verify([self.review("unknown"), {"review": "Accept"}])
+        self.assertEqual(
+            res,
+            [
+                {"valid": False, "error": "Could not resolve channel unknown"},
+                {"valid": False, "error": "No channel name given"},
+            ],
+        )